@@ -0,0 +1,70 @@
+"""
+Benchmark clipboard change detection headlessly.
+
+Runs ClipboardMonitor against the in-memory clipboard, once event-driven
+and once through the adaptive polling backend, and reports the latency
+from a clipboard change to the download being queued plus the CPU time
+the monitor spends while the clipboard is idle. Downloads are stubbed out.
+
+Usage:
+    python benchmarks/bench_clipboard.py [--changes N] [--idle SECONDS]
+"""
+import argparse
+import statistics
+import threading
+import time
+from unittest.mock import MagicMock
+from video_downloader.clipboard_backends import MemoryBackend, PollingBackend
+from video_downloader.clipboard_monitor import ClipboardMonitor
+from video_downloader.config import Config
+
+
+def run(name, clipboard, backend, changes, idle):
+    monitor = ClipboardMonitor(Config(), {'show_progress': False}, backend=backend)
+    queued = {}
+    seen = threading.Semaphore(0)
+
+    def download(url):
+        queued[url] = time.perf_counter()
+        seen.release()
+
+    monitor.downloader.download = MagicMock(side_effect=download)
+    thread = threading.Thread(target=monitor.start_monitoring)
+    thread.start()
+
+    latencies = []
+    for i in range(changes):
+        url = f"https://youtube.com/watch?v=bench{i}"
+        copied = time.perf_counter()
+        clipboard.set_text(url)
+        seen.acquire(timeout=10)
+        latencies.append(queued[url] - copied)
+        time.sleep(0.05)
+
+    cpu_before = time.process_time()
+    time.sleep(idle)
+    idle_cpu = time.process_time() - cpu_before
+
+    monitor.stop()
+    thread.join()
+
+    print(f"{name:<8} latency mean {statistics.mean(latencies) * 1000:8.2f} ms   "
+          f"p95 {sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000:8.2f} ms   "
+          f"idle CPU {idle_cpu * 1000 / idle:6.2f} ms/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--changes', type=int, default=20)
+    parser.add_argument('--idle', type=float, default=3.0)
+    args = parser.parse_args()
+
+    clipboard = MemoryBackend()
+    run('event', clipboard, clipboard, args.changes, args.idle)
+
+    clipboard = MemoryBackend()
+    run('poll', clipboard, PollingBackend(paste=clipboard.read), args.changes, args.idle)
+
+
+if __name__ == '__main__':
+    main()
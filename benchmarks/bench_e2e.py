@@ -0,0 +1,334 @@
+"""
+End-to-end download benchmark against a local fake video server.
+
+Serves synthetic media over HTTP as progressive files, HLS playlists with
+TS segments and DASH manifests with fMP4 segments, with configurable time
+to first byte and per-connection bandwidth. Each URL is downloaded through
+the real yt-dlp path, either by calling VideoDownloader from a worker pool
+or by copying the URLs to ClipboardMonitor's clipboard. Every combination
+runs in a fresh process and reports throughput, per-job latency
+percentiles, CPU usage and peak RSS.
+
+Run it from the repository root with PYTHONPATH=. unless the package is
+installed, so that video_downloader can be imported.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_e2e.py
+        [--kinds progressive,hls,dash] [--modes downloader,monitor]
+        [--concurrency 1,4,8] [--jobs N] [--size 8M] [--segments N]
+        [--latency SECONDS] [--bandwidth 20M] [--json] [--verbose]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from video_downloader.config import Config, parse_size
+
+BLOCK = os.urandom(1024 ** 2)
+SEGMENT_SECONDS = 4
+
+
+class FakeMediaServer:
+    """Serves synthetic media of size bytes per video
+
+    GET /progressive/<name>.mp4           one file, with Range support
+    GET /hls/<name>/<name>.m3u8           media playlist of segments .ts files
+    GET /dash/<name>/<name>.mpd           static manifest of segments .m4s files
+
+yt-dlp names files after the last path component, so it is unique per video.
+
+    Every response waits latency seconds before the headers, and bodies are
+    sent at most bandwidth bytes per second per connection (0: unlimited).
+    """
+
+    def __init__(self, size, segments, latency=0.0, bandwidth=0):
+        self.size = size
+        self.segments = segments
+        self.latency = latency
+        self.bandwidth = bandwidth
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='fake-media', daemon=True).start()
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self, kind, count):
+        return [{
+            'progressive': f"{self.base_url}/progressive/video{i}.mp4",
+            'hls': f"{self.base_url}/hls/video{i}/video{i}.m3u8",
+            'dash': f"{self.base_url}/dash/video{i}/video{i}.mpd",
+        }[kind] for i in range(count)]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle(self, request):
+        time.sleep(self.latency)
+        path = request.path.split('?')[0]
+        segment_size = -(-self.size // self.segments)
+        duration = self.segments * SEGMENT_SECONDS
+
+        if re.fullmatch(r'/progressive/\w+\.mp4', path):
+            self._send_body(request, 'video/mp4', self.size)
+        elif path.endswith('.m3u8'):
+            lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}',
+                     '#EXT-X-MEDIA-SEQUENCE:0']
+            for i in range(self.segments):
+                lines += [f'#EXTINF:{SEGMENT_SECONDS}.0,', f'seg{i}.ts']
+            lines.append('#EXT-X-ENDLIST')
+            self._send_text(request, 'application/vnd.apple.mpegurl', '\n'.join(lines) + '\n')
+        elif path.endswith('.mpd'):
+            self._send_text(request, 'application/dash+xml', (
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" minBufferTime="PT2S" '
+                f'mediaPresentationDuration="PT{duration}S" '
+                'profiles="urn:mpeg:dash:profile:isoff-live:2011">'
+                '<Period><AdaptationSet mimeType="video/mp4" segmentAlignment="true">'
+                '<Representation id="main" bandwidth="2000000" codecs="avc1.4d401f,mp4a.40.2" '
+                'width="1280" height="720">'
+                f'<SegmentTemplate timescale="1" duration="{SEGMENT_SECONDS}" startNumber="0" '
+                'initialization="init.mp4" media="seg$Number$.m4s"/>'
+                '</Representation></AdaptationSet></Period></MPD>\n'
+            ))
+        elif path.endswith('/init.mp4'):
+            self._send_body(request, 'video/mp4', 1024)
+        elif re.search(r'/seg\d+\.(ts|m4s)$', path):
+            self._send_body(request, 'video/MP2T' if path.endswith('.ts') else 'video/iso.segment',
+                            segment_size)
+        else:
+            request.send_error(404)
+
+    def _send_text(self, request, content_type, text):
+        body = text.encode()
+        request.send_response(200)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def _send_body(self, request, content_type, size):
+        start, end = 0, size - 1
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', request.headers.get('Range') or '')
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or end), end)
+            if start > end:
+                request.send_response(416)
+                request.send_header('Content-Range', f'bytes */{size}')
+                request.send_header('Content-Length', '0')
+                request.end_headers()
+                return
+        request.send_response(206 if match else 200)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Accept-Ranges', 'bytes')
+        request.send_header('Content-Length', str(end - start + 1))
+        if match:
+            request.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        request.end_headers()
+
+        chunk = 64 * 1024
+        remaining = end - start + 1
+        started = time.monotonic()
+        sent = 0
+        try:
+            while remaining > 0:
+                n = min(chunk, remaining)
+                offset = (start + sent) % (len(BLOCK) - chunk)
+                request.wfile.write(BLOCK[offset:offset + n])
+                sent += n
+                remaining -= n
+                if self.bandwidth:
+                    delay = sent / self.bandwidth - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _options(concurrency, jobs):
+    return {
+        'show_progress': False,
+        'info_cache': False,
+        'cookies_from_browser': None,
+        'workers': concurrency,
+        'queue_size': jobs,
+        'job_retries': 0,
+    }
+
+
+def _config(output_dir):
+    config = Config()
+    config.download_path = output_dir
+    config.supported_platforms = list(config.supported_platforms) + ['127.0.0.1']
+    return config
+
+
+def _downloaded_bytes(downloader):
+    metrics = downloader.metrics.snapshot()['metrics']
+    return sum(metrics['video_downloader_downloaded_bytes_total'].values())
+
+
+def _run_downloader(urls, concurrency, output_dir):
+    from video_downloader.downloader import VideoDownloader
+    from video_downloader.worker_pool import DownloadWorkerPool
+
+    downloader = VideoDownloader(_config(output_dir), _options(concurrency, len(urls)))
+    pool = DownloadWorkerPool(downloader.download, workers=concurrency, queue_size=len(urls),
+                              history_size=len(urls))
+    for url in urls:
+        pool.submit(url)
+    pool.join()
+    pool.shutdown()
+    downloaded = _downloaded_bytes(downloader)
+    downloader.close()
+    return downloaded, pool.jobs()
+
+
+def _run_monitor(urls, concurrency, output_dir):
+    from video_downloader.clipboard_backends import MemoryBackend
+    from video_downloader.clipboard_monitor import ClipboardMonitor
+
+    clipboard = MemoryBackend()
+    monitor = ClipboardMonitor(_config(output_dir), _options(concurrency, len(urls)), backend=clipboard)
+    thread = threading.Thread(target=monitor.start_monitoring)
+    thread.start()
+    # Copying a list of links queues all of them
+    clipboard.set_text('\n'.join(urls))
+    finished = ('completed', 'skipped', 'failed')
+    while sum(monitor.worker_pool.stats()[state] for state in finished) < len(urls):
+        time.sleep(0.05)
+    downloaded = _downloaded_bytes(monitor.downloader)
+    jobs = monitor.worker_pool.jobs()
+    monitor.stop()
+    thread.join()
+    return downloaded, jobs
+
+
+def _silence():
+    # The downloader and yt-dlp write to the inherited stdout and stderr
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+
+
+def run_level(mode, kind, urls, concurrency, verbose=False):
+    """Download urls in this (fresh) process and return the measurements"""
+    if not verbose:
+        _silence()
+    output_dir = tempfile.mkdtemp(prefix='bench-e2e-')
+    cpu = os.times()
+    started = time.perf_counter()
+    try:
+        runner = _run_downloader if mode == 'downloader' else _run_monitor
+        total, jobs = runner(urls, concurrency, output_dir)
+        wall = time.perf_counter() - started
+        after = os.times()
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    latencies = sorted(job.finished_at - job.started_at for job in jobs if job.state == 'completed')
+    cpu_seconds = (after.user - cpu.user) + (after.system - cpu.system)
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))]
+
+    return {
+        'mode': mode,
+        'kind': kind,
+        'concurrency': concurrency,
+        'jobs': len(urls),
+        'failed': sum(job.state == 'failed' for job in jobs),
+        'bytes': total,
+        'seconds': wall,
+        'mb_per_s': total / wall / 1024 ** 2,
+        'latency_p50': percentile(50),
+        'latency_p90': percentile(90),
+        'latency_p99': percentile(99),
+        'latency_mean': statistics.mean(latencies) if latencies else None,
+        'cpu_seconds': cpu_seconds,
+        'cpu_percent': 100 * cpu_seconds / wall,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def report(result):
+    def ms(value):
+        return f"{value * 1000:7.0f}" if value is not None else '      -'
+
+    print(f"{result['mode']:<10} {result['kind']:<11} {result['concurrency']:>3} "
+          f"{result['mb_per_s']:8.1f} {ms(result['latency_p50'])} {ms(result['latency_p90'])} "
+          f"{ms(result['latency_p99'])} {result['cpu_percent']:6.0f}% {result['peak_rss_mb']:8.1f} "
+          f"{result['failed']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--kinds', default='progressive,hls,dash')
+    parser.add_argument('--modes', default='downloader,monitor')
+    parser.add_argument('--concurrency', default='1,4,8')
+    parser.add_argument('--jobs', type=int, default=16, help='Videos per run')
+    parser.add_argument('--size', default='8M', help='Size of every video')
+    parser.add_argument('--segments', type=int, default=16, help='Segments per HLS/DASH video')
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds before every response')
+    parser.add_argument('--bandwidth', default='0', help='Bytes per second per connection (0: unlimited)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the downloads')
+    args = parser.parse_args()
+
+    server = FakeMediaServer(parse_size(args.size), args.segments, args.latency, parse_size(args.bandwidth))
+    if not args.json:
+        print(f"{'mode':<10} {'kind':<11} {'c':>3} {'MB/s':>8} {'p50 ms':>7} {'p90 ms':>7} "
+              f"{'p99 ms':>7} {'CPU':>7} {'RSS MB':>8} {'failed':>6}")
+    try:
+        for mode in args.modes.split(','):
+            for kind in args.kinds.split(','):
+                for concurrency in map(int, args.concurrency.split(',')):
+                    # A process per run, so peak RSS and CPU time are its own
+                    with ProcessPoolExecutor(max_workers=1,
+                                             mp_context=multiprocessing.get_context('spawn')) as child:
+                        result = child.submit(run_level, mode, kind,
+                                              server.urls(kind, args.jobs), concurrency,
+                                              args.verbose).result()
+                    if args.json:
+                        print(json.dumps(result), flush=True)
+                    else:
+                        report(result)
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark URL extraction and classification over a large synthetic corpus.
+
+Compares the previous approach (loose regex, then urlparse and a linear
+endswith() scan per URL) with URLValidator.iter_urls, which captures the
+host while extracting and classifies it with a domain trie. Also reports
+how many lookalike hosts (e.g. notyoutube.com) each approach accepts.
+
+Usage:
+    python benchmarks/bench_url_matcher.py [--lines N] [--repeat N]
+"""
+import argparse
+import random
+import re
+import time
+from urllib.parse import urlparse
+from video_downloader.url_validator import URLValidator
+
+LEGACY_PATTERN = re.compile(
+    r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+)
+
+TEMPLATES = [
+    "https://www.youtube.com/watch?v={id}&t={n}",
+    "https://youtu.be/{id}?si=share{n}",
+    "https://m.facebook.com/page/videos/{n}/",
+    "https://x.com/user/status/{n}",
+    "https://twitter.com/user/status/{n}",
+    "https://www.instagram.com/reel/{id}/",
+    "https://example.com/articles/{n}?ref=home",
+    "https://notyoutube.com/watch?v={id}",
+    "https://cdn{n}.images.net/{id}.jpg",
+]
+WORDS = "the quick brown fox jumps over a lazy dog while we watch this video".split()
+
+
+def corpus(lines, seed=1):
+    rng = random.Random(seed)
+    result = []
+    for n in range(lines):
+        words = rng.choices(WORDS, k=rng.randint(3, 12))
+        if rng.random() < 0.7:
+            url = rng.choice(TEMPLATES).format(id=f"{rng.getrandbits(40):x}", n=n)
+            words.insert(rng.randint(0, len(words)), url)
+        result.append(' '.join(words))
+    return result
+
+
+def legacy(lines, domains):
+    supported = 0
+    for line in lines:
+        for url in LEGACY_PATTERN.findall(line):
+            domain = urlparse(url).netloc.lower()
+            if domain.startswith('www.'):
+                domain = domain[4:]
+            if any(domain.endswith(d) for d in domains):
+                supported += 1
+    return supported
+
+
+def compiled(lines, validator):
+    supported = 0
+    for line in lines:
+        for _, domain in validator.iter_urls(line):
+            if domain:
+                supported += 1
+    return supported
+
+
+def measure(name, func, lines, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        supported = func()
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<9} {best * 1000:9.1f} ms   {len(lines) / best / 1e6:6.2f} M lines/s   "
+          f"{supported} supported URLs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lines = corpus(args.lines)
+    validator = URLValidator()
+    measure('legacy', lambda: legacy(lines, validator.supported_domains), lines, args.repeat)
+    measure('compiled', lambda: compiled(lines, validator), lines, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark the per-URL yt-dlp setup cost with and without session pooling.
+
+"before" builds a fresh YoutubeDL context for every URL, the way
+VideoDownloader.download used to. "after" checks a session out of a
+YoutubeDLSessionPool. Both variants do the per-URL setup work a download
+triggers before any network traffic: opening the cookie jar and
+instantiating the extractors for the supported platforms.
+
+Usage:
+    python benchmarks/bench_ydl_session.py [--iterations N] [--cookies-from-browser BROWSER]
+"""
+import argparse
+import statistics
+import time
+import yt_dlp
+from video_downloader.ydl_session import YoutubeDLSessionPool
+
+EXTRACTORS = ('Youtube', 'Facebook', 'Twitter', 'Instagram')
+
+
+def build_opts(browser):
+    opts = {'quiet': True, 'format': 'bestvideo+bestaudio/best'}
+    if browser:
+        opts['cookiesfrombrowser'] = (browser,)
+    return opts
+
+
+def setup_work(ydl):
+    ydl.cookiejar
+    for ie_key in EXTRACTORS:
+        ydl.get_info_extractor(ie_key)
+
+
+def bench_fresh(iterations, browser):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        with yt_dlp.YoutubeDL(build_opts(browser)) as ydl:
+            setup_work(ydl)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_pooled(iterations, browser):
+    pool = YoutubeDLSessionPool()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        with pool.session('bench', lambda: build_opts(browser)) as ydl:
+            setup_work(ydl)
+        timings.append(time.perf_counter() - started)
+    pool.close()
+    return timings
+
+
+def report(name, timings):
+    print(f"{name:<8} mean {statistics.mean(timings) * 1000:8.2f} ms/URL   "
+          f"median {statistics.median(timings) * 1000:8.2f} ms   "
+          f"first {timings[0] * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--cookies-from-browser', metavar='BROWSER',
+                        help='Also load cookies from this browser for every session')
+    args = parser.parse_args()
+
+    before = bench_fresh(args.iterations, args.cookies_from_browser)
+    after = bench_pooled(args.iterations, args.cookies_from_browser)
+    report('before', before)
+    report('after', after)
+    print(f"speedup  {statistics.mean(before) / statistics.mean(after):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
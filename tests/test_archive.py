@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from video_downloader.archive import MemoryArchive, SQLiteArchive, is_sqlite_file, open_archive
+
+class TestSQLiteArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'archive.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_add_and_lookup(self):
+        archive = SQLiteArchive(self.path)
+        archive.add('youtube:abc')
+        self.assertIn('youtube:abc', archive)
+        self.assertNotIn('youtube:def', archive)
+        archive.close()
+
+        # Entries survive reopening
+        archive = SQLiteArchive(self.path)
+        self.assertIn('youtube:abc', archive)
+        self.assertEqual(len(archive), 1)
+        archive.close()
+
+    def test_batched_writes(self):
+        """Test that pending IDs are visible before they are committed"""
+        writer = SQLiteArchive(self.path, batch_size=3)
+        reader = SQLiteArchive(self.path)
+
+        writer.add('a')
+        writer.add('b')
+        self.assertIn('a', writer)
+        self.assertNotIn('a', reader)
+
+        writer.add('c')
+        self.assertIn('a', reader)
+        self.assertIn('c', reader)
+
+        writer.add('d')
+        writer.close()
+        self.assertIn('d', reader)
+        reader.close()
+
+    def test_watermarks(self):
+        archive = SQLiteArchive(self.path)
+        self.assertEqual(archive.get_watermark('https://www.youtube.com/@someone'), [])
+        archive.set_watermark('https://www.youtube.com/@someone', ['youtube:b', 'youtube:a'])
+        archive.close()
+
+        archive = SQLiteArchive(self.path)
+        self.assertEqual(archive.get_watermark('https://www.youtube.com/@someone'), ['youtube:b', 'youtube:a'])
+        archive.close()
+
+    def test_invalid_sync_mode(self):
+        with self.assertRaises(ValueError):
+            SQLiteArchive(self.path, sync='sometimes')
+
+
+class TestOpenArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.text_path = os.path.join(self.tmpdir.name, 'archive.txt')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_memory_archive_without_path(self):
+        self.assertIsInstance(open_archive(None), MemoryArchive)
+
+    def test_new_archive_is_sqlite(self):
+        archive = open_archive(self.text_path)
+        archive.add('abc')
+        archive.close()
+        self.assertTrue(is_sqlite_file(self.text_path))
+
+    def test_text_archive_migration(self):
+        """Test that text archives are migrated, including later appends"""
+        with open(self.text_path, 'w') as f:
+            f.write("first\nsecond\n")
+
+        archive = open_archive(self.text_path)
+        self.assertEqual(archive.path, self.text_path + '.sqlite3')
+        self.assertIn('first', archive)
+        self.assertIn('second', archive)
+        archive.close()
+
+        # An older version appends to the text file, including a torn last line
+        with open(self.text_path, 'a') as f:
+            f.write("third\nfour")
+
+        archive = open_archive(self.text_path)
+        self.assertIn('third', archive)
+        self.assertNotIn('four', archive)
+        self.assertEqual(len(archive), 3)
+        archive.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import io
+import unittest
+from unittest.mock import MagicMock
+from video_downloader.batch import BatchDownloader
+
+class TestBatchDownloader(unittest.TestCase):
+    def test_iter_urls_is_lazy(self):
+        """Test that URLs are yielded without consuming the whole input"""
+        consumed = []
+
+        def lines():
+            for i in range(1000):
+                consumed.append(i)
+                yield f"https://youtube.com/watch?v={i}\n"
+
+        batch = BatchDownloader(MagicMock())
+        urls = batch.iter_urls(lines())
+        self.assertEqual(next(urls), "https://youtube.com/watch?v=0")
+        self.assertEqual(len(consumed), 1)
+
+    def test_run_summary(self):
+        """Test that results are counted and failures reported"""
+        def download(url):
+            if url.endswith('bad'):
+                raise Exception("Download failed")
+            return not url.endswith('old')
+
+        downloader = MagicMock()
+        downloader.download.side_effect = download
+        source = io.StringIO(
+            "# nightly ingest\n"
+            "https://youtube.com/watch?v=new\n"
+            "https://youtube.com/watch?v=old\n"
+            "\n"
+            "https://youtube.com/watch?v=bad\n"
+            "https://youtube.com/watch?v=new\n"
+            "https://example.com/video\n"
+        )
+
+        summary = BatchDownloader(downloader, workers=2).run(source)
+
+        self.assertEqual(summary.submitted, 3)
+        self.assertEqual(summary.completed, 1)
+        self.assertEqual(summary.skipped, 1)
+        self.assertEqual(summary.failed, 1)
+        self.assertEqual(summary.duplicates, 1)
+        self.assertEqual(summary.unsupported, 1)
+        self.assertEqual(summary.failures, [("https://youtube.com/watch?v=bad", "Download failed")])
+
+    def test_playlists_are_expanded(self):
+        """Test that playlist entries are downloaded and deduplicated like listed URLs"""
+        downloader = MagicMock()
+        downloader.download.return_value = True
+        downloader.iter_entries.return_value = iter([
+            "https://www.youtube.com/watch?v=one",
+            "https://www.youtube.com/watch?v=two",
+        ])
+        source = io.StringIO(
+            "https://www.youtube.com/playlist?list=PL123\n"
+            "https://youtu.be/two\n"
+        )
+
+        summary = BatchDownloader(downloader, workers=2).run(source)
+
+        downloader.iter_entries.assert_called_once_with("https://www.youtube.com/playlist?list=PL123")
+        self.assertEqual(summary.submitted, 2)
+        self.assertEqual(summary.completed, 2)
+        self.assertEqual(summary.duplicates, 1)
+
+if __name__ == '__main__':
+    unittest.main()
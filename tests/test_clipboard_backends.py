@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from video_downloader.clipboard_backends import MemoryBackend, PollingBackend, WatcherBackend, create_backend
+
+class TestPollingBackend(unittest.TestCase):
+    def test_adaptive_backoff(self):
+        """Test that the poll interval grows while idle and resets on change"""
+        content = ['same']
+        backend = PollingBackend(paste=lambda: content[0], min_interval=0.01,
+                                 max_interval=0.04, backoff=2)
+
+        self.assertEqual(backend.wait_for_change('same', timeout=0.1), 'same')
+        self.assertEqual(backend.interval, 0.04)
+
+        content[0] = 'new'
+        self.assertEqual(backend.wait_for_change('same', timeout=0.1), 'new')
+        self.assertEqual(backend.interval, 0.01)
+
+    def test_short_timeouts_keep_backing_off(self):
+        """Test that waking up every second, like the monitor, still slows polling to max_interval"""
+        now = [0.0]
+        reads = []
+
+        def paste():
+            reads.append(now[0])
+            return 'same'
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        backend = PollingBackend(paste=paste)
+        with patch('video_downloader.clipboard_backends.time.monotonic', lambda: now[0]), \
+                patch('video_downloader.clipboard_backends.time.sleep', sleep):
+            for _ in range(60):
+                self.assertEqual(backend.wait_for_change('same', timeout=1), 'same')
+
+        self.assertAlmostEqual(now[0], 60)
+        # Idle for a minute: a few fast polls, then one every max_interval
+        self.assertLessEqual(len(reads), 60 / backend.max_interval + 5)
+        self.assertAlmostEqual(reads[-1] - reads[-2], backend.max_interval)
+
+@patch.object(WatcherBackend, 'RESTART_DELAY_MIN', 0.01)
+class TestWatcherBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.starts = os.path.join(self.tmpdir.name, 'starts')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def watcher(self, script, persistent=True):
+        """Run script as the watcher, after counting its start in self.starts"""
+        command = [sys.executable, '-c', f"open({self.starts!r}, 'a').write('x')\n{script}"]
+        return WatcherBackend('test', command, persistent, paste=lambda: 'copied')
+
+    def count_starts(self):
+        with open(self.starts) as f:
+            return len(f.read())
+
+    def test_exited_watcher_is_restarted(self):
+        # Fails on its first start, then reports a change and keeps running
+        backend = self.watcher(f"import os, sys, time\n"
+                               f"if os.path.getsize({self.starts!r}) == 1: sys.exit(1)\n"
+                               f"print(flush=True)\n"
+                               f"time.sleep(5)")
+        try:
+            self.assertEqual(backend.wait_for_change('', timeout=5), 'copied')
+            self.assertEqual(self.count_starts(), 2)
+            self.assertIsNone(backend._fallback)
+        finally:
+            backend.close()
+
+    def test_falls_back_to_polling(self):
+        backend = self.watcher("raise SystemExit(1)", persistent=False)
+        try:
+            self.assertEqual(backend.wait_for_change('', timeout=5), 'copied')
+            self.assertIsInstance(backend._fallback, PollingBackend)
+            self.assertEqual(self.count_starts(), WatcherBackend.MAX_FAILURES)
+            # Keeps working once the watcher is gone
+            self.assertEqual(backend.wait_for_change('copied', timeout=0.01), 'copied')
+        finally:
+            backend.close()
+
+class TestMemoryBackend(unittest.TestCase):
+    def test_wait_for_change(self):
+        backend = MemoryBackend('old')
+        self.assertEqual(backend.wait_for_change('old', timeout=0.01), 'old')
+
+        timer = threading.Timer(0.05, backend.set_text, args=('new',))
+        timer.start()
+        started = time.monotonic()
+        self.assertEqual(backend.wait_for_change('old', timeout=5), 'new')
+        self.assertLess(time.monotonic() - started, 1)
+        timer.join()
+
+    def test_create_backend(self):
+        self.assertIsInstance(create_backend('memory'), MemoryBackend)
+        with self.assertRaises(ValueError):
+            create_backend('carrier-pigeon')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import errno
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import namedtuple
+from unittest.mock import patch
+from video_downloader.config import Config
+from video_downloader.diskspace import DiskSpaceGuard, InsufficientDiskSpace, estimate_size, move_file
+from video_downloader.downloader import VideoDownloader
+
+Usage = namedtuple('Usage', 'total used free')
+
+
+class TestDiskSpaceGuard(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.free = 1000
+        self.guard = DiskSpaceGuard(min_free=100, poll_interval=0.01,
+                                    disk_usage=lambda path: Usage(0, 0, self.free))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_waits_for_reservations_to_be_released(self):
+        self.guard.reserve('a', {self.tmpdir.name: 600})
+        reserved = threading.Event()
+
+        def reserve():
+            self.guard.reserve('b', {self.tmpdir.name: 600})
+            reserved.set()
+
+        thread = threading.Thread(target=reserve)
+        thread.start()
+        self.assertFalse(reserved.wait(0.1))
+        self.guard.release('a')
+        self.assertTrue(reserved.wait(1))
+        thread.join()
+        self.assertEqual(self.guard.reserved(), 600)
+
+    def test_pauses_below_threshold(self):
+        self.free = 50
+        thread = threading.Thread(target=self.guard.reserve, args=('a', {self.tmpdir.name: 0}))
+        thread.start()
+        time.sleep(0.05)
+        self.assertTrue(thread.is_alive())
+        # Space freed outside the downloader is noticed by polling
+        self.free = 500
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def test_job_larger_than_disk_fails_immediately(self):
+        with self.assertRaises(InsufficientDiskSpace):
+            self.guard.reserve('a', {self.tmpdir.name: 5000})
+        self.assertEqual(self.guard.reserved(), 0)
+
+    def test_directories_on_one_filesystem_add_up(self):
+        other = os.path.join(self.tmpdir.name, 'other')
+        os.mkdir(other)
+        with self.assertRaises(InsufficientDiskSpace):
+            self.guard.reserve('a', {self.tmpdir.name: 500, other: 500})
+
+    def test_estimate_size(self):
+        self.assertEqual(estimate_size({'filesize': 10}), 10)
+        self.assertEqual(estimate_size({'requested_formats': [{'filesize': 10}, {'filesize_approx': 5}]}), 15)
+        self.assertEqual(estimate_size({}), 0)
+
+
+class TestMoveFile(unittest.TestCase):
+    def test_move_across_filesystems(self):
+        with tempfile.TemporaryDirectory() as scratch, tempfile.TemporaryDirectory() as final:
+            src = os.path.join(scratch, 'video.mp4')
+            dst = os.path.join(final, 'video.mp4')
+            with open(src, 'wb') as f:
+                f.write(b'video')
+            replace = os.replace
+            calls = []
+
+            def cross_device(a, b):
+                calls.append((a, b))
+                if a == src:
+                    raise OSError(errno.EXDEV, 'Invalid cross-device link')
+                replace(a, b)
+
+            with patch('video_downloader.diskspace.os.replace', side_effect=cross_device):
+                move_file(src, dst)
+
+            # Copied under a temporary name, then renamed into place
+            self.assertEqual(calls[1], (os.path.join(final, '.video.mp4.moving'), dst))
+            self.assertFalse(os.path.exists(src))
+            self.assertEqual(os.listdir(final), ['video.mp4'])
+            with open(dst, 'rb') as f:
+                self.assertEqual(f.read(), b'video')
+
+
+class TestScratchDirectory(unittest.TestCase):
+    @patch('yt_dlp.YoutubeDL')
+    def test_downloads_are_moved_from_scratch(self, mock_ytdl):
+        with tempfile.TemporaryDirectory() as downloads, tempfile.TemporaryDirectory() as scratch:
+            config = Config()
+            config.download_path = downloads
+            config.disk = {**config.disk, 'scratch_directory': scratch}
+            downloader = VideoDownloader(config, {'show_progress': False, 'info_cache': False,
+                                                  'cookies_from_browser': None})
+            self.assertTrue(downloader._build_ydl_opts()['outtmpl'].startswith(scratch))
+
+            def process_info(info):
+                self.assertEqual(downloader.disk.reserved(), 2048)
+                path = os.path.join(scratch, 'Video.mp4')
+                with open(path, 'wb') as f:
+                    f.write(b'video bytes')
+                info['filepath'] = path
+
+            ydl = mock_ytdl.return_value.__enter__.return_value
+            ydl.process_ie_result.return_value = {'id': 'abc123', 'title': 'Video', 'ext': 'mp4', 'filesize': 2048}
+            ydl.process_info.side_effect = process_info
+
+            self.assertTrue(downloader.download("https://youtube.com/watch?v=abc123"))
+            downloader.close()
+
+            self.assertEqual(os.listdir(scratch), [])
+            self.assertEqual(os.listdir(downloads), ['Video.mp4'])
+            self.assertEqual(downloader.disk.reserved(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,36 +1,82 @@
+import tempfile
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 from video_downloader.downloader import VideoDownloader
+from video_downloader.clipboard_backends import MemoryBackend
 from video_downloader.clipboard_monitor import ClipboardMonitor
 from video_downloader.config import Config
+from video_downloader.info_cache import InfoCache
 
 class TestDownloader(unittest.TestCase):
     def setUp(self):
         self.config = Config()
-        self.downloader = VideoDownloader(self.config)
+        # Keep the tests away from the user's info cache and browser cookies
+        self.options = {'info_cache': False, 'cookies_from_browser': None}
+        self.downloader = VideoDownloader(self.config, self.options)
 
     @patch('yt_dlp.YoutubeDL')
     def test_download_success(self, mock_ytdl):
         # Mock the YoutubeDL instance
         mock_ytdl_instance = MagicMock()
         mock_ytdl.return_value.__enter__.return_value = mock_ytdl_instance
+        mock_ytdl_instance.process_ie_result.return_value = {'id': 'test123', 'filesize': 1024}
 
         test_url = "https://youtube.com/watch?v=test123"
         self.downloader.download(test_url)
 
-        # Verify download was called
-        mock_ytdl_instance.download.assert_called_once_with([test_url])
+        # Verify the video was extracted, its formats selected and then downloaded
+        mock_ytdl_instance.extract_info.assert_called_once_with(test_url, download=False, process=False)
+        mock_ytdl_instance.process_ie_result.assert_called_once_with(
+            mock_ytdl_instance.extract_info.return_value, download=False)
+        mock_ytdl_instance.process_info.assert_called_once_with(mock_ytdl_instance.process_ie_result.return_value)
+        self.assertEqual(self.downloader.disk.reserved(), 0)
 
     @patch('yt_dlp.YoutubeDL')
     def test_download_failure(self, mock_ytdl):
         # Mock YoutubeDL to raise an exception
-        mock_ytdl.return_value.__enter__.return_value.download.side_effect = Exception("Download failed")
+        mock_ytdl.return_value.__enter__.return_value.process_ie_result.side_effect = Exception("Download failed")
 
         test_url = "https://youtube.com/watch?v=test123"
 
         with self.assertRaises(Exception):
             self.downloader.download(test_url)
 
+    @patch('video_downloader.retry.time.sleep')
+    @patch('yt_dlp.YoutubeDL')
+    def test_transient_failure_is_resumed(self, mock_ytdl, mock_sleep):
+        """Test that a download interrupted by a network error is retried"""
+        from yt_dlp.utils import DownloadError
+        mock_ytdl_instance = mock_ytdl.return_value.__enter__.return_value
+        mock_ytdl_instance.process_ie_result.return_value = {'id': 'flaky'}
+        mock_ytdl_instance.process_info.side_effect = [DownloadError("Connection reset by peer"), None]
+
+        self.assertTrue(self.downloader.download("https://youtube.com/watch?v=flaky"))
+        self.assertEqual(mock_ytdl_instance.process_info.call_count, 2)
+        mock_sleep.assert_called_once()
+
+        ydl_opts = mock_ytdl.call_args[0][0]
+        self.assertTrue(ydl_opts['continuedl'])
+        self.assertEqual(ydl_opts['concurrent_fragment_downloads'], 4)
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_session_reused_across_downloads(self, mock_ytdl):
+        """Test that one YoutubeDL instance serves consecutive downloads"""
+        self.downloader.download("https://youtube.com/watch?v=one")
+        self.downloader.download("https://youtube.com/watch?v=two")
+
+        self.assertEqual(mock_ytdl.call_count, 1)
+        self.assertEqual(mock_ytdl.return_value.__enter__.return_value.process_ie_result.call_count, 2)
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_expired_session_is_refreshed(self, mock_ytdl):
+        """Test that sessions older than the cookie TTL are recreated"""
+        self.downloader.sessions.cookie_ttl = 0
+        self.downloader.download("https://youtube.com/watch?v=one")
+        self.downloader.download("https://youtube.com/watch?v=two")
+
+        self.assertEqual(mock_ytdl.call_count, 2)
+
     def test_duplicate_download_prevention(self):
         """Test that the same URL is not downloaded twice"""
         test_url = "https://youtube.com/watch?v=abc123"
@@ -40,19 +86,210 @@ class TestDownloader(unittest.TestCase):
             mock_ytdl_instance = MagicMock()
             mock_ytdl.return_value.__enter__.return_value = mock_ytdl_instance
             self.downloader.download(test_url)
-            mock_ytdl_instance.download.assert_called_once()
+            mock_ytdl_instance.process_ie_result.assert_called_once()
 
         # Second download should be skipped
         with patch('yt_dlp.YoutubeDL') as mock_ytdl:
             mock_ytdl_instance = MagicMock()
             mock_ytdl.return_value.__enter__.return_value = mock_ytdl_instance
             self.downloader.download(test_url)
-            mock_ytdl_instance.download.assert_not_called()
+            mock_ytdl_instance.process_ie_result.assert_not_called()
+
+        metrics = self.downloader.metrics.snapshot()['metrics']
+        self.assertEqual(metrics['video_downloader_downloads_total'], 1)
+        self.assertEqual(metrics['video_downloader_dedupe_hits_total'], {'archive': 1})
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_failures_counted_by_error_class(self, mock_ytdl):
+        mock_ytdl.return_value.__enter__.return_value.process_ie_result.side_effect = ValueError("bad")
+
+        with self.assertRaises(ValueError):
+            self.downloader.download("https://youtube.com/watch?v=broken")
+
+        metrics = self.downloader.metrics.snapshot()['metrics']
+        self.assertEqual(metrics['video_downloader_failures_total'], {'ValueError': 1})
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_extraction_is_cached(self, mock_ytdl):
+        """Test that retries and other quality settings reuse the extracted info"""
+        from yt_dlp.utils import DownloadError
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = InfoCache(directory=cache_dir)
+            mock_ytdl_instance = mock_ytdl.return_value.__enter__.return_value
+            mock_ytdl_instance.extract_info.side_effect = lambda url, **kwargs: {
+                'id': 'abc123', 'title': 'Test video', 'formats': []
+            }
+            mock_ytdl_instance.process_ie_result.side_effect = lambda info, download: dict(info)
+            mock_ytdl_instance.process_info.side_effect = [
+                DownloadError("Connection reset by peer"), None, None
+            ]
+
+            self.downloader.info_cache = cache
+            with patch('video_downloader.retry.time.sleep'):
+                self.downloader.download("https://youtube.com/watch?v=abc123")
+
+            other_quality = VideoDownloader(self.config, {**self.options, 'quality': '480p'})
+            other_quality.info_cache = cache
+            other_quality.download("https://youtu.be/abc123")
+
+            self.assertEqual(mock_ytdl_instance.extract_info.call_count, 1)
+            self.assertEqual(mock_ytdl_instance.process_info.call_count, 3)
+            self.assertEqual(cache.stats()['hits'], 2)
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_expired_cached_info_is_extracted_again(self, mock_ytdl):
+        """Test that a 403 on the stream URLs of cached info refreshes the entry"""
+        from yt_dlp.utils import DownloadError
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = InfoCache(directory=cache_dir)
+            cache.put('youtube:abc123', {'id': 'abc123', 'url': 'https://stale.example/v.mp4'})
+            mock_ytdl_instance = mock_ytdl.return_value.__enter__.return_value
+            mock_ytdl_instance.extract_info.return_value = {'id': 'abc123', 'url': 'https://fresh.example/v.mp4'}
+            mock_ytdl_instance.process_ie_result.side_effect = lambda info, download: dict(info)
+
+            def process_info(info):
+                if 'stale' in info['url']:
+                    raise DownloadError("ERROR: unable to download video data: HTTP Error 403: Forbidden")
+
+            mock_ytdl_instance.process_info.side_effect = process_info
+            self.downloader.info_cache = cache
+
+            self.assertTrue(self.downloader.download("https://youtube.com/watch?v=abc123"))
+            self.assertEqual(mock_ytdl_instance.extract_info.call_count, 1)
+            self.assertEqual(mock_ytdl_instance.process_info.call_count, 2)
+            self.assertEqual(cache.get('youtube:abc123')['url'], 'https://fresh.example/v.mp4')
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_expired_cached_info_is_refetched(self, mock_ytdl):
+        """Test that fetch() of the pipeline and post-processing pool refreshes expired info"""
+        from yt_dlp.utils import DownloadError
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = InfoCache(directory=cache_dir)
+            cache.put('youtube:abc123', {'id': 'abc123', 'url': 'https://stale.example/v.mp4'})
+            mock_ytdl_instance = mock_ytdl.return_value.__enter__.return_value
+            mock_ytdl_instance.extract_info.return_value = {'id': 'abc123', 'url': 'https://fresh.example/v.mp4'}
+            mock_ytdl_instance.process_ie_result.side_effect = lambda info, download: {
+                **info, 'webpage_url': "https://www.youtube.com/watch?v=abc123"}
+            mock_ytdl_instance.prepare_filename.return_value = f"{cache_dir}/Video.mp4"
+
+            def dl(name, info):
+                if 'stale' in info['url']:
+                    raise DownloadError("ERROR: unable to download video data: HTTP Error 410: Gone")
+                return True, None
+
+            mock_ytdl_instance.dl.side_effect = dl
+            self.downloader.info_cache = cache
+
+            info = self.downloader.extract_info("https://youtube.com/watch?v=abc123")
+            self.assertEqual(self.downloader.fetch(info), (f"{cache_dir}/Video.mp4", []))
+            self.assertEqual(info['url'], 'https://fresh.example/v.mp4')
+            self.assertEqual(mock_ytdl_instance.extract_info.call_count, 1)
+            self.assertEqual(mock_ytdl_instance.dl.call_count, 2)
+
+    def test_cookie_browser_detected_once(self):
+        """Test that the first browser with readable cookies is used"""
+        with patch('yt_dlp.cookies.extract_cookies_from_browser',
+                   side_effect=[Exception("no chrome"), MagicMock()]) as mock_extract:
+            downloader = VideoDownloader(self.config, {'info_cache': False})
+            self.assertEqual(downloader._build_ydl_opts()['cookiesfrombrowser'], ('firefox',))
+            self.assertEqual(downloader._build_ydl_opts()['cookiesfrombrowser'], ('firefox',))
+            self.assertEqual(mock_extract.call_count, 2)
+
+        self.assertEqual(VideoDownloader(self.config, {'cookies_from_browser': 'edge'})
+                         ._build_ydl_opts()['cookiesfrombrowser'], ('edge',))
+        self.assertNotIn('cookiesfrombrowser',
+                         VideoDownloader(self.config, {'cookies_from_browser': None})._build_ydl_opts())
+
+    def test_duplicate_detection_uses_canonical_id(self):
+        """Test that different URLs for the same video are downloaded once"""
+        with patch('yt_dlp.YoutubeDL') as mock_ytdl:
+            mock_ytdl_instance = MagicMock()
+            mock_ytdl.return_value.__enter__.return_value = mock_ytdl_instance
+            self.assertTrue(self.downloader.download("https://youtu.be/abc123"))
+            self.assertFalse(self.downloader.download("https://m.youtube.com/watch?v=abc123&t=30"))
+            mock_ytdl_instance.process_ie_result.assert_called_once()
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_playlist_expanded_lazily(self, mock_ytdl):
+        """Test that playlist entries are yielded as listed, skipping archived videos"""
+        listed = []
+
+        def entries(ids):
+            for video_id in ids:
+                listed.append(video_id)
+                yield {'_type': 'url', 'id': video_id, 'url': f"https://www.youtube.com/watch?v={video_id}"}
+
+        def extract_info(url, **kwargs):
+            if 'list=nested' in url:
+                return {'_type': 'playlist', 'entries': entries(['n1'])}
+            return {'_type': 'playlist', 'entries': [
+                *entries(['a1', 'old']),
+                {'_type': 'url', 'url': "https://www.youtube.com/playlist?list=nested"},
+                *entries(['a2']),
+            ]}
+
+        mock_ytdl_instance = mock_ytdl.return_value.__enter__.return_value
+        mock_ytdl_instance.extract_info.side_effect = extract_info
+        self.downloader.archive.add('youtube:old')
+
+        urls = self.downloader.iter_entries("https://www.youtube.com/playlist?list=top")
+        self.assertEqual(next(urls), "https://www.youtube.com/watch?v=a1")
+        self.assertEqual(list(urls), [
+            "https://www.youtube.com/watch?v=n1",
+            "https://www.youtube.com/watch?v=a2",
+        ])
+        for call in mock_ytdl_instance.extract_info.call_args_list:
+            self.assertEqual(call.kwargs, {'download': False, 'process': False})
+        self.assertTrue(mock_ytdl.call_args[0][0]['noplaylist'])
+
+        metrics = self.downloader.metrics.snapshot()['metrics']
+        self.assertEqual(metrics['video_downloader_dedupe_hits_total'], {'archive': 1})
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_single_video_is_not_expanded(self, mock_ytdl):
+        mock_ytdl.return_value.__enter__.return_value.extract_info.return_value = {
+            'id': 'abc123', 'webpage_url': "https://www.youtube.com/watch?v=abc123"
+        }
+        self.assertEqual(list(self.downloader.iter_entries("https://youtu.be/abc123")),
+                         ["https://www.youtube.com/watch?v=abc123"])
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_playlist_downloaded_video_by_video(self, mock_ytdl):
+        """Test that a playlist given to download() is claimed and archived per video"""
+        from yt_dlp.utils import DownloadError
+
+        def extract_info(url, **kwargs):
+            if 'list=' in url:
+                return {'_type': 'playlist', 'entries': [
+                    {'_type': 'url', 'id': video_id, 'url': f"https://www.youtube.com/watch?v={video_id}"}
+                    for video_id in ('a1', 'old', 'a2')]}
+            return {'id': url.rsplit('=', 1)[1], 'webpage_url': url}
+
+        def process_info(info):
+            if info['id'] == 'a2':
+                raise ValueError("bad")
+
+        mock_ytdl_instance = mock_ytdl.return_value.__enter__.return_value
+        mock_ytdl_instance.extract_info.side_effect = extract_info
+        mock_ytdl_instance.process_ie_result.side_effect = lambda info, download: dict(info)
+        mock_ytdl_instance.process_info.side_effect = process_info
+        self.downloader.archive.add('youtube:old')
+
+        with self.assertRaises(DownloadError):
+            self.downloader.download("https://www.youtube.com/playlist?list=top")
+
+        processed = [call.args[0]['id'] for call in mock_ytdl_instance.process_info.call_args_list]
+        self.assertEqual(processed, ['a1', 'a2'])
+        self.assertIn('youtube:a1', self.downloader.archive)
+        self.assertNotIn('youtube:a2', self.downloader.archive)
+        metrics = self.downloader.metrics.snapshot()['metrics']
+        self.assertEqual(metrics['video_downloader_downloads_total'], 1)
 
 class TestClipboardMonitor(unittest.TestCase):
     def setUp(self):
         self.config = Config()
-        self.monitor = ClipboardMonitor(self.config)
+        self.clipboard = MemoryBackend()
+        self.monitor = ClipboardMonitor(self.config, backend=self.clipboard)
 
     def test_duplicate_url_handling(self):
         """Test that duplicate URLs are not processed twice"""
@@ -63,6 +300,7 @@ class TestClipboardMonitor(unittest.TestCase):
 
         # First processing should trigger download
         self.monitor.process_clipboard_content(test_content)
+        self.monitor.worker_pool.join()
         self.monitor.downloader.download.assert_called_once()
 
         # Reset mock to verify second call
@@ -70,6 +308,7 @@ class TestClipboardMonitor(unittest.TestCase):
 
         # Second processing should not trigger download
         self.monitor.process_clipboard_content(test_content)
+        self.monitor.worker_pool.join()
         self.monitor.downloader.download.assert_not_called()
 
     def test_multiple_urls_duplicate_handling(self):
@@ -85,9 +324,74 @@ class TestClipboardMonitor(unittest.TestCase):
 
         # Process content
         self.monitor.process_clipboard_content(test_content)
+        self.monitor.worker_pool.join()
 
         # Should only download unique URLs
         self.assertEqual(self.monitor.downloader.download.call_count, 2)
 
+    def test_playlist_url_is_expanded(self):
+        """Test that a copied playlist queues its videos once each"""
+        self.monitor.downloader.download = MagicMock()
+        self.monitor.downloader.iter_entries = MagicMock(return_value=iter([
+            "https://www.youtube.com/watch?v=abc123",
+            "https://www.youtube.com/watch?v=def456",
+        ]))
+
+        self.monitor.process_clipboard_content(
+            "https://youtube.com/watch?v=abc123 https://www.youtube.com/playlist?list=PL123")
+        self.monitor.expander.join()
+        self.monitor.worker_pool.join()
+        self.monitor.expander.close()
+
+        self.monitor.downloader.iter_entries.assert_called_once_with(
+            "https://www.youtube.com/playlist?list=PL123")
+        downloaded = [c.args[0] for c in self.monitor.downloader.download.call_args_list]
+        self.assertCountEqual(downloaded, [
+            "https://youtube.com/watch?v=abc123",
+            "https://www.youtube.com/watch?v=def456",
+        ])
+
+    def test_monitoring_loop(self):
+        """Test that copied URLs are picked up by the monitoring loop"""
+        downloaded = threading.Event()
+        self.monitor.downloader.download = MagicMock(side_effect=lambda url: downloaded.set())
+
+        thread = threading.Thread(target=self.monitor.start_monitoring)
+        thread.start()
+        try:
+            self.clipboard.set_text("https://youtube.com/watch?v=abc123")
+            self.assertTrue(downloaded.wait(5))
+        finally:
+            self.monitor.stop()
+            thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.monitor.downloader.download.assert_called_once_with("https://youtube.com/watch?v=abc123")
+
+    def test_stop_waits_for_running_downloads(self):
+        """Test that the archive is only closed once running downloads are recorded"""
+        started, release = threading.Event(), threading.Event()
+        events = []
+
+        def download(url):
+            started.set()
+            release.wait(5)
+            events.append('downloaded')
+
+        self.monitor.downloader.download = MagicMock(side_effect=download)
+        self.monitor.downloader.close = MagicMock(side_effect=lambda: events.append('closed'))
+
+        thread = threading.Thread(target=self.monitor.start_monitoring)
+        thread.start()
+        self.clipboard.set_text("https://youtube.com/watch?v=abc123")
+        self.assertTrue(started.wait(5))
+        self.monitor.stop()
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+
+        release.set()
+        thread.join(5)
+        self.assertEqual(events, ['downloaded', 'closed'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
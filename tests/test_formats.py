@@ -0,0 +1,82 @@
+import unittest
+import yt_dlp
+from video_downloader.config import Config
+from video_downloader.downloader import VideoDownloader
+from video_downloader.formats import format_selector
+
+
+def _format(format_id, height, vcodec, acodec, filesize, ext='mp4', fps=30):
+    return {
+        'format_id': format_id, 'url': f'https://example.com/{format_id}', 'protocol': 'https',
+        'height': height, 'fps': fps, 'vcodec': vcodec, 'acodec': acodec, 'filesize': filesize, 'ext': ext,
+    }
+
+
+FORMATS = [
+    _format('18', 360, 'avc1.42001E', 'mp4a.40.2', 10_000_000),
+    _format('22', 720, 'avc1.64001F', 'mp4a.40.2', 60_000_000),
+    _format('136', 720, 'avc1.4d401f', 'none', 50_000_000),
+    _format('298', 720, 'avc1.4d4020', 'none', 70_000_000, fps=60),
+    _format('137', 1080, 'avc1.640028', 'none', 150_000_000),
+    _format('248', 1080, 'vp9', 'none', 120_000_000, 'webm'),
+    _format('313', 2160, 'vp9', 'none', 900_000_000, 'webm'),
+    _format('399', 1080, 'av01.0.08M.08', 'none', 100_000_000),
+    _format('140', None, 'none', 'mp4a.40.2', 5_000_000, 'm4a'),
+    _format('251', None, 'none', 'opus', 5_000_000, 'webm'),
+]
+
+
+def select(selector, formats=FORMATS, container='mp4'):
+    """Return the format_id yt-dlp selects from formats"""
+    ydl = yt_dlp.YoutubeDL({'format': selector, 'quiet': True, 'merge_output_format': container})
+    info = {
+        'id': 'abc123', 'title': 'Test video', 'extractor': 'test', 'extractor_key': 'Test',
+        'webpage_url': 'https://example.com/watch', 'formats': [dict(f) for f in formats],
+    }
+    return ydl.process_ie_result(info, download=False)['format_id']
+
+
+class TestFormatSelector(unittest.TestCase):
+    def test_single_file_preferred_at_quality(self):
+        self.assertEqual(select(format_selector('720p')), '22')
+        self.assertEqual(select(format_selector('480p')), '18')
+        # The single file is too small for 1080p, so streams are merged
+        self.assertEqual(select(format_selector('best', profile={'max_height': 1080})), '399+251')
+
+    def test_medium_caps_frame_rate(self):
+        without_single = [f for f in FORMATS if f['format_id'] != '22']
+        self.assertEqual(select(format_selector('720p'), without_single), '298+251')
+        self.assertEqual(select(format_selector('medium'), without_single), '136+251')
+
+    def test_codecs_match_container(self):
+        selector = format_selector('best', 'webm', {'max_height': 1080})
+        without_av1 = [f for f in FORMATS if f['format_id'] != '399']
+        self.assertEqual(select(selector, without_av1, 'webm'), '248+251')
+        # Without Opus or Vorbis audio any audio stream is taken
+        without_opus = [f for f in without_av1 if f['format_id'] != '251']
+        self.assertEqual(select(selector, without_opus, 'webm'), '248+140')
+
+    def test_storage_budget(self):
+        self.assertEqual(select(format_selector('best', profile={'max_filesize': '110M'})), '399+251')
+        self.assertEqual(select(format_selector('best', profile={'max_filesize': '20M'})), '18')
+
+    def test_profile_can_disable_preferences(self):
+        selector = format_selector('best', 'mkv', {'prefer_single_file': False, 'match_container': False})
+        self.assertEqual(selector, 'bv+ba/b')
+
+
+class TestFormatProfiles(unittest.TestCase):
+    def test_platform_profile(self):
+        config = Config()
+        config.formats = {**config.formats, 'platforms': {'youtube.com': {'max_height': 480}}}
+        downloader = VideoDownloader(config, {'cookies_from_browser': None})
+
+        self.assertEqual(downloader._format_platform('https://www.youtube.com/watch?v=abc123'), 'youtube.com')
+        self.assertIsNone(downloader._format_platform('https://twitter.com/user/status/1'))
+        self.assertEqual(select(downloader._build_ydl_opts('youtube.com')['format']), '18')
+        self.assertEqual(select(downloader._build_ydl_opts()['format']), '313+251')
+        self.assertNotEqual(downloader._session_key('youtube.com'), downloader._session_key())
+
+
+if __name__ == '__main__':
+    unittest.main()
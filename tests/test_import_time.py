@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported by the commands that need them, never by the CLI module itself
+HEAVY_MODULES = ('yt_dlp', 'rich', 'yaml', 'pyperclip', 'asyncio', 'sqlite3', 'http.server')
+
+# Generous, to catch a heavy import sneaking back in rather than measure noise
+IMPORT_BUDGET_US = int(os.environ.get('VIDEO_DOWNLOADER_IMPORT_BUDGET_US', 400000))
+
+
+def import_times(module, cwd):
+    """Import module in a fresh interpreter and return {name: cumulative microseconds}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=cwd,
+        env={**os.environ, 'PYTHONPATH': ROOT}
+    )
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_cli_import_is_light(self):
+        times = import_times('video_downloader.cli', self.tmpdir.name)
+
+        heavy = sorted(name for name in times
+                       if any(name == m or name.startswith(m + '.') for m in HEAVY_MODULES))
+        self.assertEqual(heavy, [])
+        self.assertLess(times['video_downloader.cli'], IMPORT_BUDGET_US)
+
+    def test_help_does_not_touch_the_filesystem(self):
+        result = subprocess.run(
+            [sys.executable, '-m', 'video_downloader.cli', '--help'],
+            capture_output=True, text=True, cwd=self.tmpdir.name,
+            env={**os.environ, 'PYTHONPATH': ROOT}
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('serve', result.stdout)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+if __name__ == '__main__':
+    unittest.main()
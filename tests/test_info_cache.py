@@ -0,0 +1,60 @@
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from video_downloader.info_cache import InfoCache
+
+class TestInfoCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.info = {'id': 'abc', 'title': 'Video', 'formats': [{'format_id': '18'}]}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hit_and_miss(self):
+        cache = InfoCache()
+        self.assertIsNone(cache.get('youtube:abc'))
+        cache.put('youtube:abc', self.info)
+
+        cached = cache.get('youtube:abc')
+        self.assertEqual(cached, self.info)
+        cached['title'] = 'Modified'
+        self.assertEqual(cache.get('youtube:abc')['title'], 'Video')
+
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_ttl(self):
+        cache = InfoCache(directory=self.tmpdir.name, ttl=60)
+        cache.put('youtube:abc', self.info)
+        with patch('video_downloader.info_cache.time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get('youtube:abc'))
+
+    def test_lru_eviction(self):
+        cache = InfoCache(memory_entries=2)
+        cache.put('a', self.info)
+        cache.put('b', self.info)
+        cache.get('a')
+        cache.put('c', self.info)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_disk_persistence(self):
+        """Test that entries survive in the disk cache across instances"""
+        InfoCache(directory=self.tmpdir.name).put('youtube:abc', self.info)
+        cache = InfoCache(directory=self.tmpdir.name)
+        self.assertEqual(cache.get('youtube:abc'), self.info)
+
+        cache.invalidate('youtube:abc')
+        self.assertIsNone(InfoCache(directory=self.tmpdir.name).get('youtube:abc'))
+
+    def test_unserializable_info_is_not_cached(self):
+        cache = InfoCache()
+        self.assertFalse(cache.put('youtube:abc', {'__post_extractor': lambda: None}))
+        self.assertIsNone(cache.get('youtube:abc'))
+
+if __name__ == '__main__':
+    unittest.main()
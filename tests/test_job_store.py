@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from video_downloader.job_store import JobStore
+from video_downloader.worker_pool import DownloadJob, DownloadWorkerPool
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'jobs.db')
+        self.store = JobStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_job_lifecycle(self):
+        job = DownloadJob("https://youtu.be/abc")
+        self.store.add(job)
+        job.state = DownloadJob.RUNNING
+        self.store.mark_running(job)
+        job.state, job.error = DownloadJob.FAILED, "HTTP Error 500"
+        self.store.mark_finished(job)
+
+        stored = JobStore(self.path).get(job.id)
+        self.assertEqual((stored.url, stored.state, stored.attempts, stored.error),
+                         (job.url, DownloadJob.FAILED, 1, "HTTP Error 500"))
+        # Failed videos may be submitted again, queued or downloaded ones not
+        self.assertFalse(self.store.has_video('youtube:abc'))
+        self.store.add(DownloadJob("https://www.youtube.com/watch?v=abc"))
+        self.assertTrue(self.store.has_video('youtube:abc'))
+
+    def restart(self):
+        """Simulate the next run of the process"""
+        self.store.close()
+        self.store = JobStore(self.path)
+        return self.store
+
+    def test_recover_running_jobs(self):
+        job = DownloadJob("https://youtu.be/abc")
+        self.store.add(job)
+        self.store.mark_running(job)
+        queued = DownloadJob("https://youtu.be/queued")
+        self.store.add(queued)
+
+        # Jobs of the store's own run are never taken over
+        self.assertEqual(self.store.recover(), 0)
+        self.assertEqual(self.restart().recover(), 1)
+        self.assertEqual(self.store.counts(), {DownloadJob.QUEUED: 2})
+        self.assertEqual([j.id for j in self.store.iter_recovered()], [job.id, queued.id])
+
+    def test_recovery_gives_up_after_max_attempts(self):
+        job = DownloadJob("https://youtu.be/crash")
+        self.store.add(job)
+        for attempt in range(3):
+            self.store.mark_running(job)
+            self.assertEqual(self.restart().recover(), 1 if attempt < 2 else 0)
+
+        stored = self.store.get(job.id)
+        self.assertEqual((stored.state, stored.attempts), (DownloadJob.FAILED, 3))
+        self.assertIn("giving up", stored.error)
+
+    def test_live_processes_keep_their_jobs(self):
+        running, queued = DownloadJob("https://youtu.be/a"), DownloadJob("https://youtu.be/b")
+        self.store.add(running)
+        self.store.mark_running(running)
+        self.store.add(queued)
+
+        other = JobStore(self.path)
+        try:
+            self.assertEqual(other.recover(), 0)
+            self.assertEqual(list(other.iter_recovered()), [])
+            self.assertEqual(self.store.get(running.id).state, DownloadJob.RUNNING)
+        finally:
+            other.close()
+
+        # Once the lease expires without a heartbeat, e.g. after a crash
+        time.sleep(0.05)
+        other = JobStore(self.path, lease_timeout=0.01)
+        try:
+            self.assertEqual(other.recover(), 1)
+            self.assertEqual([j.id for j in other.iter_recovered()], [running.id, queued.id])
+        finally:
+            other.close()
+
+    def test_iteration_is_paginated(self):
+        for i in range(25):
+            self.store.add(DownloadJob(f"https://youtu.be/v{i}"))
+        urls = [job.url for job in self.store.iter_jobs(DownloadJob.QUEUED, batch_size=10)]
+        self.assertEqual(urls, [f"https://youtu.be/v{i}" for i in range(25)])
+        self.assertEqual(len(list(self.store.iter_jobs(limit=7, batch_size=5))), 7)
+
+    def test_jobs_listed_by_parent(self):
+        playlist = DownloadJob("https://www.youtube.com/playlist?list=PL1")
+        self.store.add(playlist)
+        self.store.add(DownloadJob("https://youtu.be/a1", parent=playlist.id))
+        self.store.add(DownloadJob("https://youtu.be/other"))
+
+        children = list(self.store.iter_jobs(parent=playlist.id))
+        self.assertEqual([(job.url, job.parent) for job in children], [("https://youtu.be/a1", playlist.id)])
+
+    def test_store_without_parent_column_is_upgraded(self):
+        path = os.path.join(self.tmpdir.name, 'old.db')
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE jobs (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, '
+                     'url TEXT NOT NULL, video_id TEXT, state TEXT NOT NULL, attempts INTEGER NOT NULL '
+                     'DEFAULT 0, error TEXT, created_at REAL, started_at REAL, finished_at REAL)')
+        conn.execute("INSERT INTO jobs (id, url, state) VALUES ('old', 'https://youtu.be/a', 'queued')")
+        conn.commit()
+        conn.close()
+
+        store = JobStore(path)
+        try:
+            self.assertIsNone(store.get('old').parent)
+            store.add(DownloadJob("https://youtu.be/b", parent='old'))
+            self.assertEqual(len(list(store.iter_jobs(parent='old'))), 1)
+        finally:
+            store.close()
+
+class TestPoolRecovery(unittest.TestCase):
+    def test_queued_jobs_survive_restart(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'jobs.db')
+            started, release = threading.Event(), threading.Event()
+
+            def stuck(url):
+                started.set()
+                release.wait(5)
+
+            store = JobStore(path)
+            pool = DownloadWorkerPool(stuck, workers=1, store=store)
+            jobs = [pool.submit(f"https://youtu.be/v{i}") for i in range(3)]
+            started.wait(5)
+
+            # Simulate a crash: the first job is running, the others are queued
+            pool.shutdown(wait=False, cancel_pending=True)
+            store.close()
+            release.set()
+
+            store = JobStore(path)
+            done = []
+            pool = DownloadWorkerPool(done.append, workers=2, store=store)
+            self.assertEqual(pool.recover(), 3)
+            pool.join()
+            pool.shutdown()
+
+            self.assertEqual(sorted(done), sorted(job.url for job in jobs))
+            self.assertEqual(store.counts(), {DownloadJob.COMPLETED: 3})
+            self.assertEqual(store.get(jobs[0].id).attempts, 2)
+            store.close()
+
+if __name__ == '__main__':
+    unittest.main()
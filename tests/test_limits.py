@@ -0,0 +1,84 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from video_downloader.limits import TokenBucket, TransferLimiter
+
+PLATFORMS = ['youtube.com', 'youtu.be', 'twitter.com']
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve(self):
+        now = [0.0]
+        bucket = TokenBucket(100, clock=lambda: now[0])
+
+        self.assertEqual(bucket.reserve(100), 0.0)
+        self.assertEqual(bucket.reserve(50), 0.5)
+        # Debt accumulates, so a second caller waits behind the first
+        self.assertEqual(bucket.reserve(50), 1.0)
+
+        now[0] = 2.0
+        self.assertEqual(bucket.reserve(100), 0.0)
+
+class TestTransferLimiter(unittest.TestCase):
+    def test_host_grouping(self):
+        limiter = TransferLimiter(platforms=PLATFORMS)
+        self.assertEqual(limiter.host("https://m.youtube.com/watch?v=x"), 'youtube.com')
+        self.assertEqual(limiter.host("https://youtu.be/x"), 'youtube.com')
+        self.assertEqual(limiter.host("https://notyoutube.com/x"), 'notyoutube.com')
+
+    @patch('video_downloader.limits.time.sleep')
+    def test_progress_hook_throttles(self, mock_sleep):
+        limiter = TransferLimiter(rate='1K', hosts={'youtube.com': {'rate': '512'}},
+                                  platforms=PLATFORMS)
+        hook = limiter.progress_hook("https://youtube.com/watch?v=x")
+
+        # The first update is the baseline (e.g. a resumed partial file)
+        hook({'status': 'downloading', 'tmpfilename': 'a.part', 'downloaded_bytes': 4096})
+        hook({'status': 'downloading', 'tmpfilename': 'a.part', 'downloaded_bytes': 5120})
+        mock_sleep.assert_called_once_with(1.0)
+
+        self.assertIsNone(TransferLimiter(platforms=PLATFORMS).progress_hook("https://youtu.be/x"))
+
+    def test_per_host_concurrency(self):
+        limiter = TransferLimiter(host_concurrency=2, hosts={'twitter.com': {'concurrency': 1}},
+                                  platforms=PLATFORMS)
+        running = {'youtube.com': 0, 'twitter.com': 0}
+        peak = dict(running)
+        lock = threading.Lock()
+
+        def download(url, host):
+            with limiter.slot(url):
+                with lock:
+                    running[host] += 1
+                    peak[host] = max(peak[host], running[host])
+                time.sleep(0.02)
+                with lock:
+                    running[host] -= 1
+
+        threads = [threading.Thread(target=download, args=(f"https://www.youtube.com/watch?v={i}", 'youtube.com'))
+                   for i in range(6)]
+        threads += [threading.Thread(target=download, args=(f"https://twitter.com/u/status/{i}", 'twitter.com'))
+                    for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(peak, {'youtube.com': 2, 'twitter.com': 1})
+
+    def test_short_links_share_platform_limits(self):
+        """Test that youtu.be and youtube.com URLs count against one rate and one set of slots"""
+        limiter = TransferLimiter(host_rate='1K', host_concurrency=1, hosts={'youtu.be': {'concurrency': 2}},
+                                  platforms=PLATFORMS)
+        self.assertIs(limiter._host_slot(limiter.host("https://youtu.be/a")),
+                      limiter._host_slot(limiter.host("https://www.youtube.com/watch?v=b")))
+        self.assertEqual(limiter._setting('youtube.com', 'concurrency', 1), 2)
+
+        with patch('video_downloader.limits.time.sleep') as mock_sleep:
+            limiter.throttle(limiter.host("https://youtu.be/a"), 1024)
+            limiter.throttle(limiter.host("https://www.youtube.com/watch?v=b"), 1024)
+        self.assertEqual(len(mock_sleep.call_args_list), 1)
+        self.assertAlmostEqual(mock_sleep.call_args[0][0], 1.0, places=2)
+
+if __name__ == '__main__':
+    unittest.main()
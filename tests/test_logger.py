@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+from video_downloader import logger as log
+from video_downloader.worker_pool import DownloadWorkerPool
+
+
+class TestConfigureLogging(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.logger = log.setup_logger()
+        self.handlers = list(self.logger.handlers)
+        self.level = self.logger.level
+
+    def tearDown(self):
+        log.configure_logging(file=None)
+        for handler in self.handlers:
+            if handler not in self.logger.handlers:
+                self.logger.addHandler(handler)
+        self.logger.setLevel(self.level)
+        self.tmpdir.cleanup()
+
+    def _path(self, name='logs/video_downloader.log'):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_json_lines_carry_job_ids(self):
+        log.configure_logging(file=self._path(), format='json')
+        self.logger.setLevel('DEBUG')
+
+        def handler(url):
+            self.logger.debug("Downloading %s", url)
+            raise ValueError("broken")
+
+        pool = DownloadWorkerPool(handler, workers=1)
+        job = pool.submit("https://youtube.com/watch?v=abc123")
+        pool.join()
+        pool.shutdown()
+        self.logger.info("Outside of a job")
+        log._stop_listener()
+
+        with open(self._path()) as f:
+            entries = {entry['message']: entry for entry in map(json.loads, f)}
+        downloading = entries["Downloading https://youtube.com/watch?v=abc123"]
+        self.assertEqual(downloading['level'], 'DEBUG')
+        self.assertEqual(downloading['job_id'], job.id)
+        failed = entries[f"Job {job.id} failed for https://youtube.com/watch?v=abc123: broken"]
+        self.assertEqual(failed['job_id'], job.id)
+        self.assertNotIn('job_id', entries["Outside of a job"])
+
+    def test_size_rotation(self):
+        log.configure_logging(file=self._path(), max_size=200, backups=2)
+        for i in range(20):
+            self.logger.info("Message %s of a log that keeps growing", i)
+        log._stop_listener()
+
+        names = sorted(os.listdir(os.path.dirname(self._path())))
+        self.assertEqual(names, ['video_downloader.log', 'video_downloader.log.1', 'video_downloader.log.2'])
+        for name in names:
+            self.assertLessEqual(os.path.getsize(os.path.join(os.path.dirname(self._path()), name)), 200)
+
+    def test_reconfiguring_replaces_the_file_handler(self):
+        log.configure_logging(file=self._path('first.log'))
+        log.configure_logging(file=self._path('second.log'))
+        file_handlers = [h for h in self.logger.handlers if h.get_name() == log.FILE_HANDLER]
+        self.assertEqual(len(file_handlers), 1)
+
+        self.logger.warning("Only in the second file")
+        log._stop_listener()
+        self.assertFalse(os.path.exists(self._path('first.log')))
+        with open(self._path('second.log')) as f:
+            self.assertIn("Only in the second file", f.read())
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            log.configure_logging(file=self._path(), format='xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from unittest.mock import patch
+from yt_dlp.utils import DownloadError
+from video_downloader.metrics import DownloadMetrics, MetricsRegistry, MetricsServer, TransferMeter, error_class
+
+class TestMetrics(unittest.TestCase):
+    def test_prometheus_rendering(self):
+        registry = MetricsRegistry(prefix='test_')
+        counter = registry.counter('events_total', 'Events', ['kind'])
+        gauge = registry.gauge('depth', 'Depth')
+        histogram = registry.histogram('latency_seconds', 'Latency', buckets=(1, 5))
+
+        counter.inc(kind='a')
+        counter.inc(2, kind='b"c')
+        gauge.set_function(lambda: 7)
+        histogram.observe(0.5)
+        histogram.observe(3)
+
+        text = registry.render()
+        self.assertIn('# TYPE test_events_total counter', text)
+        self.assertIn('test_events_total{kind="a"} 1', text)
+        self.assertIn('test_events_total{kind="b\\"c"} 2', text)
+        self.assertIn('test_depth 7', text)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="5"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('test_latency_seconds_count 2', text)
+
+        snapshot = registry.snapshot()['metrics']
+        self.assertEqual(snapshot['test_events_total'], {'a': 1, 'b"c': 2})
+        self.assertEqual(snapshot['test_latency_seconds']['sum'], 3.5)
+
+    def test_label_mismatch(self):
+        counter = MetricsRegistry().counter('events_total', 'Events', ['kind'])
+        with self.assertRaises(ValueError):
+            counter.inc(other='a')
+
+    def test_transfer_meter(self):
+        metrics = DownloadMetrics()
+        meter = TransferMeter(metrics, 'youtube.com', merge=True)
+        with patch('video_downloader.metrics.time.monotonic', side_effect=[0, 1, 2, 2.5, 3]):
+            for name in ('video', 'audio'):
+                meter.hook({'status': 'downloading', 'filename': name, 'downloaded_bytes': 0})
+                meter.hook({'status': 'finished', 'filename': name, 'downloaded_bytes': 1000})
+            meter.finish()
+
+        snapshot = metrics.snapshot()['metrics']
+        self.assertEqual(snapshot['video_downloader_downloaded_bytes_total'], {'youtube.com': 2000})
+        self.assertEqual(snapshot['video_downloader_stage_duration_seconds']['transfer']['sum'], 2.5)
+        self.assertEqual(snapshot['video_downloader_stage_duration_seconds']['merge']['sum'], 0.5)
+
+    def test_error_class(self):
+        try:
+            raise ConnectionResetError("reset")
+        except ConnectionResetError as e:
+            import sys
+            wrapped = DownloadError(str(e), sys.exc_info())
+        self.assertEqual(error_class(wrapped), 'ConnectionResetError')
+        self.assertEqual(error_class(DownloadError("plain")), 'DownloadError')
+
+    def test_server_and_dump(self):
+        metrics = DownloadMetrics()
+        metrics.downloads.inc()
+        server = MetricsServer(metrics, port=0).start()
+        try:
+            host, port = server.address
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+                self.assertIn('video_downloader_downloads_total 1', response.read().decode())
+        finally:
+            server.close()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'metrics.json')
+            metrics.dump(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)['metrics']['video_downloader_downloads_total'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+from video_downloader.batch import BatchDownloader
+from video_downloader.config import Config
+from video_downloader.downloader import VideoDownloader
+from video_downloader.pipeline import DownloadPipeline
+from video_downloader.worker_pool import DownloadJob
+
+def fake_process_media(parts, target, **kwargs):
+    """Stand-in for ffmpeg in the downloader's post-processing pool"""
+    with open(target, 'wb') as out:
+        for part in parts:
+            with open(part, 'rb') as f:
+                out.write(f.read())
+            if part != target:
+                os.remove(part)
+    return target
+
+class TestDownloadPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.downloader = VideoDownloader(Config(), {'show_progress': False, 'info_cache': False,
+                                                     'cookies_from_browser': None})
+        self.finished = {}
+
+    def tearDown(self):
+        self.downloader.close()
+        self.tmpdir.cleanup()
+
+    def make_pipeline(self, **kwargs):
+        pipeline = DownloadPipeline(self.downloader,
+                                    on_finish=lambda job: self.finished.__setitem__(job.url, job),
+                                    **kwargs)
+        self.downloader.postprocessor.run = MagicMock(side_effect=fake_process_media)
+        return pipeline
+
+    def test_stages(self):
+        """Test that videos flow through extraction, download and merging"""
+        def extract_info(url):
+            if url.endswith('broken'):
+                raise Exception("Unable to extract")
+            return {'id': url.split('=')[1], 'webpage_url': url}
+
+        def fetch(info):
+            target = os.path.join(self.tmpdir.name, f"{info['id']}.mp4")
+            if info['id'] == 'single':
+                return target, []
+            parts = []
+            for fmt in ('video', 'audio'):
+                part = f"{target}.{fmt}"
+                with open(part, 'w') as f:
+                    f.write(fmt)
+                parts.append(part)
+            return target, parts
+
+        self.downloader.extract_info = MagicMock(side_effect=extract_info)
+        self.downloader.fetch = MagicMock(side_effect=fetch)
+
+        urls = [
+            "https://youtube.com/watch?v=merge",
+            "https://youtube.com/watch?v=single",
+            "https://youtube.com/watch?v=broken",
+        ]
+        self.make_pipeline().run(urls)
+
+        self.assertEqual(self.finished[urls[0]].state, DownloadJob.COMPLETED)
+        self.assertEqual(self.finished[urls[1]].state, DownloadJob.COMPLETED)
+        self.assertEqual(self.finished[urls[2]].state, DownloadJob.FAILED)
+        with open(os.path.join(self.tmpdir.name, 'merge.mp4')) as f:
+            self.assertEqual(f.read(), 'videoaudio')
+
+        # Downloaded videos are archived, failed ones can be retried
+        self.assertIsNone(self.downloader.claim(urls[0]))
+        self.assertIsNotNone(self.downloader.claim(urls[2]))
+
+    def test_stages_overlap(self):
+        """Test that the next video is extracted while the first one downloads"""
+        second_extracted = threading.Event()
+
+        def extract_info(url):
+            if url.endswith('2'):
+                second_extracted.set()
+            return {'id': url[-1], 'webpage_url': url}
+
+        def fetch(info):
+            if info['id'] == '1':
+                self.assertTrue(second_extracted.wait(5))
+            return os.path.join(self.tmpdir.name, f"{info['id']}.mp4"), []
+
+        self.downloader.extract_info = MagicMock(side_effect=extract_info)
+        self.downloader.fetch = MagicMock(side_effect=fetch)
+
+        self.make_pipeline(download_concurrency=1).run(
+            ["https://youtube.com/watch?v=1", "https://youtube.com/watch?v=2"]
+        )
+
+        self.assertTrue(all(job.state == DownloadJob.COMPLETED for job in self.finished.values()))
+        self.assertEqual(len(self.finished), 2)
+
+    def test_multi_video_post_fanned_out(self):
+        """Test that a post with several videos is not counted as a download itself"""
+        post = "https://twitter.com/user/status/1"
+        self.downloader.extract_info = MagicMock(return_value={'_type': 'multi_video', 'entries': [
+            {'id': 'v1', 'webpage_url': "https://twitter.com/user/status/11"},
+            {'id': 'v2', 'webpage_url': "https://twitter.com/user/status/12"},
+        ]})
+        self.downloader.fetch = MagicMock(
+            side_effect=lambda info: (os.path.join(self.tmpdir.name, f"{info['id']}.mp4"), []))
+        self.downloader.postprocessor = MagicMock(workers=1)
+
+        summary = BatchDownloader(self.downloader, pipeline=True, url_validator=self.downloader.url_validator,
+                                  merge_workers=1).run([post])
+
+        self.assertEqual((summary.completed, summary.failed), (2, 0))
+
+    def test_merge_uses_postprocess_options(self):
+        """Test that merging remuxes to the output format and embeds metadata like other paths"""
+        config = Config()
+        config.postprocess = {**config.postprocess, 'embed_metadata': True}
+        self.downloader.close()
+        self.downloader = VideoDownloader(config, {'show_progress': False, 'format': 'mkv', 'info_cache': False,
+                                                   'cookies_from_browser': None})
+        target = os.path.join(self.tmpdir.name, 'v.webm')
+        info = {'id': 'v', 'title': 'Title', 'webpage_url': "https://youtube.com/watch?v=v",
+                'requested_formats': [{'vcodec': 'vp9', 'acodec': 'none'}, {'vcodec': 'none', 'acodec': 'opus'}]}
+        self.downloader.extract_info = MagicMock(return_value=info)
+        self.downloader.fetch = MagicMock(return_value=(target, [f"{target}.video", f"{target}.audio"]))
+        self.downloader.store_file = MagicMock()
+
+        pipeline = self.make_pipeline(merge_workers=3)
+        self.downloader.postprocessor.run = MagicMock()
+        pipeline.run(["https://youtube.com/watch?v=v"])
+
+        self.assertEqual(self.downloader.postprocessor.workers, 3)
+        args, kwargs = self.downloader.postprocessor.run.call_args
+        self.assertEqual(args, ([f"{target}.video", f"{target}.audio"], os.path.join(self.tmpdir.name, 'v.mkv')))
+        self.assertEqual(kwargs['codecs'], [('vp9', 'none'), ('none', 'opus')])
+        self.assertEqual(kwargs['metadata']['title'], 'Title')
+        self.downloader.store_file.assert_called_once_with(os.path.join(self.tmpdir.name, 'v.mkv'), info)
+
+if __name__ == '__main__':
+    unittest.main()
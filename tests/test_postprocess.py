@@ -0,0 +1,153 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from video_downloader.config import Config
+from video_downloader.downloader import VideoDownloader
+from video_downloader.postprocess import PostProcessingError, PostProcessor, codec_name, process_media
+
+
+class TestProcessMedia(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.commands = []
+        self.failures = 0
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _path(self, name, content=b'data'):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def _run(self, command, **kwargs):
+        """Stand-in for ffmpeg that fails the first self.failures calls"""
+        self.commands.append(command)
+        if len(self.commands) <= self.failures:
+            return subprocess.CompletedProcess(command, 1, '', 'Could not write header')
+        with open(command[-1], 'wb') as f:
+            f.write(b'output')
+        return subprocess.CompletedProcess(command, 0, '', '')
+
+    def _process(self, parts, target, **kwargs):
+        with patch('video_downloader.postprocess.subprocess.run', side_effect=self._run):
+            return process_media(parts, os.path.join(self.tmpdir.name, target), ffmpeg='ffmpeg', **kwargs)
+
+    @staticmethod
+    def _codec_args(command):
+        return {kind: command[command.index(f'-c:{kind}') + 1] for kind in ('v', 'a')}
+
+    def test_codec_names(self):
+        self.assertEqual(codec_name('avc1.64001F'), 'h264')
+        self.assertEqual(codec_name('vp09.00.40.08'), 'vp9')
+        self.assertEqual(codec_name('mp4a.40.2'), 'aac')
+        self.assertIsNone(codec_name('none'))
+        self.assertIsNone(codec_name('mystery'))
+
+    def test_compatible_streams_are_copied(self):
+        parts = [self._path('v.f137.mp4'), self._path('v.f140.m4a')]
+        target = self._process(parts, 'v.mp4', codecs=[('avc1.640028', 'none'), ('none', 'mp4a.40.2')])
+
+        self.assertEqual(len(self.commands), 1)
+        self.assertEqual(self._codec_args(self.commands[0]), {'v': 'copy', 'a': 'copy'})
+        self.assertEqual(self.commands[0][-1], os.path.join(self.tmpdir.name, 'v.temp.mp4'))
+        self.assertTrue(os.path.exists(target))
+        self.assertFalse(any(os.path.exists(part) for part in parts))
+
+    def test_incompatible_stream_is_transcoded(self):
+        parts = [self._path('v.f248.webm'), self._path('v.f251.webm')]
+        self._process(parts, 'v.mp4', codecs=[('vp9', 'none'), ('none', 'vorbis')])
+        self.assertEqual(self._codec_args(self.commands[0]), {'v': 'copy', 'a': 'aac'})
+
+    def test_falls_back_to_transcoding(self):
+        self.failures = 1
+        self._process([self._path('v.webm')], 'v.mp4')
+        self.assertEqual([self._codec_args(c) for c in self.commands],
+                         [{'v': 'copy', 'a': 'copy'}, {'v': 'libx264', 'a': 'aac'}])
+
+    def test_failure_keeps_parts(self):
+        self.failures = 2
+        part = self._path('v.webm')
+        with self.assertRaises(PostProcessingError):
+            self._process([part], 'v.mp4')
+        self.assertTrue(os.path.exists(part))
+
+    def test_thumbnail_and_metadata(self):
+        parts = [self._path('v.f137.mp4'), self._path('v.f140.m4a')]
+        thumbnail = self._path('v.webp')
+        self._process(parts, 'v.mp4', codecs=[('avc1', 'none'), ('none', 'mp4a')],
+                      thumbnail=thumbnail, metadata={'title': 'A video', 'artist': None})
+
+        command = self.commands[0]
+        inputs = [command[i + 1] for i, arg in enumerate(command) if arg == '-i']
+        self.assertEqual(inputs, parts + [thumbnail])
+        self.assertLess(command.index(thumbnail), command.index('-map'))
+        self.assertIn('attached_pic', command)
+        self.assertEqual(command[command.index('-c:v:1') + 1], 'mjpeg')
+        self.assertIn('title=A video', command)
+        self.assertNotIn('artist=None', command)
+        self.assertFalse(os.path.exists(thumbnail))
+
+
+class TestPostProcessor(unittest.TestCase):
+    def test_runs_in_worker_process(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # A fake ffmpeg that writes its output file
+            ffmpeg = os.path.join(tmpdir, 'ffmpeg')
+            with open(ffmpeg, 'w') as f:
+                f.write('#!/bin/sh\nfor last; do :; done\necho $PPID > "$last"\n')
+            os.chmod(ffmpeg, 0o755)
+            part = os.path.join(tmpdir, 'v.webm')
+            open(part, 'w').close()
+
+            pool = PostProcessor(workers=1)
+            try:
+                target = pool.run([part], os.path.join(tmpdir, 'v.mkv'), ffmpeg=ffmpeg)
+            finally:
+                pool.close()
+
+            with open(target) as f:
+                self.assertNotEqual(int(f.read()), os.getpid())
+
+
+class TestOffloadedDownload(unittest.TestCase):
+    def test_streams_are_processed_in_pool(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            downloader = VideoDownloader(Config(), {'show_progress': False, 'postprocess_workers': 1,
+                                                    'info_cache': False, 'cookies_from_browser': None,
+                                                    'format': 'mkv'})
+            target = os.path.join(tmpdir, 'v.mkv')
+            parts = [f"{target}.video", f"{target}.audio"]
+            info = {'id': 'v', 'title': 'v', 'requested_formats': [
+                {'vcodec': 'vp9', 'acodec': 'none'}, {'vcodec': 'none', 'acodec': 'opus'}]}
+            downloader.extract_info = MagicMock(return_value=info)
+            downloader.fetch = MagicMock(return_value=(target, parts))
+            downloader.postprocessor.run = MagicMock()
+
+            self.assertTrue(downloader.download("https://youtube.com/watch?v=v"))
+
+            downloader.postprocessor.run.assert_called_once_with(
+                parts, target, codecs=[('vp9', 'none'), ('none', 'opus')], thumbnail=None, metadata=None)
+            self.assertNotIn('postprocessors', downloader._build_ydl_opts())
+            downloader.close()
+
+    def test_every_video_of_a_post_is_processed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            downloader = VideoDownloader(Config(), {'show_progress': False, 'postprocess_workers': 1,
+                                                    'info_cache': False, 'cookies_from_browser': None})
+            entries = [{'id': 'v1', 'title': 'v1', 'ext': 'mp4'}, {'id': 'v2', 'title': 'v2', 'ext': 'mp4'}]
+            downloader.extract_info = MagicMock(return_value={'_type': 'multi_video', 'entries': entries})
+            downloader.fetch = MagicMock(side_effect=lambda info: (os.path.join(tmpdir, f"{info['id']}.mp4"), []))
+            downloader.postprocessor.run = MagicMock()
+
+            self.assertTrue(downloader.download("https://twitter.com/user/status/1"))
+
+            self.assertEqual([c.args[0] for c in downloader.fetch.call_args_list], entries)
+            downloader.postprocessor.run.assert_not_called()
+            downloader.close()
+
+if __name__ == '__main__':
+    unittest.main()
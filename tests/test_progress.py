@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+from video_downloader.progress import ProgressRenderer, ProgressTask, format_bytes
+
+
+def downloading(name, downloaded, **totals):
+    """A yt-dlp progress hook dict of a file being downloaded to name.part"""
+    return {'status': 'downloading', 'filename': name, 'tmpfilename': f"{name}.part",
+            'downloaded_bytes': downloaded, **totals}
+
+
+def finished(name, size):
+    """The yt-dlp progress hook dict of a complete file, which has no tmpfilename"""
+    return {'status': 'finished', 'filename': name, 'downloaded_bytes': size, 'total_bytes': size}
+
+
+class TestProgressTask(unittest.TestCase):
+    def test_snapshot_sums_files(self):
+        task = ProgressTask("video")
+        task.hook(downloading('v.mp4', 100, total_bytes=1000))
+        task.hook(downloading('a.m4a', 50, total_bytes_estimate=200))
+        self.assertEqual(task.snapshot(), (150, 1200))
+
+        task.hook(downloading('b.mp4', 10))
+        self.assertEqual(task.snapshot(), (160, None))
+
+    def test_finished_file_counted_once(self):
+        task = ProgressTask("video")
+        task.hook(downloading('v.mp4', 400, total_bytes=1000))
+        task.hook(downloading('v.mp4', 1000, total_bytes=1000))
+        task.hook(finished('v.mp4', 1000))
+        self.assertEqual(task.snapshot(), (1000, 1000))
+
+class TestProgressRenderer(unittest.TestCase):
+    def test_disabled(self):
+        with ProgressRenderer(enabled=False).task("url") as hook:
+            self.assertIsNone(hook)
+
+    @patch('video_downloader.progress.ui.console.print')
+    def test_no_tty_summaries(self, mock_print):
+        """Test that chunk updates are not drawn and a summary is printed instead"""
+        renderer = ProgressRenderer(tty=False, refresh_per_second=50, summary_interval=3600)
+        with renderer.task("one") as one, renderer.task("two") as two:
+            for i in range(1, 1001):
+                one(downloading('one.mp4', i, total_bytes=1000))
+            two(downloading('two.mp4', 500, total_bytes=500))
+            two(finished('two.mp4', 500))
+
+            stats = renderer.stats()
+            self.assertEqual(stats['active'], 2)
+            self.assertEqual(stats['downloaded_bytes'], 1500)
+            self.assertEqual(stats['total_bytes'], 1500)
+            mock_print.assert_not_called()
+
+        # One final summary once the last download is done
+        mock_print.assert_called_once()
+        self.assertIn("0 active, 2 done, 1.5 KB of 1.5 KB", mock_print.call_args[0][0])
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), "512 B")
+        self.assertEqual(format_bytes(5 * 1024 ** 2), "5.0 MB")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from unittest.mock import patch
+from video_downloader.retry import RetryPolicy
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_exponential_delay(self):
+        policy = RetryPolicy(backoff=1.0, max_delay=10, jitter=0)
+        self.assertEqual([policy.delay(n) for n in range(5)], [1, 2, 4, 8, 10])
+
+    def test_sleep_functions(self):
+        """Test that yt-dlp's keyword call convention is supported"""
+        policy = RetryPolicy(backoff=0.5, jitter=0)
+        self.assertEqual(policy.sleep_functions()['fragment'](n=2), 2.0)
+
+    @patch('video_downloader.retry.time.sleep')
+    def test_run_retries_transient_errors(self, mock_sleep):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError("Connection reset by peer")
+            return 'done'
+
+        policy = RetryPolicy(retries=3, jitter=0)
+        self.assertEqual(policy.run(flaky), 'done')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual([c.args[0] for c in mock_sleep.call_args_list], [1.0, 2.0])
+
+    @patch('video_downloader.retry.time.sleep')
+    def test_run_gives_up(self, mock_sleep):
+        policy = RetryPolicy(retries=2)
+
+        def broken():
+            raise ConnectionError("Connection reset by peer")
+
+        with self.assertRaises(ConnectionError):
+            policy.run(broken)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+        def private():
+            raise ConnectionError("ERROR: Private video")
+
+        mock_sleep.reset_mock()
+        with self.assertRaises(ConnectionError):
+            policy.run(private)
+        mock_sleep.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+from video_downloader.metrics import DownloadMetrics
+from video_downloader.service import DownloadService, JobAPIServer
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+class TestJobAPI(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.downloader = MagicMock()
+        self.downloader.metrics = DownloadMetrics()
+        self.downloader.download.side_effect = lambda url: self.release.wait(5)
+        self.service = DownloadService(self.downloader, workers=1, queue_size=10)
+
+    def tearDown(self):
+        self.release.set()
+        self.service.close()
+
+    def request(self, connection, method, path, body=None):
+        connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def check_api(self, connect):
+        status, running = self.request(connect(), 'POST', '/jobs', {'url': "https://youtube.com/watch?v=one"})
+        self.assertEqual(status, 201)
+        status, queued = self.request(connect(), 'POST', '/jobs', {'url': "https://youtube.com/watch?v=two"})
+        self.assertEqual(status, 201)
+
+        status, _ = self.request(connect(), 'POST', '/jobs', {'url': "https://example.com/video"})
+        self.assertEqual(status, 400)
+
+        status, job = self.request(connect(), 'GET', f"/jobs/{queued['id']}")
+        self.assertEqual((status, job['state']), (200, 'queued'))
+
+        status, job = self.request(connect(), 'DELETE', f"/jobs/{queued['id']}")
+        self.assertEqual((status, job['state']), (200, 'cancelled'))
+        status, _ = self.request(connect(), 'DELETE', f"/jobs/{queued['id']}")
+        self.assertEqual(status, 409)
+
+        status, listing = self.request(connect(), 'GET', '/jobs?state=cancelled')
+        self.assertEqual([job['id'] for job in listing['jobs']], [queued['id']])
+
+        self.release.set()
+        self.service.pool.join()
+        status, job = self.request(connect(), 'GET', f"/jobs/{running['id']}")
+        self.assertEqual(job['state'], 'completed')
+
+        status, _ = self.request(connect(), 'GET', '/jobs/unknown')
+        self.assertEqual(status, 404)
+
+    def test_tcp(self):
+        server = JobAPIServer(self.service, port=0).start()
+        try:
+            host, port = server._server.server_address[:2]
+            self.check_api(lambda: http.client.HTTPConnection(host, port, timeout=5))
+        finally:
+            server.close()
+
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'api.sock')
+            server = JobAPIServer(self.service, socket_path=path).start()
+            try:
+                self.assertEqual(os.stat(path).st_mode & 0o077, 0)
+                self.check_api(lambda: UnixHTTPConnection(path))
+            finally:
+                server.close()
+            self.assertFalse(os.path.exists(path))
+
+    def test_playlist_expanded_into_jobs(self):
+        listed = threading.Event()
+
+        def iter_entries(url):
+            # The response must not wait for the listing
+            self.assertTrue(listed.wait(5))
+            yield from ["https://www.youtube.com/watch?v=a1", "https://youtu.be/a1",
+                        "https://www.youtube.com/watch?v=a2"]
+
+        self.downloader.iter_entries.side_effect = iter_entries
+        server = JobAPIServer(self.service, port=0).start()
+        try:
+            host, port = server._server.server_address[:2]
+            connect = lambda: http.client.HTTPConnection(host, port, timeout=5)
+            status, playlist = self.request(connect(), 'POST', '/jobs',
+                                            {'url': "https://www.youtube.com/playlist?list=PL1"})
+            self.assertEqual((status, playlist['state']), (202, 'running'))
+
+            listed.set()
+            self.service.expander.join()
+            status, playlist = self.request(connect(), 'GET', f"/jobs/{playlist['id']}")
+            self.assertEqual(playlist['state'], 'expanded')
+            status, children = self.request(connect(), 'GET', f"/jobs?parent={playlist['id']}")
+        finally:
+            server.close()
+
+        self.assertEqual([job['url'] for job in children['jobs']],
+                         ["https://www.youtube.com/watch?v=a1", "https://www.youtube.com/watch?v=a2"])
+        self.downloader.iter_entries.assert_called_once_with("https://www.youtube.com/playlist?list=PL1")
+        self.release.set()
+        self.service.pool.join()
+        self.assertEqual([c.args[0] for c in self.downloader.download.call_args_list],
+                         ["https://www.youtube.com/watch?v=a1", "https://www.youtube.com/watch?v=a2"])
+
+    def test_stale_socket_replaced_other_files_kept(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'api.sock')
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(path)
+            stale.close()
+            JobAPIServer(self.service, socket_path=path).close()
+
+            with open(path, 'w') as f:
+                f.write('notes')
+            with self.assertRaises(FileExistsError):
+                JobAPIServer(self.service, socket_path=path)
+            with open(path) as f:
+                self.assertEqual(f.read(), 'notes')
+
+    def test_batch_submit(self):
+        server = JobAPIServer(self.service, port=0).start()
+        try:
+            host, port = server._server.server_address[:2]
+            status, result = self.request(http.client.HTTPConnection(host, port, timeout=5), 'POST', '/jobs',
+                                          {'urls': ["https://youtu.be/a", "not a url"]})
+            self.assertEqual(status, 201)
+            self.assertEqual(len(result['jobs']), 1)
+            self.assertEqual(result['errors'][0]['url'], "not a url")
+        finally:
+            server.close()
+
+if __name__ == '__main__':
+    unittest.main()
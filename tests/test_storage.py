@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from video_downloader.config import Config
+from video_downloader.downloader import VideoDownloader
+from video_downloader.storage import ContentStore, StreamingHasher, TransferHasher
+
+
+class TestTransferHasher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'video.mp4')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hashes_while_file_grows(self):
+        """Test that a file written and renamed in steps hashes like the whole file"""
+        hasher = TransferHasher()
+        data = os.urandom(StreamingHasher.CHUNK_SIZE * 3 + 100)
+        part = self.path + '.part'
+        with open(part, 'wb') as f:
+            for start in range(0, len(data), 500000):
+                f.write(data[start:start + 500000])
+                f.flush()
+                hasher.hook({'status': 'downloading', 'filename': self.path, 'tmpfilename': part,
+                             'downloaded_bytes': f.tell()})
+        os.rename(part, self.path)
+        hasher.hook({'status': 'finished', 'filename': self.path, 'downloaded_bytes': len(data)})
+
+        self.assertEqual(hasher.digest(self.path), (hashlib.sha256(data).hexdigest(), []))
+
+    def test_restarted_download_is_rehashed(self):
+        hasher = StreamingHasher()
+        with open(self.path, 'wb') as f:
+            f.write(b'stale partial download')
+        hasher.update(self.path)
+        with open(self.path, 'wb') as f:
+            f.write(b'new')
+        hasher.update(self.path)
+        self.assertEqual(hasher.hexdigest(), hashlib.sha256(b'new').hexdigest())
+
+    def test_merged_file_digest_covers_sources(self):
+        hasher = TransferHasher()
+        for name, content in (('v.f1.mp4', b'video'), ('v.f2.m4a', b'audio')):
+            path = os.path.join(self.tmpdir.name, name)
+            with open(path, 'wb') as f:
+                f.write(content)
+            hasher.hook({'status': 'finished', 'filename': path})
+
+        digest, sources = hasher.digest(self.path)
+        self.assertEqual(sources, sorted([hashlib.sha256(b'video').hexdigest(),
+                                          hashlib.sha256(b'audio').hexdigest()]))
+        self.assertEqual(digest, hashlib.sha256('\n'.join(sources).encode()).hexdigest())
+
+
+class TestContentStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.downloads = os.path.join(self.tmpdir.name, 'downloads')
+        self.store = ContentStore(os.path.join(self.downloads, '.store'))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _download(self, name, content):
+        path = os.path.join(self.store.incoming, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path, hashlib.sha256(content).hexdigest()
+
+    def test_duplicates_stored_once(self):
+        path, digest = self._download('youtube-a.mp4', b'same bytes')
+        first, duplicate = self.store.add(path, digest, os.path.join(self.downloads, 'Original.mp4'))
+        self.assertFalse(duplicate)
+
+        path, digest = self._download('twitter-b.mp4', b'same bytes')
+        second, duplicate = self.store.add(path, digest, os.path.join(self.downloads, 'Repost.mp4'))
+        self.assertTrue(duplicate)
+
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.samefile(first, second))
+        self.assertTrue(os.path.samefile(first, self.store.object_path(digest, '.mp4')))
+        with open(self.store.manifest) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([e['duplicate'] for e in entries], [False, True])
+        self.assertEqual(entries[1]['path'], second)
+
+    def test_title_collision_keeps_both(self):
+        name = os.path.join(self.downloads, 'Video.mp4')
+        path, first_digest = self._download('youtube-a.mp4', b'first')
+        first, _ = self.store.add(path, first_digest, name)
+        path, digest = self._download('youtube-b.mp4', b'second')
+        second, _ = self.store.add(path, digest, name)
+
+        self.assertEqual(first, name)
+        self.assertEqual(second, os.path.join(self.downloads, f'Video [{digest[:8]}].mp4'))
+        with open(first, 'rb') as f:
+            self.assertEqual(f.read(), b'first')
+
+    def test_symlinks(self):
+        store = ContentStore(self.store.directory, link='symlink')
+        path, digest = self._download('youtube-a.mp4', b'bytes')
+        linked, _ = store.add(path, digest, os.path.join(self.downloads, 'Video.mp4'))
+        self.assertTrue(os.path.islink(linked))
+        self.assertTrue(os.path.samefile(linked, store.object_path(digest, '.mp4')))
+
+
+class TestDownloaderStorage(unittest.TestCase):
+    @patch('yt_dlp.YoutubeDL')
+    def test_downloads_are_content_addressed(self, mock_ytdl):
+        with tempfile.TemporaryDirectory() as downloads:
+            config = Config()
+            config.download_path = downloads
+            config.storage = {**config.storage, 'layout': 'content'}
+            downloader = VideoDownloader(config, {'show_progress': False, 'info_cache': False,
+                                                  'cookies_from_browser': None})
+            outtmpl = downloader._build_ydl_opts()['outtmpl']
+            self.assertTrue(outtmpl.startswith(downloader.store.incoming))
+
+            def process_info(info):
+                # Stand-in for yt-dlp writing the file and reporting progress
+                path = os.path.join(downloader.store.incoming, f"Youtube-{info['id']}.mp4")
+                with open(path, 'wb') as f:
+                    f.write(b'video bytes')
+                progress_hook = mock_ytdl.call_args[0][0]['progress_hooks'][0]
+                progress_hook({'status': 'finished', 'filename': path, 'downloaded_bytes': 11})
+                info['filepath'] = path
+
+            ydl = mock_ytdl.return_value.__enter__.return_value
+            ydl.extract_info.side_effect = lambda url, **kwargs: {
+                'id': url.rsplit('=', 1)[1], 'title': 'Same/Video', 'webpage_url': url}
+            ydl.process_ie_result.side_effect = lambda info, download: dict(info)
+            ydl.process_info.side_effect = process_info
+
+            downloader.download("https://youtube.com/watch?v=one")
+            downloader.download("https://youtube.com/watch?v=two")
+            downloader.close()
+
+            digest = hashlib.sha256(b'video bytes').hexdigest()
+            linked = os.path.join(downloads, 'Same⧸Video.mp4')
+            self.assertTrue(os.path.samefile(linked, downloader.store.object_path(digest, '.mp4')))
+            self.assertEqual(os.listdir(downloader.store.incoming), [])
+            metrics = downloader.metrics.snapshot()['metrics']
+            self.assertEqual(metrics['video_downloader_dedupe_hits_total'], {'content': 1})
+
+    @patch('yt_dlp.YoutubeDL')
+    def test_post_with_several_videos(self, mock_ytdl):
+        """Test that every merged video of one post is digested from its own streams"""
+        with tempfile.TemporaryDirectory() as downloads:
+            config = Config()
+            config.download_path = downloads
+            config.storage = {**config.storage, 'layout': 'content'}
+            downloader = VideoDownloader(config, {'show_progress': False, 'info_cache': False,
+                                                  'cookies_from_browser': None})
+
+            def process_info(info):
+                # Stand-in for yt-dlp downloading two streams and merging them
+                progress_hook = mock_ytdl.call_args[0][0]['progress_hooks'][0]
+                path = os.path.join(downloader.store.incoming, f"Twitter-{info['id']}.mp4")
+                parts = []
+                for fmt in ('video', 'audio'):
+                    part = f"{path}.{fmt}"
+                    with open(part, 'wb') as f:
+                        f.write(f"{info['id']} {fmt}".encode())
+                    progress_hook({'status': 'finished', 'filename': part})
+                    parts.append(part)
+                with open(path, 'wb') as out:
+                    for part in parts:
+                        with open(part, 'rb') as f:
+                            out.write(f.read())
+                        os.remove(part)
+                info['filepath'] = path
+
+            ydl = mock_ytdl.return_value.__enter__.return_value
+            ydl.extract_info.return_value = {'_type': 'playlist', 'entries': [
+                {'id': '1', 'title': 'First'}, {'id': '2', 'title': 'Second'}]}
+            ydl.process_ie_result.side_effect = lambda info, download: info
+            ydl.process_info.side_effect = process_info
+
+            downloader.download("https://twitter.com/user/status/123")
+            downloader.close()
+
+            for title, video_id in (('First', '1'), ('Second', '2')):
+                with open(os.path.join(downloads, f'{title}.mp4'), 'rb') as f:
+                    self.assertEqual(f.read(), f"{video_id} video{video_id} audio".encode())
+            metrics = downloader.metrics.snapshot()['metrics']
+            self.assertNotIn('content', metrics['video_downloader_dedupe_hits_total'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from video_downloader.config import Config
+from video_downloader.downloader import VideoDownloader
+from video_downloader.sync import ChannelSync
+
+CHANNEL = "https://www.youtube.com/@someone/videos"
+
+
+class TestChannelSync(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.tmpdir.name, 'archive.db')
+        self.videos = ['v3', 'v2', 'v1']
+        self.listed = []
+        patcher = patch('yt_dlp.YoutubeDL')
+        mock_ytdl = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ydl = mock_ytdl.return_value.__enter__.return_value
+        self.ydl.extract_info.side_effect = self._extract_info
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _extract_info(self, url, **kwargs):
+        if 'watch?v=' in url:
+            return {'id': url.rsplit('=', 1)[1], 'webpage_url': url}
+
+        def entries():
+            for video_id in self.videos:
+                self.listed.append(video_id)
+                yield {'_type': 'url', 'url': f"https://www.youtube.com/watch?v={video_id}"}
+        return {'_type': 'playlist', 'entries': entries()}
+
+    def _sync(self, error=None, **kwargs):
+        downloader = VideoDownloader(Config(), {'download_archive': self.archive, 'job_retries': 0,
+                                                'info_cache': False, 'cookies_from_browser': None})
+        self.ydl.process_ie_result.reset_mock()
+        self.ydl.process_ie_result.side_effect = error
+        self.listed.clear()
+        try:
+            results = ChannelSync(downloader, workers=2, **kwargs).run([CHANNEL])
+        finally:
+            downloader.close()
+        downloaded = [c.args[0]['id'] for c in self.ydl.process_ie_result.call_args_list]
+        return results[0], downloaded
+
+    def test_stops_at_watermark(self):
+        """Test that a second sync only lists videos newer than the first"""
+        result, downloaded = self._sync()
+        self.assertCountEqual(downloaded, ['v3', 'v2', 'v1'])
+        self.assertFalse(result.stopped_early)
+
+        self.videos.insert(0, 'v4')
+        result, downloaded = self._sync()
+        self.assertEqual(downloaded, ['v4'])
+        self.assertTrue(result.stopped_early)
+        self.assertEqual(self.listed, ['v4', 'v3'])
+
+        result, downloaded = self._sync(full=True)
+        self.assertEqual(downloaded, [])
+        self.assertEqual(self.listed, ['v4', 'v3', 'v2', 'v1'])
+
+    def test_stops_after_known_videos(self):
+        """Test that a run of archived videos ends listing without a watermark"""
+        result, _ = self._sync(watermark_size=0)
+        self.videos[:0] = ['v5', 'v4']
+        result, downloaded = self._sync(watermark_size=0, stop_after_known=2)
+        self.assertCountEqual(downloaded, ['v5', 'v4'])
+        self.assertEqual(self.listed, ['v5', 'v4', 'v3', 'v2'])
+
+    def test_failure_keeps_watermark(self):
+        """Test that failed videos are listed again by the next sync"""
+        self._sync()
+        self.videos.insert(0, 'v4')
+
+        result, _ = self._sync(error=ValueError("Download failed"))
+        self.assertEqual(result.failed, 1)
+        self.assertFalse(result.ok)
+
+        result, downloaded = self._sync()
+        self.assertEqual(downloaded, ['v4'])
+        self.assertTrue(result.ok)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,5 +32,82 @@ class TestURLValidator(unittest.TestCase):
         for url in invalid_urls:
             self.assertFalse(self.validator.is_supported_video_url(url))
 
+    def test_domain_matching_respects_label_boundaries(self):
+        self.assertTrue(self.validator.is_supported_video_url("https://m.youtube.com/watch?v=1"))
+        self.assertTrue(self.validator.is_supported_video_url("HTTPS://WWW.YouTube.com:443/watch?v=1"))
+        self.assertFalse(self.validator.is_supported_video_url("https://notyoutube.com/watch?v=1"))
+        self.assertFalse(self.validator.is_supported_video_url("https://youtube.com.evil.net/watch?v=1"))
+        self.assertFalse(self.validator.is_supported_video_url("https://youtube.com@evil.net/watch?v=1"))
+
+    def test_iter_urls_classifies_in_one_pass(self):
+        text = ("See https://youtu.be/abc, or (https://example.com/x) and "
+                "https://www.instagram.com/reel/xyz/.")
+        self.assertEqual(list(self.validator.iter_urls(text)), [
+            ("https://youtu.be/abc", 'youtu.be'),
+            ("https://example.com/x", None),
+            ("https://www.instagram.com/reel/xyz/", 'instagram.com'),
+        ])
+        self.assertEqual(self.validator.extract_supported_urls(text),
+                         ["https://youtu.be/abc", "https://www.instagram.com/reel/xyz/"])
+
+    def test_collection_urls(self):
+        collections = [
+            "https://www.youtube.com/playlist?list=PL123",
+            "https://www.youtube.com/@someone",
+            "https://www.youtube.com/@someone/videos",
+            "https://www.youtube.com/channel/UC123",
+            "https://www.youtube.com/c/name",
+        ]
+        videos = [
+            "https://www.youtube.com/watch?v=abc123&list=PL123",
+            "https://youtu.be/abc123",
+            "https://www.youtube.com/shorts/abc123",
+            "https://fb.watch/abc",
+        ]
+        for url in collections:
+            self.assertTrue(self.validator.is_collection_url(url), url)
+        for url in videos:
+            self.assertFalse(self.validator.is_collection_url(url), url)
+
+    def test_configured_domains(self):
+        validator = URLValidator(['vimeo.com', 'youtube.com'])
+        self.assertTrue(validator.is_supported_video_url("https://player.vimeo.com/video/1"))
+        self.assertFalse(validator.is_supported_video_url("https://youtu.be/abc"))
+        self.assertEqual(validator.canonical_id("https://vimeo.com/1?utm_source=x"), "url:vimeo.com/1")
+
+    def test_canonical_id(self):
+        same_video = [
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://youtu.be/dQw4w9WgXcQ?si=abc",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://youtube.com/watch?v=dQw4w9WgXcQ&t=30",
+            "https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+            "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+            "https://www.youtube.com/embed/dQw4w9WgXcQ",
+        ]
+        for url in same_video:
+            self.assertEqual(self.validator.canonical_id(url), "youtube:dQw4w9WgXcQ", url)
+
+        self.assertEqual(self.validator.canonical_id("https://www.facebook.com/watch/?v=1234"),
+                         "facebook:1234")
+        self.assertEqual(self.validator.canonical_id("https://www.facebook.com/page/videos/1234/"),
+                         "facebook:1234")
+        self.assertEqual(self.validator.canonical_id("https://twitter.com/user/status/987?s=20"),
+                         "twitter:987")
+        self.assertEqual(self.validator.canonical_id("https://www.instagram.com/reel/Cabc123/"),
+                         "instagram:Cabc123")
+        self.assertEqual(self.validator.canonical_id("https://fb.watch/abc"), "fb.watch:abc")
+
+    def test_canonical_id_fallback(self):
+        """Test that URLs without a known ID are normalized"""
+        self.assertEqual(
+            self.validator.canonical_id("https://www.example.com/video/?utm_source=x&id=1"),
+            self.validator.canonical_id("https://example.com/video?id=1")
+        )
+        self.assertNotEqual(
+            self.validator.canonical_id("https://www.youtube.com/playlist?list=PL1"),
+            self.validator.canonical_id("https://www.youtube.com/playlist?list=PL2")
+        )
+
 if __name__ == '__main__':
     unittest.main()
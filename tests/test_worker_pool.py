@@ -0,0 +1,70 @@
+import queue
+import threading
+import unittest
+from video_downloader.worker_pool import DownloadJob, DownloadWorkerPool
+
+class TestDownloadWorkerPool(unittest.TestCase):
+    def test_jobs_run_concurrently(self):
+        """Test that workers process several jobs at the same time"""
+        barrier = threading.Barrier(3, timeout=5)
+        pool = DownloadWorkerPool(lambda url: barrier.wait(), workers=3)
+
+        jobs = [pool.submit(f"https://youtube.com/watch?v={i}") for i in range(3)]
+        pool.join()
+        pool.shutdown()
+
+        for job in jobs:
+            self.assertEqual(job.state, DownloadJob.COMPLETED)
+
+    def test_job_states(self):
+        """Test that results and exceptions are reflected in the job state"""
+        def handler(url):
+            if url.endswith('fail'):
+                raise Exception("Download failed")
+            return not url.endswith('skip')
+
+        pool = DownloadWorkerPool(handler, workers=2)
+        ok = pool.submit("https://youtube.com/watch?v=ok")
+        skipped = pool.submit("https://youtube.com/watch?v=skip")
+        failed = pool.submit("https://youtube.com/watch?v=fail")
+        pool.join()
+        pool.shutdown()
+
+        self.assertEqual(ok.state, DownloadJob.COMPLETED)
+        self.assertEqual(skipped.state, DownloadJob.SKIPPED)
+        self.assertEqual(failed.state, DownloadJob.FAILED)
+        self.assertEqual(failed.error, "Download failed")
+
+        stats = pool.stats()
+        self.assertEqual(stats['submitted'], 3)
+        self.assertEqual(stats['failed'], 1)
+
+    def test_bounded_queue_and_cancel(self):
+        """Test that a full queue rejects jobs and queued jobs can be cancelled"""
+        release = threading.Event()
+        started = threading.Event()
+
+        def handler(url):
+            started.set()
+            release.wait(5)
+
+        pool = DownloadWorkerPool(handler, workers=1, queue_size=1)
+        running = pool.submit("https://youtube.com/watch?v=1")
+        started.wait(5)
+        waiting = pool.submit("https://youtube.com/watch?v=2")
+
+        with self.assertRaises(queue.Full):
+            pool.submit("https://youtube.com/watch?v=3", block=False)
+
+        self.assertTrue(pool.cancel(waiting.id))
+        self.assertFalse(pool.cancel(running.id))
+
+        release.set()
+        pool.join()
+        pool.shutdown()
+
+        self.assertEqual(running.state, DownloadJob.COMPLETED)
+        self.assertEqual(waiting.state, DownloadJob.CANCELLED)
+
+if __name__ == '__main__':
+    unittest.main()
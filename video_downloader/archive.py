@@ -0,0 +1,224 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from .logger import setup_logger
+
+logger = setup_logger()
+
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+
+class MemoryArchive:
+    """Download archive kept in memory for the lifetime of the process"""
+
+    def __init__(self):
+        self._ids = set()
+        self._watermarks = {}
+
+    def __contains__(self, video_id):
+        return video_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, video_id):
+        self._ids.add(video_id)
+
+    def get_watermark(self, source):
+        return list(self._watermarks.get(source, ()))
+
+    def set_watermark(self, source, video_ids):
+        self._watermarks[source] = list(video_ids)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteArchive:
+    """Download archive stored in an indexed SQLite database
+
+    Lookups are primary-key queries, so the archive is never loaded into
+    memory. Writes are buffered and committed every batch_size entries;
+    sync selects how hard each commit is pushed to disk ('off', 'normal'
+    or 'full'). The database runs in WAL mode, so several processes can
+    share one archive file safely.
+    """
+
+    SYNC_MODES = {'off': 'OFF', 'normal': 'NORMAL', 'full': 'FULL'}
+
+    def __init__(self, path, batch_size=1, sync='normal', timeout=30):
+        if sync not in self.SYNC_MODES:
+            raise ValueError(f"Invalid archive sync mode: {sync}")
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(f'PRAGMA synchronous={self.SYNC_MODES[sync]}')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS archive ('
+            'video_id TEXT PRIMARY KEY, added_at REAL) WITHOUT ROWID'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sources ('
+            'source TEXT PRIMARY KEY, watermark TEXT NOT NULL, synced_at REAL) WITHOUT ROWID'
+        )
+
+    def __contains__(self, video_id):
+        with self._lock:
+            if video_id in self._pending:
+                return True
+            row = self._conn.execute(
+                'SELECT 1 FROM archive WHERE video_id = ?', (video_id,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            count = self._conn.execute('SELECT COUNT(*) FROM archive').fetchone()[0]
+            return count + len(self._pending)
+
+    def add(self, video_id):
+        """Record a video ID, committing once batch_size IDs are pending"""
+        with self._lock:
+            self._pending.add(video_id)
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        """Commit all pending IDs"""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Commit pending IDs and close the database"""
+        with self._lock:
+            self._flush()
+            self._conn.close()
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                               (key, str(value)))
+
+    def get_watermark(self, source):
+        """Return the newest video IDs seen in source by the last sync"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT watermark FROM sources WHERE source = ?', (source,)
+            ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def set_watermark(self, source, video_ids):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sources (source, watermark, synced_at) VALUES (?, ?, ?)',
+                (source, json.dumps(list(video_ids)), time.time())
+            )
+
+    def import_text(self, text_path, offset=0, chunk_size=10000):
+        """Import IDs from a text archive starting at byte offset
+
+        The file is streamed in chunks, so arbitrarily large archives can
+        be migrated in bounded memory. Returns the offset reached, which
+        can be passed back later to import only newly appended lines.
+        """
+        imported = 0
+        with open(text_path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                lines = f.readlines(chunk_size * 64)
+                if not lines:
+                    break
+                # Leave a partially written last line for the next import
+                if not lines[-1].endswith(b'\n'):
+                    f.seek(-len(lines[-1]), os.SEEK_CUR)
+                    lines.pop()
+                    if not lines:
+                        break
+                now = time.time()
+                rows = [(line.strip().decode('utf-8', 'replace'), now)
+                        for line in lines if line.strip()]
+                with self._lock:
+                    self._conn.execute('BEGIN IMMEDIATE')
+                    try:
+                        self._conn.executemany(
+                            'INSERT OR IGNORE INTO archive (video_id, added_at) VALUES (?, ?)', rows
+                        )
+                        self._conn.execute('COMMIT')
+                    except Exception:
+                        self._conn.execute('ROLLBACK')
+                        raise
+                imported += len(rows)
+            offset = f.tell()
+        logger.debug("Imported %s archive entries from %s", imported, text_path)
+        return offset
+
+    def _flush(self):
+        # Caller must hold self._lock
+        if not self._pending:
+            return
+        now = time.time()
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO archive (video_id, added_at) VALUES (?, ?)',
+                [(video_id, now) for video_id in self._pending]
+            )
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._pending.clear()
+
+
+def is_sqlite_file(path):
+    """Check whether path is an SQLite database"""
+    with open(path, 'rb') as f:
+        return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+
+def migrate_text_archive(text_path, db_path, batch_size=1, sync='normal'):
+    """Import a plain text archive into an SQLite archive and return it
+
+    The byte offset reached is stored in the database, so running the
+    migration again only imports lines appended to the text file since.
+    """
+    archive = SQLiteArchive(db_path, batch_size=batch_size, sync=sync)
+    key = f'text_offset:{os.path.abspath(text_path)}'
+    offset = int(archive.get_meta(key, 0))
+    if os.path.getsize(text_path) > offset:
+        logger.info(f"Migrating download archive {text_path} to {db_path}")
+        archive.set_meta(key, archive.import_text(text_path, offset))
+    return archive
+
+
+def open_archive(path, batch_size=1, sync='normal'):
+    """Open the download archive at path
+
+    Without a path an in-memory archive is returned. A plain text archive
+    written by older versions is migrated to an SQLite database next to it
+    (path + '.sqlite3'), which is used from then on.
+    """
+    if not path:
+        return MemoryArchive()
+
+    if os.path.exists(path) and os.path.getsize(path) > 0 and not is_sqlite_file(path):
+        return migrate_text_archive(path, path + '.sqlite3', batch_size=batch_size, sync=sync)
+
+    return SQLiteArchive(path, batch_size=batch_size, sync=sync)
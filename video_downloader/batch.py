@@ -0,0 +1,144 @@
+import threading
+import time
+from .pipeline import DownloadPipeline
+from .url_validator import URLValidator
+from .worker_pool import DownloadJob, DownloadWorkerPool
+from .logger import setup_logger
+
+logger = setup_logger()
+
+
+class BatchSummary:
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.unsupported = 0
+        self.duplicates = 0
+        self.failures = []
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        """Finished videos per minute"""
+        if not self.elapsed:
+            return 0.0
+        return (self.completed + self.skipped + self.failed) * 60 / self.elapsed
+
+
+class BatchDownloader:
+    MAX_REPORTED_FAILURES = 50
+
+    def __init__(self, downloader, workers=3, queue_size=100, url_validator=None,
+                 pipeline=False, extract_concurrency=8, merge_workers=2):
+        self.downloader = downloader
+        self.workers = workers
+        self.queue_size = queue_size
+        self.url_validator = url_validator or URLValidator()
+        self.pipeline = pipeline
+        self.extract_concurrency = extract_concurrency
+        self.merge_workers = merge_workers
+        self.summary = BatchSummary()
+        self._lock = threading.Lock()
+
+    def iter_urls(self, lines):
+        """Yield supported video URLs from an iterable of text lines
+
+        Lines are consumed lazily, so arbitrarily large files or pipes are
+        never loaded into memory. Blank lines and '#' comments are ignored.
+        """
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            for url, domain in self.url_validator.iter_urls(line):
+                if domain:
+                    yield url
+                else:
+                    logger.debug("Unsupported URL format: %s", url)
+                    self.summary.unsupported += 1
+
+    def iter_expanded_urls(self, lines):
+        """Yield supported URLs from lines with playlists and channels expanded
+
+        Collections are enumerated lazily by the downloader, which already
+        skips archived videos, so their entries reach the workers while the
+        rest of the listing is still being fetched.
+        """
+        for url in self.iter_urls(lines):
+            if not self.url_validator.is_collection_url(url):
+                yield url
+                continue
+            try:
+                yield from self.downloader.iter_entries(url)
+            except Exception as e:
+                logger.error(f"Failed to expand playlist {url}: {str(e)}")
+                with self._lock:
+                    self.summary.failed += 1
+                    if len(self.summary.failures) < self.MAX_REPORTED_FAILURES:
+                        self.summary.failures.append((url, str(e)))
+
+    def iter_unique_urls(self, lines):
+        """Yield supported URLs from lines, skipping repeats of the same video"""
+        seen = set()
+        for url in self.iter_expanded_urls(lines):
+            video_id = self.url_validator.canonical_id(url)
+            if video_id in seen:
+                self.summary.duplicates += 1
+                self.downloader.metrics.dedupe_hits.inc(reason='batch')
+                continue
+            seen.add(video_id)
+            self.summary.submitted += 1
+            yield url
+
+    def run(self, lines):
+        """Download every supported URL in lines and return a BatchSummary"""
+        started = time.monotonic()
+        try:
+            if self.pipeline:
+                self._run_pipeline(lines)
+            else:
+                self._run_pool(lines)
+        finally:
+            self.summary.elapsed = time.monotonic() - started
+        return self.summary
+
+    def _run_pool(self, lines):
+        pool = DownloadWorkerPool(
+            self.downloader.download,
+            workers=self.workers,
+            queue_size=self.queue_size,
+            history_size=self.queue_size + self.workers,
+            on_finish=self._record
+        )
+        self.downloader.metrics.queue_depth.set_function(lambda: pool.stats()['queued'], queue='batch')
+        try:
+            for url in self.iter_unique_urls(lines):
+                # Blocks while the queue is full, which keeps reading in step with downloading
+                pool.submit(url)
+            pool.join()
+        finally:
+            pool.shutdown(wait=False, cancel_pending=True)
+
+    def _run_pipeline(self, lines):
+        DownloadPipeline(
+            self.downloader,
+            extract_concurrency=self.extract_concurrency,
+            download_concurrency=self.workers,
+            merge_workers=self.merge_workers,
+            queue_size=self.queue_size,
+            on_finish=self._record
+        ).run(self.iter_unique_urls(lines))
+
+    def _record(self, job):
+        with self._lock:
+            if job.state == DownloadJob.COMPLETED:
+                self.summary.completed += 1
+            elif job.state == DownloadJob.SKIPPED:
+                self.summary.skipped += 1
+            elif job.state == DownloadJob.FAILED:
+                self.summary.failed += 1
+                if len(self.summary.failures) < self.MAX_REPORTED_FAILURES:
+                    self.summary.failures.append((job.url, job.error))
@@ -1,14 +1,66 @@
 import click
 import os
+import signal
 import sys
-from rich.console import Console
-from .clipboard_monitor import ClipboardMonitor
-from .config import Config
+from .config import Config, parse_size
 from .logger import setup_logger
-from .ui import get_logo, clear_screen, display_status
+from .ui import console, get_logo, clear_screen, display_status
+
+# Commands import the download engine (yt-dlp, asyncio, sqlite3, ...)
+# themselves, so --help, --version and argument errors stay fast
 
 logger = setup_logger()
-console = Console()
+
+def _size_option(ctx, param, value):
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+def _metrics_options(f):
+    f = click.option('--metrics-port', type=click.IntRange(min=0, max=65535),
+                     help='Serve Prometheus metrics on this localhost port')(f)
+    f = click.option('--metrics-file', type=click.Path(dir_okay=False, writable=True),
+                     help='Write metrics as JSON to this file on exit')(f)
+    return f
+
+def _postprocess_option(f):
+    return click.option('--postprocess-workers', type=click.IntRange(min=0),
+                        help='Processes merging and remuxing downloads off the download threads '
+                             '(0 lets yt-dlp run ffmpeg inline)')(f)
+
+def _disk_options(f):
+    f = click.option('--scratch-dir', type=click.Path(file_okay=False),
+                     help='Write downloads here and move them to the output directory when complete')(f)
+    f = click.option('--min-free', callback=_size_option,
+                     help='Free disk space to keep; downloads wait while there is less (e.g. 2G)')(f)
+    return f
+
+def _configure_logging(config, verbose=False, quiet=False):
+    from .logger import configure_logging
+    settings = config.logging
+    try:
+        configure_logging(
+            file=settings['file'],
+            format=settings['format'],
+            max_size=settings['max_size'],
+            backups=settings['backups'],
+            rotate_when=settings['rotate_when']
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not set up the log file: {str(e)}")
+    if verbose:
+        logger.setLevel('DEBUG')
+    elif quiet:
+        logger.setLevel('ERROR')
+
+def _serve_metrics(downloader, port):
+    if port is None:
+        return
+    from .metrics import MetricsServer
+    server = MetricsServer(downloader.metrics, port=port).start()
+    host, port = server.address
+    console.print(f"[cyan]Metrics available at http://{host}:{port}/metrics[/]")
 
 @click.group()
 @click.version_option()
@@ -34,11 +86,49 @@ def cli():
 @click.option('--verbose', '-v', is_flag=True, help='Enable verbose logging')
 @click.option('--quiet', is_flag=True, help='Suppress all output except errors')
 @click.option('--progress/--no-progress', default=True, help='Show/hide progress bar')
+@click.option('--progress-interval', type=click.FloatRange(min=0.1), default=10.0,
+              help='Seconds between progress summaries when output is not a terminal')
 @click.option('--download-archive', '-a',
               type=click.Path(file_okay=True, dir_okay=False),
               help='File to record all downloaded videos')
-def start(output_dir, manual_url, auto, quality, format, verbose, quiet, progress, download_archive):
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=3,
+              help='Number of concurrent download workers')
+@click.option('--queue-size', type=click.IntRange(min=1), default=100,
+              help='Maximum number of URLs waiting for a download worker')
+@click.option('--clipboard-backend',
+              type=click.Choice(['auto', 'wayland', 'x11', 'poll'], case_sensitive=False),
+              default='auto',
+              help='How clipboard changes are detected')
+@click.option('--retries', type=click.IntRange(min=0), default=10,
+              help='Retries per HTTP request or fragment')
+@click.option('--job-retries', type=click.IntRange(min=0), default=3,
+              help='Times a failed download is resumed before giving up')
+@click.option('--retry-backoff', type=click.FloatRange(min=0), default=1.0,
+              help='Initial retry delay in seconds, doubled on every retry')
+@click.option('--concurrent-fragments', type=click.IntRange(min=1), default=4,
+              help='Fragments fetched in parallel for DASH/HLS downloads')
+@click.option('--http-connections', type=click.IntRange(min=1), default=1,
+              help='Parallel range connections per progressive download (requires aria2c)')
+@click.option('--http-chunk-size', callback=_size_option,
+              help='Download progressive files in ranged chunks of this size (e.g. 10M)')
+@click.option('--limit-rate', callback=_size_option,
+              help='Maximum total download rate in bytes per second (e.g. 5M)')
+@click.option('--host-limit-rate', callback=_size_option,
+              help='Maximum download rate per platform in bytes per second')
+@click.option('--max-per-host', type=click.IntRange(min=1),
+              help='Maximum simultaneous downloads per platform')
+@click.option('--job-store', type=click.Path(dir_okay=False),
+              help='SQLite file recording jobs, so queued downloads survive restarts')
+@_postprocess_option
+@_disk_options
+@_metrics_options
+def start(output_dir, manual_url, auto, quality, format, verbose, quiet, progress, progress_interval,
+          download_archive, workers, queue_size, clipboard_backend, retries, job_retries, retry_backoff,
+          concurrent_fragments, http_connections, http_chunk_size, limit_rate, host_limit_rate,
+          max_per_host, job_store, postprocess_workers, scratch_dir, min_free,
+          metrics_port, metrics_file):
     """Start the video downloader with specified options"""
+    from .clipboard_monitor import ClipboardMonitor
     try:
         if not quiet:
             clear_screen()
@@ -49,23 +139,39 @@ def start(output_dir, manual_url, auto, quality, format, verbose, quiet, progres
         if output_dir:
             config.download_path = output_dir
 
-        # Configure logging
-        if verbose:
-            logger.setLevel('DEBUG')
-        elif quiet:
-            logger.setLevel('ERROR')
+        _configure_logging(config, verbose, quiet)
 
         monitor_instance = ClipboardMonitor(config, {
             'quality': quality,
             'format': format,
             'show_progress': progress,
-            'download_archive': download_archive
+            'progress_interval': progress_interval,
+            'download_archive': download_archive,
+            'workers': workers,
+            'queue_size': queue_size,
+            'clipboard_backend': clipboard_backend,
+            'retries': retries,
+            'job_retries': job_retries,
+            'retry_backoff': retry_backoff,
+            'concurrent_fragments': concurrent_fragments,
+            'http_connections': http_connections,
+            'http_chunk_size': http_chunk_size,
+            'limit_rate': limit_rate,
+            'host_limit_rate': host_limit_rate,
+            'max_per_host': max_per_host,
+            'job_store': job_store,
+            'postprocess_workers': postprocess_workers,
+            'scratch_dir': scratch_dir,
+            'min_free': min_free,
+            'metrics_file': metrics_file
         })
+        _serve_metrics(monitor_instance.downloader, metrics_port)
 
         if manual_url:
             if not quiet:
                 display_status("Processing manual URL...")
             monitor_instance.process_url(manual_url)
+            monitor_instance.downloader.close()
             return
 
         if auto:
@@ -84,6 +190,296 @@ def start(output_dir, manual_url, auto, quality, format, verbose, quiet, progres
         console.print(f"\n[red]Error: {str(e)}[/]")
         sys.exit(1)
 
+@cli.command()
+@click.argument('source', type=click.File('r'), default='-')
+@click.option('--output-dir', '-o',
+              type=click.Path(file_okay=False, dir_okay=True, writable=True),
+              help='Directory to save downloaded videos')
+@click.option('--quality', '-q',
+              type=click.Choice(['best', 'medium', '720p', '480p'], case_sensitive=False),
+              default='best',
+              help='Video quality')
+@click.option('--format', '-f',
+              type=click.Choice(['mp4', 'webm', 'mkv'], case_sensitive=False),
+              default='mp4',
+              help='Output video format')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=3,
+              help='Number of concurrent download workers')
+@click.option('--queue-size', type=click.IntRange(min=1), default=100,
+              help='Maximum number of URLs read ahead of the download workers')
+@click.option('--verbose', '-v', is_flag=True, help='Enable verbose logging')
+@click.option('--quiet', is_flag=True, help='Suppress all output except errors')
+@click.option('--progress/--no-progress', default=True, help='Show/hide progress bar')
+@click.option('--progress-interval', type=click.FloatRange(min=0.1), default=10.0,
+              help='Seconds between progress summaries when output is not a terminal')
+@click.option('--download-archive', '-a',
+              type=click.Path(file_okay=True, dir_okay=False),
+              help='File to record all downloaded videos')
+@click.option('--pipeline', is_flag=True,
+              help='Run extraction, download and merging as separate concurrent stages')
+@click.option('--extract-concurrency', type=click.IntRange(min=1), default=8,
+              help='Concurrent metadata extractions in pipeline mode')
+@click.option('--merge-workers', type=click.IntRange(min=1), default=2,
+              help='Processes merging video and audio in pipeline mode, '
+                   'unless --postprocess-workers is given')
+@_postprocess_option
+@_disk_options
+@_metrics_options
+def batch(source, output_dir, quality, format, workers, queue_size, verbose, quiet, progress,
+          progress_interval, download_archive, pipeline, extract_concurrency, merge_workers,
+          postprocess_workers, scratch_dir, min_free, metrics_port, metrics_file):
+    """Download every video URL listed in SOURCE (a file, or '-' for stdin)"""
+    from .batch import BatchDownloader
+    from .downloader import VideoDownloader
+    try:
+        config = Config()
+        if output_dir:
+            config.download_path = output_dir
+
+        _configure_logging(config, verbose, quiet)
+
+        downloader = VideoDownloader(config, {
+            'quality': quality,
+            'format': format,
+            'show_progress': progress and not quiet,
+            'progress_interval': progress_interval,
+            'download_archive': download_archive,
+            'postprocess_workers': postprocess_workers,
+            'scratch_dir': scratch_dir,
+            'min_free': min_free,
+            'metrics_file': metrics_file
+        })
+        _serve_metrics(downloader, metrics_port)
+        try:
+            summary = BatchDownloader(
+                downloader,
+                workers=workers,
+                queue_size=queue_size,
+                url_validator=downloader.url_validator,
+                pipeline=pipeline,
+                extract_concurrency=extract_concurrency,
+                merge_workers=merge_workers
+            ).run(source)
+        finally:
+            downloader.close()
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Batch interrupted.[/]")
+        sys.exit(130)
+    except Exception as e:
+        logger.error(f"Fatal error: {str(e)}")
+        console.print(f"\n[red]Error: {str(e)}[/]")
+        sys.exit(1)
+
+    console.print(
+        f"\n[bold]Processed {summary.submitted} URLs in {summary.elapsed:.1f}s "
+        f"({summary.throughput:.1f} videos/min)[/]"
+    )
+    console.print(
+        f"[green]{summary.completed} downloaded[/], "
+        f"[yellow]{summary.skipped} already archived[/], "
+        f"[red]{summary.failed} failed[/], "
+        f"{summary.duplicates} duplicate and {summary.unsupported} unsupported URLs ignored"
+    )
+    for url, error in summary.failures:
+        console.print(f"[red]  {url}: {error}[/]")
+    if summary.failed > len(summary.failures):
+        console.print(f"[red]  ... and {summary.failed - len(summary.failures)} more[/]")
+
+    if summary.failed:
+        sys.exit(1)
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+@cli.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Address to listen on')
+@click.option('--port', '-p', type=click.IntRange(min=0, max=65535), default=8765, show_default=True,
+              help='TCP port to listen on')
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False),
+              help='Listen on this Unix socket instead of a TCP port')
+@click.option('--output-dir', '-o',
+              type=click.Path(file_okay=False, dir_okay=True, writable=True),
+              help='Directory to save downloaded videos')
+@click.option('--quality', '-q',
+              type=click.Choice(['best', 'medium', '720p', '480p'], case_sensitive=False),
+              default='best',
+              help='Video quality')
+@click.option('--format', '-f',
+              type=click.Choice(['mp4', 'webm', 'mkv'], case_sensitive=False),
+              default='mp4',
+              help='Output video format')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=3,
+              help='Number of concurrent download workers')
+@click.option('--queue-size', type=click.IntRange(min=1), default=1000,
+              help='Maximum number of jobs waiting for a download worker')
+@click.option('--verbose', '-v', is_flag=True, help='Enable verbose logging')
+@click.option('--progress-interval', type=click.FloatRange(min=0.1), default=60.0,
+              help='Seconds between progress summaries in the log output')
+@click.option('--download-archive', '-a',
+              type=click.Path(file_okay=True, dir_okay=False),
+              help='File to record all downloaded videos')
+@click.option('--job-store', type=click.Path(dir_okay=False),
+              help='SQLite file recording jobs, so queued downloads survive restarts')
+@_postprocess_option
+@_disk_options
+@_metrics_options
+def serve(host, port, socket_path, output_dir, quality, format, workers, queue_size, verbose,
+          progress_interval, download_archive, job_store, postprocess_workers, scratch_dir, min_free,
+          metrics_port, metrics_file):
+    """Run the downloader as a daemon that accepts jobs over a local HTTP API"""
+    from .downloader import VideoDownloader
+    from .job_store import JobStore
+    from .service import DownloadService, JobAPIServer
+    try:
+        config = Config()
+        if output_dir:
+            config.download_path = output_dir
+        _configure_logging(config, verbose)
+
+        downloader = VideoDownloader(config, {
+            'quality': quality,
+            'format': format,
+            'progress_interval': progress_interval,
+            'download_archive': download_archive,
+            'postprocess_workers': postprocess_workers,
+            'scratch_dir': scratch_dir,
+            'min_free': min_free,
+            'metrics_file': metrics_file
+        })
+        service = DownloadService(downloader, workers=workers, queue_size=queue_size,
+                                  url_validator=downloader.url_validator,
+                                  store=JobStore(job_store, url_validator=downloader.url_validator)
+                                  if job_store else None)
+        server = JobAPIServer(service, host=host, port=port, socket_path=socket_path)
+    except Exception as e:
+        logger.error(f"Fatal error: {str(e)}")
+        console.print(f"\n[red]Error: {str(e)}[/]")
+        sys.exit(1)
+
+    _serve_metrics(downloader, metrics_port)
+    signal.signal(signal.SIGTERM, _terminate)
+    service.recover()
+    console.print(f"[cyan]Accepting download jobs on {server.address}. Press Ctrl+C to stop.[/]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Shutting down, cancelling queued jobs...[/]")
+    finally:
+        server.close()
+        service.close()
+
+@cli.command()
+@click.argument('sources', nargs=-1)
+@click.option('--output-dir', '-o',
+              type=click.Path(file_okay=False, dir_okay=True, writable=True),
+              help='Directory to save downloaded videos')
+@click.option('--quality', '-q',
+              type=click.Choice(['best', 'medium', '720p', '480p'], case_sensitive=False),
+              default='best',
+              help='Video quality')
+@click.option('--format', '-f',
+              type=click.Choice(['mp4', 'webm', 'mkv'], case_sensitive=False),
+              default='mp4',
+              help='Output video format')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=3,
+              help='Number of concurrent download workers')
+@click.option('--queue-size', type=click.IntRange(min=1), default=100,
+              help='Maximum number of videos listed ahead of the download workers')
+@click.option('--verbose', '-v', is_flag=True, help='Enable verbose logging')
+@click.option('--quiet', is_flag=True, help='Suppress all output except errors')
+@click.option('--progress/--no-progress', default=True, help='Show/hide progress bar')
+@click.option('--progress-interval', type=click.FloatRange(min=0.1), default=10.0,
+              help='Seconds between progress summaries when output is not a terminal')
+@click.option('--download-archive', '-a', required=True,
+              type=click.Path(file_okay=True, dir_okay=False),
+              help='File recording downloaded videos and the sync watermarks')
+@click.option('--full', is_flag=True,
+              help='List every video of the sources instead of stopping at known ones')
+@_postprocess_option
+@_disk_options
+@_metrics_options
+def sync(sources, output_dir, quality, format, workers, queue_size, verbose, quiet, progress,
+         progress_interval, download_archive, full, postprocess_workers, scratch_dir, min_free,
+         metrics_port, metrics_file):
+    """Download new videos of playlists and channels (SOURCES, or sync.sources in config.yaml)"""
+    from .downloader import VideoDownloader
+    from .sync import ChannelSync
+    try:
+        config = Config()
+        if output_dir:
+            config.download_path = output_dir
+        sources = list(sources) or list(config.sync['sources'])
+        if not sources:
+            raise click.UsageError("No sources given and none configured under sync.sources")
+
+        _configure_logging(config, verbose, quiet)
+
+        downloader = VideoDownloader(config, {
+            'quality': quality,
+            'format': format,
+            'show_progress': progress and not quiet,
+            'progress_interval': progress_interval,
+            'download_archive': download_archive,
+            'postprocess_workers': postprocess_workers,
+            'scratch_dir': scratch_dir,
+            'min_free': min_free,
+            'metrics_file': metrics_file
+        })
+        _serve_metrics(downloader, metrics_port)
+        syncer = ChannelSync(
+            downloader,
+            workers=workers,
+            queue_size=queue_size,
+            full=full,
+            stop_after_known=config.sync['stop_after_known'],
+            watermark_size=config.sync['watermark_size']
+        )
+        try:
+            results = syncer.run(sources)
+        finally:
+            downloader.close()
+
+    except click.UsageError:
+        raise
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Sync interrupted, watermarks left unchanged.[/]")
+        sys.exit(130)
+    except Exception as e:
+        logger.error(f"Fatal error: {str(e)}")
+        console.print(f"\n[red]Error: {str(e)}[/]")
+        sys.exit(1)
+
+    console.print(f"\n[bold]Synced {len(results)} sources in {syncer.elapsed:.1f}s[/]")
+    for result in results:
+        if result.error:
+            console.print(f"[red]  {result.source}: {result.error}[/]")
+            continue
+        line = (f"  {result.source}: {result.submitted} new, [green]{result.completed} downloaded[/], "
+                f"[red]{result.failed} failed[/]")
+        if result.stopped_early:
+            line += f" (stopped after {result.listed} listed)"
+        console.print(line)
+
+    if not all(result.ok for result in results):
+        sys.exit(1)
+
+@cli.command('migrate-archive')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.argument('destination', type=click.Path(dir_okay=False))
+def migrate_archive(source, destination):
+    """Import the plain text archive SOURCE into the SQLite archive DESTINATION"""
+    from .archive import migrate_text_archive
+    try:
+        archive = migrate_text_archive(source, destination)
+        count = len(archive)
+        archive.close()
+    except Exception as e:
+        logger.error(f"Archive migration failed: {str(e)}")
+        console.print(f"\n[red]Error: {str(e)}[/]")
+        sys.exit(1)
+    console.print(f"[green]Archive {destination} now holds {count} entries[/]")
+
 def main():
     cli()
 
@@ -0,0 +1,219 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+import pyperclip
+from .logger import setup_logger
+
+logger = setup_logger()
+
+
+class ClipboardBackend:
+    name = 'base'
+
+    def read(self):
+        """Return the current clipboard text"""
+        raise NotImplementedError
+
+    def wait_for_change(self, last, timeout=None):
+        """Block until the clipboard differs from last or timeout expires
+
+        Returns the current clipboard text, which equals last on timeout.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+
+
+class PollingBackend(ClipboardBackend):
+    """Poll the clipboard with adaptive backoff
+
+    Polls every min_interval seconds right after a change and slows down
+    geometrically to max_interval while the clipboard stays idle. The time
+    of the next poll is kept across calls, so callers waking up often to
+    check for shutdown (short timeouts) do not read the clipboard any
+    more often.
+    """
+
+    name = 'poll'
+
+    def __init__(self, paste=None, min_interval=0.25, max_interval=2.0, backoff=1.5):
+        self.paste = paste or pyperclip.paste
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self._next_poll = 0.0
+
+    def read(self):
+        return self.paste()
+
+    def wait_for_change(self, last, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self._next_poll - time.monotonic()
+            if deadline is not None and self._next_poll > deadline:
+                # The next poll is due after this call returns
+                time.sleep(max(deadline - time.monotonic(), 0))
+                return last
+            if delay > 0:
+                time.sleep(delay)
+
+            content = self.read()
+            if content and content != last:
+                self.interval = self.min_interval
+                self._next_poll = time.monotonic() + self.interval
+                return content
+            self._next_poll = time.monotonic() + self.interval
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+
+class WatcherBackend(ClipboardBackend):
+    """Event-driven backend woken up by a selection-change watcher process
+
+    With persistent=True the watcher prints one line per clipboard change
+    and keeps running (wl-paste --watch); otherwise it exits on the next
+    change and is restarted (clipnotify). A watcher that fails is
+    restarted with backoff; after MAX_FAILURES failures in a row the
+    clipboard is polled instead.
+    """
+
+    RESTART_DELAY_MIN = 0.5
+    RESTART_DELAY_MAX = 30
+    MAX_FAILURES = 5
+
+    def __init__(self, name, command, persistent, paste=None):
+        self.name = name
+        self.command = command
+        self.persistent = persistent
+        self.paste = paste or pyperclip.paste
+        self._changed = threading.Event()
+        self._closed = threading.Event()
+        self._process = None
+        self._fallback = None
+        self._thread = threading.Thread(target=self._watch, name=f'clipboard-{name}', daemon=True)
+        self._thread.start()
+
+    def read(self):
+        return self.paste()
+
+    def wait_for_change(self, last, timeout=None):
+        if self._fallback is None:
+            if not self._changed.wait(timeout):
+                return last
+            self._changed.clear()
+            if self._fallback is None:
+                return self.read()
+        return self._fallback.wait_for_change(last, timeout)
+
+    def close(self):
+        self._closed.set()
+        process = self._process
+        if process and process.poll() is None:
+            process.terminate()
+
+    def _watch(self):
+        failures = 0
+        delay = self.RESTART_DELAY_MIN
+        while not self._closed.is_set():
+            error = self._run_watcher()
+            if self._closed.is_set():
+                return
+            if error is None:
+                failures = 0
+                delay = self.RESTART_DELAY_MIN
+                continue
+
+            failures += 1
+            if failures >= self.MAX_FAILURES:
+                logger.warning(f"{error}, polling the clipboard instead")
+                self._fallback = PollingBackend(paste=self.paste)
+                self._changed.set()
+                return
+            logger.warning(f"{error}, restarting it in {delay:g}s")
+            self._closed.wait(delay)
+            delay = min(delay * 2, self.RESTART_DELAY_MAX)
+
+    def _run_watcher(self):
+        """Run the watcher until it exits, returning an error message if it failed"""
+        try:
+            self._process = subprocess.Popen(self.command, stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL)
+        except OSError as e:
+            return f"Cannot start {self.command[0]}: {str(e)}"
+
+        if self.persistent:
+            changed = False
+            for _ in self._process.stdout:
+                changed = True
+                self._changed.set()
+        else:
+            self._process.stdout.read()
+
+        code = self._process.wait()
+        if self.persistent:
+            # A watcher that reported changes before exiting is restarted afresh
+            return None if changed else f"{self.command[0]} exited with status {code}"
+        if code != 0:
+            return f"{self.command[0]} exited with status {code}"
+        self._changed.set()
+        return None
+
+
+class MemoryBackend(ClipboardBackend):
+    """In-memory clipboard for tests and headless benchmarks"""
+
+    name = 'memory'
+
+    def __init__(self, text=''):
+        self._text = text
+        self._condition = threading.Condition()
+
+    def set_text(self, text):
+        """Replace the clipboard content and wake up waiters"""
+        with self._condition:
+            self._text = text
+            self._condition.notify_all()
+
+    def read(self):
+        with self._condition:
+            return self._text
+
+    def wait_for_change(self, last, timeout=None):
+        with self._condition:
+            self._condition.wait_for(lambda: self._text and self._text != last, timeout)
+            return self._text
+
+
+BACKENDS = ('auto', 'wayland', 'x11', 'poll', 'memory')
+
+
+def create_backend(name='auto'):
+    """Create the clipboard backend called name
+
+    'auto' picks an event-driven watcher when one is available (wl-paste
+    on Wayland, clipnotify on X11) and falls back to adaptive polling.
+    """
+    if name == 'auto':
+        if os.environ.get('WAYLAND_DISPLAY') and shutil.which('wl-paste'):
+            name = 'wayland'
+        elif os.environ.get('DISPLAY') and shutil.which('clipnotify'):
+            name = 'x11'
+        else:
+            name = 'poll'
+
+    if name == 'wayland':
+        backend = WatcherBackend('wayland', ['wl-paste', '--watch', 'echo'], persistent=True)
+    elif name == 'x11':
+        backend = WatcherBackend('x11', ['clipnotify', '-s', 'clipboard'], persistent=False)
+    elif name == 'poll':
+        backend = PollingBackend()
+    elif name == 'memory':
+        backend = MemoryBackend()
+    else:
+        raise ValueError(f"Unknown clipboard backend: {name}")
+
+    logger.debug("Using %s clipboard backend", backend.name)
+    return backend
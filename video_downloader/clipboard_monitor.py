@@ -1,28 +1,50 @@
-import pyperclip
-import time
+import queue
+import threading
+from .clipboard_backends import create_backend
 from .url_validator import URLValidator
 from .downloader import VideoDownloader
+from .expansion import CollectionExpander
+from .job_store import JobStore
+from .worker_pool import DownloadWorkerPool
 from .logger import setup_logger
 from .ui import display_status
 
 logger = setup_logger()
 
 class ClipboardMonitor:
-    def __init__(self, config, options=None):
+    ERROR_BACKOFF_MIN = 0.5
+    ERROR_BACKOFF_MAX = 30
+
+    def __init__(self, config, options=None, backend=None):
         self.config = config
         self.options = options or {}
-        self.url_validator = URLValidator()
+        self.clipboard = backend or create_backend(self.options.get('clipboard_backend', 'auto'))
+        self.url_validator = URLValidator(config.supported_platforms)
         self.downloader = VideoDownloader(config, self.options)
+        # Durable job records; without them queued URLs are lost on exit
+        job_store = self.options.get('job_store')
+        self.job_store = JobStore(job_store, url_validator=self.url_validator) if job_store else None
+        self.worker_pool = DownloadWorkerPool(
+            self._download,
+            workers=self.options.get('workers', 3),
+            queue_size=self.options.get('queue_size', 100),
+            store=self.job_store
+        )
+        self.downloader.metrics.queue_depth.set_function(
+            lambda: self.worker_pool.stats()['queued'], queue='clipboard')
+        # Started with the first playlist or channel URL
+        self.expander = None
         self.last_clipboard = ''
+        self._stop = threading.Event()
         self.verify_clipboard_access()
         self.processed_urls = set()
         logger.debug("ClipboardMonitor initialized with config")
-        logger.debug(f"Options: {self.options}")
+        logger.debug("Options: %s", self.options)
 
     def verify_clipboard_access(self):
         """Verify clipboard access is working"""
         try:
-            pyperclip.paste()
+            self.clipboard.read()
             logger.debug("Clipboard access verified successfully")
         except Exception as e:
             logger.error(f"Clipboard access error: {str(e)}")
@@ -35,46 +57,118 @@ class ClipboardMonitor:
         logger.info("Waiting for video URLs to be copied...")
         logger.debug("Supported platforms: YouTube, Facebook, Twitter, Instagram")
 
-        while True:
+        self._stop.clear()
+        if self.job_store:
+            threading.Thread(target=self.worker_pool.recover, name='job-recovery', daemon=True).start()
+
+        error_delay = self.ERROR_BACKOFF_MIN
+        while not self._stop.is_set():
             try:
-                current_clipboard = pyperclip.paste()
+                # Wakes up on clipboard changes, or once a second to check for stop()
+                current_clipboard = self.clipboard.wait_for_change(self.last_clipboard, timeout=1)
+                error_delay = self.ERROR_BACKOFF_MIN
 
                 if current_clipboard and current_clipboard != self.last_clipboard:
-                    logger.debug(f"New clipboard content detected: {current_clipboard[:50]}...")
+                    logger.debug("New clipboard content detected: %s...", current_clipboard[:50])
                     self.last_clipboard = current_clipboard
                     self.process_clipboard_content(current_clipboard)
 
-                time.sleep(1)  # Prevent high CPU usage
-
             except KeyboardInterrupt:
                 logger.info("Stopping clipboard monitor...")
                 break
             except Exception as e:
                 logger.error(f"Error monitoring clipboard: {str(e)}")
-                time.sleep(5)  # Longer delay on error
+                self._stop.wait(error_delay)  # Back off while errors persist
+                error_delay = min(error_delay * 2, self.ERROR_BACKOFF_MAX)
+
+        if self.expander:
+            self.expander.close()
+        self.clipboard.close()
+        # Running downloads still archive and record their jobs, so the
+        # archive and the job store are only closed once they are done
+        logger.info("Waiting for running downloads to finish...")
+        self.worker_pool.shutdown(wait=True, cancel_pending=True)
+        self.downloader.close()
+        if self.job_store:
+            self.job_store.close()
+
+    def stop(self):
+        """Ask start_monitoring to return"""
+        self._stop.set()
 
     def process_clipboard_content(self, content):
         """Process clipboard content for video URLs"""
-        urls = self.url_validator.extract_urls(content)
+        urls = list(self.url_validator.iter_urls(content))
 
         if not urls:
             logger.debug("No URLs found in clipboard content")
             return
 
-        for url in urls:
-            if url in self.processed_urls:
+        for url, domain in urls:
+            if not domain:
+                logger.debug("Unsupported URL format: %s", url)
+                continue
+
+            if self.url_validator.is_collection_url(url):
+                self.expand_url(url)
+                continue
+
+            video_id = self.url_validator.canonical_id(url)
+            if self._already_processed(video_id):
+                self.downloader.metrics.dedupe_hits.inc(reason='clipboard')
                 logger.info(f"Skipping already processed URL: {url}")
                 continue
 
-            if self.url_validator.is_supported_video_url(url):
-                logger.info(f"Found supported video URL: {url}")
-                self.process_url(url)
-                self.processed_urls.add(url)
-            else:
-                logger.debug(f"Unsupported URL format: {url}")
+            logger.info(f"Found supported video URL: {url}")
+            if self.enqueue_url(url) and not self.job_store:
+                self.processed_urls.add(video_id)
+
+    def _already_processed(self, video_id):
+        if self.job_store:
+            return self.job_store.has_video(video_id)
+        return video_id in self.processed_urls
+
+    def enqueue_url(self, url):
+        """Hand a URL to the download workers without blocking the monitor"""
+        try:
+            job = self.worker_pool.submit(url, block=False)
+        except queue.Full:
+            logger.warning(f"Download queue is full, dropping URL: {url}")
+            return False
+        logger.info(f"Queued download job {job.id} for: {url}")
+        return True
+
+    def expand_url(self, url):
+        """Queue the videos of a playlist or channel as they are listed"""
+        if url in self.processed_urls:
+            logger.info(f"Skipping already expanded playlist: {url}")
+            return
+        if self.expander is None:
+            self.expander = CollectionExpander(
+                self.downloader, self._submit_entry,
+                workers=self.options.get('expand_workers', 2)
+            )
+        logger.info(f"Found playlist URL: {url}")
+        self.processed_urls.add(url)
+        self.expander.add(url)
+
+    def _submit_entry(self, url):
+        # Runs on an expander thread, so it may wait for room in the queue
+        video_id = self.url_validator.canonical_id(url)
+        if self._already_processed(video_id):
+            self.downloader.metrics.dedupe_hits.inc(reason='clipboard')
+            return False
+        job = self.worker_pool.submit(url)
+        logger.debug("Queued download job %s for playlist entry: %s", job.id, url)
+        if not self.job_store:
+            self.processed_urls.add(video_id)
+        return True
+
+    def _download(self, url):
+        return self.downloader.download(url)
 
     def process_url(self, url):
-        """Process a single video URL"""
+        """Download a video, or every new video of a playlist or channel"""
         try:
             logger.info(f"Starting download for: {url}")
             self.downloader.download(url)
@@ -1,10 +1,24 @@
 import os
-import yaml
+import re
 from .logger import setup_logger
 
 logger = setup_logger()
 
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+def parse_size(value):
+    """Parse a byte size such as 1048576, '512K' or '10M' into bytes"""
+    if value is None or isinstance(value, int):
+        return value
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
 class Config:
+    # Nested settings whose keys are merged over the defaults one by one
+    SECTIONS = ('archive', 'info_cache', 'limits', 'sync', 'storage', 'postprocess', 'formats', 'disk', 'logging')
+
     def __init__(self):
         self.config_file = 'config.yaml'
         self.load_config()
@@ -20,19 +34,71 @@ class Config:
                 'fb.watch',
                 'twitter.com',
                 'instagram.com'
-            ]
+            ],
+            'archive': {
+                'batch_size': 1,
+                'sync': 'normal'
+            },
+            'info_cache': {
+                'enabled': True,
+                'directory': None,
+                'ttl': 3600,
+                'memory_entries': 256,
+                'disk_entries': 10000
+            },
+            'limits': {
+                'rate': None,
+                'host_rate': None,
+                'host_concurrency': None,
+                'hosts': {}
+            },
+            'sync': {
+                'sources': [],
+                'stop_after_known': 10,
+                'watermark_size': 5
+            },
+            'storage': {
+                'layout': 'plain',
+                'directory': None,
+                'link': 'hardlink',
+                'algorithm': 'sha256'
+            },
+            'postprocess': {
+                'workers': 0,
+                'embed_metadata': False,
+                'embed_thumbnail': False
+            },
+            'formats': {
+                'prefer_single_file': True,
+                'single_file_min_height': None,
+                'match_container': True,
+                'max_height': None,
+                'max_fps': None,
+                'max_bitrate': None,
+                'max_filesize': None,
+                'platforms': {}
+            },
+            'disk': {
+                'min_free': 0,
+                'scratch_directory': None,
+                'poll_interval': 5
+            },
+            'logging': {
+                'file': 'video_downloader.log',
+                'format': 'text',
+                'max_size': '10M',
+                'backups': 5,
+                'rotate_when': None
+            }
         }
         
         try:
+            config = {}
             if os.path.exists(self.config_file):
+                import yaml
                 with open(self.config_file, 'r') as f:
-                    config = yaml.safe_load(f)
-                    self.download_path = config.get('download_path', defaults['download_path'])
-                    self.supported_platforms = config.get('supported_platforms', 
-                                                        defaults['supported_platforms'])
-            else:
-                self.download_path = defaults['download_path']
-                self.supported_platforms = defaults['supported_platforms']
+                    config = yaml.safe_load(f) or {}
+            self._apply(config, defaults)
                 
             # Ensure download directory exists
             os.makedirs(self.download_path, exist_ok=True)
@@ -40,5 +106,12 @@ class Config:
         except Exception as e:
             logger.error(f"Error loading config: {str(e)}")
             logger.info("Using default configuration")
-            self.download_path = defaults['download_path']
-            self.supported_platforms = defaults['supported_platforms']
+            self._apply({}, defaults)
+
+    def _apply(self, config, defaults):
+        """Set attributes from a parsed config file, falling back to defaults"""
+        self.download_path = os.path.expanduser(config.get('download_path', defaults['download_path']))
+        self.supported_platforms = config.get('supported_platforms', 
+                                            defaults['supported_platforms'])
+        for section in self.SECTIONS:
+            setattr(self, section, {**defaults[section], **(config.get(section) or {})})
@@ -0,0 +1,128 @@
+import errno
+import os
+import shutil
+import threading
+from .logger import setup_logger
+
+logger = setup_logger()
+
+
+class InsufficientDiskSpace(Exception):
+    pass
+
+
+def estimate_size(info):
+    """Return the expected size in bytes of the formats selected in info, or 0 if unknown"""
+    formats = info.get('requested_formats') or [info]
+    return sum(f.get('filesize') or f.get('filesize_approx') or 0 for f in formats)
+
+
+def move_file(src, dst):
+    """Move src to dst without dst ever being visible half written
+
+    Within a filesystem this is a rename. Across filesystems the file is
+    copied next to dst under a temporary name, which is then renamed over
+    dst, so readers of the final directory only ever see complete files.
+    """
+    try:
+        os.replace(src, dst)
+        return dst
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    temp = os.path.join(os.path.dirname(dst) or '.', f".{os.path.basename(dst)}.moving")
+    try:
+        shutil.copy2(src, temp)
+        os.replace(temp, dst)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    os.remove(src)
+    return dst
+
+
+class DiskSpaceGuard:
+    """Reserves disk space for downloads before they start
+
+    Every job reserves the bytes it is expected to write on each
+    filesystem it writes to. A reservation waits while the free space,
+    less what running jobs have reserved, would drop below min_free, so
+    jobs queue up instead of failing late on a full disk; waiting jobs are
+    woken when a reservation is released and re-check every poll_interval
+    seconds in case space was freed by other means. A job that would not
+    fit even with nothing else running fails right away with
+    InsufficientDiskSpace. Reservations are not reduced as files are
+    written, so the accounting errs on the safe side.
+    """
+
+    def __init__(self, min_free=0, poll_interval=5.0, disk_usage=shutil.disk_usage):
+        self.min_free = min_free or 0
+        self.poll_interval = poll_interval
+        self._disk_usage = disk_usage
+        self._reservations = {}
+        self._reserved = {}
+        self._condition = threading.Condition()
+
+    def reserve(self, key, needs):
+        """Reserve space for the job key, waiting until it is available
+
+        needs maps directories to the bytes that will be written there.
+        A previous reservation of key is replaced.
+        """
+        devices = {}
+        for path, size in needs.items():
+            device = os.stat(path).st_dev
+            entry = devices.setdefault(device, [path, 0])
+            entry[1] += max(0, int(size or 0))
+
+        with self._condition:
+            self._release(key)
+            waiting = False
+            while True:
+                blocked = self._blocked(devices)
+                if blocked is None:
+                    break
+                path, size, free, others = blocked
+                if not others and size and free >= self.min_free:
+                    raise InsufficientDiskSpace(
+                        f"Not enough disk space in {path}: {size} bytes needed, "
+                        f"{free - self.min_free} available")
+                if not waiting:
+                    logger.warning(f"Waiting for disk space in {path}: {free} bytes free, "
+                                   f"{others} reserved, {size} needed")
+                    waiting = True
+                self._condition.wait(self.poll_interval)
+            if waiting:
+                logger.info("Disk space available, resuming")
+            for device, (_, size) in devices.items():
+                self._reserved[device] = self._reserved.get(device, 0) + size
+            self._reservations[key] = {device: size for device, (_, size) in devices.items()}
+
+    def _blocked(self, devices):
+        """Return (path, size, free, reserved) of the first filesystem without room, or None"""
+        for device, (path, size) in devices.items():
+            free = self._disk_usage(path).free
+            reserved = self._reserved.get(device, 0)
+            if free - reserved - size < self.min_free:
+                return path, size, free, reserved
+        return None
+
+    def release(self, key):
+        """Release the reservation of key, if any"""
+        with self._condition:
+            if self._release(key):
+                self._condition.notify_all()
+
+    def _release(self, key):
+        reservation = self._reservations.pop(key, None)
+        if reservation is None:
+            return False
+        for device, size in reservation.items():
+            self._reserved[device] -= size
+        return True
+
+    def reserved(self):
+        """Return the total bytes currently reserved"""
+        with self._condition:
+            return sum(self._reserved.values())
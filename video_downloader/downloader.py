@@ -1,107 +1,737 @@
-import yt_dlp
+import contextlib
 import os
 import hashlib
+import shutil
+import threading
+import time
+from yt_dlp.utils import DownloadError, sanitize_filename
+from .archive import open_archive
+from .info_cache import InfoCache, default_cache_dir
+from .limits import TransferLimiter
 from .logger import setup_logger
-from .ui import create_progress_bar, display_status
+from .metrics import DownloadMetrics, TransferMeter, error_class
+from .config import parse_size
+from .diskspace import DiskSpaceGuard, estimate_size, move_file
+from .formats import format_selector
+from .postprocess import PostProcessor
+from .progress import ProgressRenderer
+from .retry import RetryPolicy
+from .storage import ContentStore, TransferHasher
+from .ui import display_status
+from .url_validator import URLValidator
+from .ydl_session import YoutubeDLSessionPool
 
 logger = setup_logger()
 
+# Errors of expired stream URLs, after which cached info is extracted again
+EXPIRED_URL_ERRORS = ('HTTP Error 403', 'HTTP Error 410')
+
+# Browsers tried, in order, for cookies of logged-in sessions
+COOKIE_BROWSERS = ('chrome', 'firefox', 'safari', 'edge')
+
+_UNSET = object()
+
+
+class _CookieLogger:
+    """Routes yt-dlp's cookie extraction messages to the debug log"""
+
+    def debug(self, message, *args, **kwargs):
+        logger.debug(message)
+
+    info = warning = error = debug
+
+
 class VideoDownloader:
     def __init__(self, config, options=None):
         self.config = config
         self.options = options or {}
-        self.downloaded_urls = set()
-        self.progress = create_progress_bar()
+        self.progress = ProgressRenderer(
+            enabled=self.options.get('show_progress', True),
+            refresh_per_second=self.options.get('progress_refresh', 4),
+            summary_interval=self.options.get('progress_interval', 10.0)
+        )
+        self.url_validator = URLValidator(config.supported_platforms)
+        self._lock = threading.Lock()
+        self._detected_browser = _UNSET
+        self.sessions = YoutubeDLSessionPool(cookie_ttl=self.options.get('cookie_ttl', 3600))
+        self.retry_policy = RetryPolicy(
+            retries=self.options.get('retries', 10),
+            backoff=self.options.get('retry_backoff', 1.0)
+        )
+        self.job_retry_policy = RetryPolicy(
+            retries=self.options.get('job_retries', 3),
+            backoff=self.options.get('retry_backoff', 1.0) * 5
+        )
 
-        # Load download archive if specified
+        # Open download archive (in memory unless a file is specified)
         self.archive_file = self.options.get('download_archive')
-        if self.archive_file and os.path.exists(self.archive_file):
-            with open(self.archive_file, 'r') as f:
-                self.downloaded_urls.update(line.strip() for line in f)
+        self.archive = open_archive(
+            self.archive_file,
+            batch_size=self.config.archive['batch_size'],
+            sync=self.config.archive['sync']
+        )
+        self._in_flight = set()
+
+        self.metrics = DownloadMetrics()
+        self.metrics.active_downloads.set_function(lambda: len(self._in_flight))
+
+        # Bandwidth and per-platform concurrency limits across all jobs
+        limits = self.config.limits
+        self.limiter = TransferLimiter(
+            rate=self.options.get('limit_rate') or limits['rate'],
+            host_rate=self.options.get('host_limit_rate') or limits['host_rate'],
+            host_concurrency=self.options.get('max_per_host') or limits['host_concurrency'],
+            hosts=limits['hosts'],
+            platforms=self.config.supported_platforms
+        )
+
+        # Cache of extracted info, shared by retries and different quality settings
+        cache_settings = self.config.info_cache
+        self.info_cache = None
+        if cache_settings['enabled'] and self.options.get('info_cache', True):
+            self.info_cache = InfoCache(
+                directory=os.path.expanduser(cache_settings['directory'] or default_cache_dir()),
+                ttl=cache_settings['ttl'],
+                memory_entries=cache_settings['memory_entries'],
+                disk_entries=cache_settings['disk_entries']
+            )
+
+        # Content-addressed layout: files are stored once per digest and
+        # linked into download_path under their titles
+        storage = self.config.storage
+        self.store = None
+        if storage['layout'] == 'content':
+            self.store = ContentStore(
+                os.path.expanduser(storage['directory'] or os.path.join(self.config.download_path, '.store')),
+                link=storage['link'],
+                algorithm=storage['algorithm']
+            )
+        elif storage['layout'] != 'plain':
+            raise ValueError(f"Invalid storage layout: {storage['layout']}")
+
+        # Without a post-processing pool yt-dlp runs ffmpeg inline
+        self.postprocess = self.config.postprocess
+        workers = self.options.get('postprocess_workers')
+        if workers is None:
+            workers = self.postprocess['workers']
+        self.postprocessor = PostProcessor(workers) if workers else None
+
+        # Downloads are written to the scratch directory, if any, and moved
+        # to their final directory once complete
+        disk = self.config.disk
+        scratch = self.options.get('scratch_dir') or disk['scratch_directory']
+        self.scratch = os.path.expanduser(scratch) if scratch else None
+        if self.scratch:
+            os.makedirs(self.scratch, exist_ok=True)
+        self.disk = DiskSpaceGuard(
+            min_free=parse_size(self.options.get('min_free') or disk['min_free']),
+            poll_interval=disk['poll_interval']
+        )
 
     def _get_video_id(self, url):
-        """Generate a unique identifier for the video URL"""
+        """Return the canonical identifier of the video the URL points to"""
+        return self.url_validator.canonical_id(url)
+
+    def _get_legacy_video_id(self, url):
+        """Return the MD5-of-URL identifier written by older versions"""
         return hashlib.md5(url.encode()).hexdigest()
 
-    def _update_archive(self, video_id):
-        """Update download archive with new video ID"""
-        if self.archive_file:
-            with open(self.archive_file, 'a') as f:
-                f.write(f"{video_id}\n")
+    def _session_key(self, platform=None):
+        """Return the key identifying the yt-dlp option set for this downloader"""
+        return (
+            self.options.get('quality', 'best'),
+            self.options.get('format', 'mp4'),
+            self.config.download_path,
+            platform,
+        )
 
-    def download(self, url):
-        """Download video from URL with progress tracking"""
-        video_id = self._get_video_id(url)
+    def _session(self, url, progress_hook=None):
+        """Check out a yt-dlp session using the format profile of url"""
+        platform = self._format_platform(url)
+        return self.sessions.session(self._session_key(platform),
+                                     lambda: self._build_ydl_opts(platform), progress_hook)
 
-        if video_id in self.downloaded_urls:
-            display_status(f"Video already downloaded: {url}", style="bold yellow")
-            return
+    def _format_platform(self, url):
+        """Return the platform whose format profile applies to url, or None for the default"""
+        platform = self.url_validator.platform(url) if url else None
+        return platform if platform in (self.config.formats['platforms'] or {}) else None
+
+    def _format_selector(self, platform=None):
+        """Return the yt-dlp format selector for the quality setting and a platform's profile"""
+        profile = {key: value for key, value in self.config.formats.items() if key != 'platforms'}
+        if platform:
+            profile.update(self.config.formats['platforms'][platform] or {})
+        return format_selector(self.options.get('quality', 'best'), self.options.get('format', 'mp4'), profile)
 
-        def progress_hook(d):
-            if d['status'] == 'downloading':
-                # Calculate progress percentage
-                if 'total_bytes' in d:
-                    percentage = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                elif 'total_bytes_estimate' in d:
-                    percentage = (d['downloaded_bytes'] / d['total_bytes_estimate']) * 100
-                else:
-                    percentage = 0
-
-                # Update progress bar
-                if hasattr(self, 'task'):
-                    self.task.update(completed=percentage)
-
-        # Configure format based on quality setting
-        quality_format = {
-            'best': 'bestvideo+bestaudio/best',
-            'medium': 'bestvideo[height<=720]+bestaudio/best[height<=720]',
-            '720p': 'bestvideo[height<=720]+bestaudio/best[height<=720]',
-            '480p': 'bestvideo[height<=480]+bestaudio/best[height<=480]'
-        }.get(self.options.get('quality', 'best'), 'best')
-
-        # Configure output format
+    def _build_ydl_opts(self, platform=None):
+        """Build the yt-dlp options shared by the downloads of one format profile"""
         output_format = self.options.get('format', 'mp4')
 
-        # Setup yt-dlp options with multi-browser cookies support
         ydl_opts = {
-            'format': quality_format,
+            'format': self._format_selector(platform),
             'merge_output_format': output_format,
-            'outtmpl': os.path.join(self.config.download_path, '%(title)s.%(ext)s'),
-            'progress_hooks': [progress_hook] if self.options.get('show_progress', True) else [],
+            'outtmpl': self._output_template(),
             'quiet': True,
-            'cookiesfrombrowser': ('chrome', 'firefox', 'safari', 'edge'),  # Try multiple browsers
+            # Progress is drawn by ProgressRenderer from the progress hooks
+            'noprogress': True,
+            # Keep .part files and resume them instead of starting over
+            'continuedl': True,
+            'nopart': False,
+            'retries': self.retry_policy.retries,
+            'fragment_retries': self.retry_policy.retries,
+            'file_access_retries': self.retry_policy.retries,
+            'extractor_retries': self.retry_policy.retries,
+            'retry_sleep_functions': self.retry_policy.sleep_functions(),
+            # Parallel fragment fetching for DASH/HLS sources
+            'concurrent_fragment_downloads': self.options.get('concurrent_fragments', 4),
+            # A watch URL inside a playlist means that one video; playlists and
+            # channels are expanded into separate jobs by iter_entries()
+            'noplaylist': True,
         }
 
+        browser = self._cookie_browser()
+        if browser:
+            ydl_opts['cookiesfrombrowser'] = (browser,)
+
+        chunk_size = self.options.get('http_chunk_size')
+        if chunk_size:
+            # Ranged requests: a dropped connection only costs one chunk
+            ydl_opts['http_chunk_size'] = chunk_size
+
+        connections = self.options.get('http_connections', 1)
+        if connections > 1:
+            # yt-dlp's native HTTP downloader uses one connection per file
+            if shutil.which('aria2c'):
+                ydl_opts['external_downloader'] = {'http': 'aria2c'}
+                ydl_opts['external_downloader_args'] = {'aria2c': [
+                    '--continue=true', '-x', str(connections), '-s', str(connections),
+                    '-k', str(chunk_size or 1024 ** 2),
+                ]}
+            else:
+                logger.warning("aria2c not found, downloading progressive files over one connection")
+
+        if not self.postprocessor:
+            postprocessors = []
+            if self.postprocess['embed_metadata']:
+                postprocessors.append({'key': 'FFmpegMetadata', 'add_metadata': True})
+            if self.postprocess['embed_thumbnail']:
+                ydl_opts['writethumbnail'] = True
+                postprocessors.append({'key': 'EmbedThumbnail'})
+            if postprocessors:
+                ydl_opts['postprocessors'] = postprocessors
+
+        return ydl_opts
+
+    def _cookie_browser(self):
+        """Return the browser to read cookies from, or None
+
+        The cookies_from_browser option names one browser, or disables
+        browser cookies when false. By default the first of
+        COOKIE_BROWSERS whose cookies can be read is used; the probe runs
+        once per downloader.
+        """
+        browser = self.options.get('cookies_from_browser', 'auto')
+        if browser != 'auto':
+            return browser or None
+        with self._lock:
+            if self._detected_browser is _UNSET:
+                self._detected_browser = self._detect_cookie_browser()
+            return self._detected_browser
+
+    @staticmethod
+    def _detect_cookie_browser():
+        from yt_dlp.cookies import extract_cookies_from_browser
+        for browser in COOKIE_BROWSERS:
+            try:
+                extract_cookies_from_browser(browser, logger=_CookieLogger())
+            except Exception as e:
+                logger.debug("No cookies from %s: %s", browser, e)
+                continue
+            logger.debug("Using cookies from %s", browser)
+            return browser
+        logger.debug("No browser cookies found, downloading without them")
+        return None
+
+    def _output_template(self):
+        if self.store:
+            # Unique per video, so titles never collide before linking
+            return os.path.join(self.scratch or self.store.incoming, '%(extractor_key)s-%(id)s.%(ext)s')
+        return os.path.join(self.scratch or self.config.download_path, '%(title)s.%(ext)s')
+
+    def _hasher(self):
+        """Return a TransferHasher for one download, or None without a content store"""
+        if self.store is None:
+            return None
+        # aria2c fills files out of order, so they are hashed once complete
+        external = self.options.get('http_connections', 1) > 1 and shutil.which('aria2c')
+        return TransferHasher(self.store.algorithm, streaming=not external)
+
+    def store_file(self, path, info):
+        """Move a finished download to its final location
+
+        With a content store the file is added to it, using the digest
+        recorded in info by fetch() or _download(). Otherwise a file in the
+        scratch directory is moved to download_path. Returns the readable
+        path of the video.
+        """
+        digest = info.get('content_digest')
+        if self.store is None or not digest:
+            if self.scratch and os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.scratch):
+                return move_file(path, os.path.join(self.config.download_path, os.path.basename(path)))
+            return path
+        ext = os.path.splitext(path)[1]
+        title = sanitize_filename(info.get('title') or info.get('id') or digest)
+        name = os.path.join(self.config.download_path, title + ext)
+        linked, duplicate = self.store.add(path, digest, name, info.get('content_sources') or (), info)
+        if duplicate:
+            self.metrics.dedupe_hits.inc(reason='content')
+        return linked
+
+    def _record_digest(self, info, hasher, path):
+        if hasher is None:
+            return
+        digest, sources = hasher.digest(path)
+        info['content_digest'] = digest
+        info['content_sources'] = sources
+
+    def close(self):
+        """Release the pooled yt-dlp sessions, flush the archive and dump metrics"""
+        self.sessions.close()
+        self.archive.close()
+        if self.postprocessor:
+            self.postprocessor.close()
+        metrics_file = self.options.get('metrics_file')
+        if metrics_file:
+            try:
+                self.metrics.dump(metrics_file)
+            except OSError as e:
+                logger.error(f"Could not write metrics to {metrics_file}: {str(e)}")
+        if self.info_cache:
+            stats = self.info_cache.stats()
+            logger.debug("Info cache: %s hits, %s misses", stats['hits'], stats['misses'])
+
+    @contextlib.contextmanager
+    def _transfer(self, url, merge=False, hash_hook=None):
+        """Hold a download slot of url's platform and yield its yt-dlp progress hook
+
+        The hook feeds the bandwidth limiter, the progress display, the
+        transfer metrics and, if given, the hash_hook of the content store.
+        """
+        with self.limiter.slot(url), self.progress.task(url) as progress_hook:
+            meter = TransferMeter(self.metrics, self.limiter.host(url), merge=merge)
+            hooks = [h for h in (self.limiter.progress_hook(url), progress_hook, meter.hook,
+                                 hash_hook) if h]
+
+            def hook(d):
+                for h in hooks:
+                    h(d)
+
+            try:
+                yield hook
+            finally:
+                meter.finish()
+
+    def claim(self, url):
+        """Reserve a URL for downloading
+
+        Returns its video ID, or None when the video is already archived or
+        being downloaded. A claimed ID must be given back with release().
+        """
+        video_id = self._get_video_id(url)
+
+        with self._lock:
+            if video_id in self._in_flight:
+                self.metrics.dedupe_hits.inc(reason='in_flight')
+                display_status(f"Video already being downloaded: {url}", style="bold yellow")
+                return None
+            if self._archived(url, video_id):
+                self.metrics.dedupe_hits.inc(reason='archive')
+                display_status(f"Video already downloaded: {url}", style="bold yellow")
+                return None
+            self._in_flight.add(video_id)
+        return video_id
+
+    def _archived(self, url, video_id):
+        return video_id in self.archive or self._get_legacy_video_id(url) in self.archive
+
+    def is_collection(self, url):
+        """Check if url is a playlist or channel to expand with iter_entries()"""
+        return self.url_validator.is_collection_url(url)
+
+    def iter_entries(self, url, stop=None):
+        """Lazily yield the video URLs of a playlist or channel
+
+        Pages of the listing are only fetched as entries are consumed, so a
+        channel with thousands of videos is never held in memory. Videos
+        already in the archive are skipped without being extracted, and
+        nested playlists (e.g. a channel's tabs) are expanded in turn.
+
+        stop, if given, is called as stop(listing, video_id, archived) for
+        every video listed; returning True ends that listing, so none of
+        its remaining pages are fetched.
+        """
+        with self._session(url) as ydl:
+            yield from self._walk_entries(ydl, url, self._list_entries(ydl, url), stop)
+
+    def _list_entries(self, ydl, url):
+        logger.info(f"Expanding playlist: {url}")
+        return self.job_retry_policy.run(
+            lambda: ydl.extract_info(url, download=False, process=False),
+            retry_on=(DownloadError,),
+            description=f"Expansion of {url}"
+        )
+
+    def _walk_entries(self, ydl, url, info, stop=None):
+        if info.get('_type', 'video') not in ('playlist', 'multi_video'):
+            yield info.get('webpage_url') or url
+            return
+
+        count = 0
+        for entry in info.get('entries') or ():
+            if not entry:
+                continue
+            entry_url = entry.get('webpage_url') or entry.get('url')
+            if not entry_url or '://' not in entry_url:
+                logger.debug("Skipping playlist entry without a URL: %s", entry.get('id'))
+                continue
+
+            if entry.get('_type') in ('playlist', 'multi_video'):
+                yield from self._walk_entries(ydl, entry_url, entry, stop)
+                continue
+            if self.is_collection(entry_url):
+                yield from self._walk_entries(ydl, entry_url, self._list_entries(ydl, entry_url), stop)
+                continue
+
+            video_id = self._get_video_id(entry_url)
+            archived = self._archived(entry_url, video_id)
+            if stop and stop(url, video_id, archived):
+                logger.info(f"Reached known videos, stopped listing: {url}")
+                break
+            if archived:
+                self.metrics.dedupe_hits.inc(reason='archive')
+            else:
+                count += 1
+                yield entry_url
+        logger.info(f"Found {count} new videos in playlist: {url}")
+
+    def release(self, video_id, downloaded=False):
+        """Release a claimed video ID, recording it in the archive if downloaded"""
+        if downloaded:
+            self.archive.add(video_id)
+            self.metrics.downloads.inc()
+        self.disk.release(video_id)
+        with self._lock:
+            self._in_flight.discard(video_id)
+
+    def reserve_space(self, video_id, info):
+        """Reserve the disk space the download of info needs, waiting while it is short
+
+        Merging, remuxing and embedding write a second copy next to the
+        downloaded files. The finished file only takes space of its own in
+        its final directory when that is on another filesystem. The
+        reservation is held until the video ID is released.
+        """
+        size = estimate_size(info)
+        output_format = self.options.get('format', 'mp4')
+        rewritten = (info.get('requested_formats') or self.postprocess['embed_thumbnail']
+                     or self.postprocess['embed_metadata']
+                     or (self.postprocessor and info.get('ext') != output_format))
+        work = os.path.dirname(self._output_template())
+        final = self.store.directory if self.store else self.config.download_path
+        needs = {work: size * 2 if rewritten else size}
+        if os.stat(work).st_dev != os.stat(final).st_dev:
+            needs[final] = size
+        self.disk.reserve(video_id, needs)
+
+    def download(self, url):
+        """Download video from URL with progress tracking
+
+        Safe to call from several worker threads at once; the calling thread
+        waits while its platform is at its concurrency limit. Returns True when
+        the video was downloaded and False when it was skipped as a duplicate.
+        Playlists and channels are downloaded video by video, see
+        _download_collection().
+        """
+        if self.is_collection(url):
+            return self._download_collection(url)
+
+        video_id = self.claim(url)
+        if video_id is None:
+            return False
+
+        downloaded = False
+        try:
+            self._download(url)
+            downloaded = True
+            return True
+        finally:
+            self.release(video_id, downloaded)
+
+    def _download_collection(self, url):
+        """Download the videos of a playlist or channel, each under its own claim
+
+        Archived videos are skipped while listing, and a failed video does
+        not stop the others; the failures are raised together at the end.
+        Returns True when any video was downloaded.
+        """
+        downloaded = False
+        failed = 0
+        for entry_url in self.iter_entries(url):
+            try:
+                downloaded = self.download(entry_url) or downloaded
+            except Exception:
+                # Already reported by download()
+                failed += 1
+        if failed:
+            raise DownloadError(f"{failed} videos of {url} failed")
+        return downloaded
+
+    def _download(self, url):
+        """Run the whole yt-dlp download (extraction, transfer and merge)"""
         try:
             display_status(f"Starting download: {url}")
+            if self.postprocessor:
+                self._download_offloaded(url)
+                display_status(f"Successfully downloaded: {url}", style="bold green")
+                return
+
+            video_id = self._get_video_id(url)
+            # One hasher per video, so the videos of a post are not digested as one
+            hashers = {}
+            current = [None]
 
-            with self.progress:
-                self.task = self.progress.add_task(
-                    f"[cyan]Downloading: {url}",
-                    total=100
-                )
+            def hash_hook(d):
+                if current[0]:
+                    current[0].hook(d)
 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    logger.info(f"Starting download: {url}")
-                    ydl.download([url])
+            with self._transfer(url, merge=True, hash_hook=hash_hook if self.store else None) as hook:
+                def process(ydl, info):
+                    # e.g. posts with several videos
+                    videos = self._videos(info)
+                    for index, video in enumerate(videos):
+                        # Formats are selected, so their size is known before any byte is written
+                        self.reserve_space(video_id, video)
+                        if index not in hashers:
+                            hashers[index] = self._hasher()
+                        current[0] = hashers[index]
+                        ydl.process_info(video)
+                    return videos
+
+                def attempt():
+                    with self._session(url, hook) as ydl:
+                        logger.info(f"Starting download: {url}")
+                        try:
+                            return process(ydl, self._extract(ydl, url, download=False))
+                        except DownloadError as e:
+                            if not self._expired(url, e):
+                                raise
+                            return process(ydl, self._extract(ydl, url, download=False, cached=False))
+
+                # Retries resume from the partial file left by the failed attempt
+                videos = self.job_retry_policy.run(attempt, retry_on=(DownloadError,),
+                                                   description=f"Download of {url}")
+
+            if self.store or self.scratch:
+                for index, video in enumerate(videos):
+                    path = video.get('filepath')
+                    if path and os.path.exists(path):
+                        self._record_digest(video, hashers.get(index), path)
+                        self.store_file(path, video)
+                    else:
+                        logger.warning(f"Downloaded file of {url} not found, not storing it")
 
             display_status(f"Successfully downloaded: {url}", style="bold green")
-            self.downloaded_urls.add(video_id)
-            self._update_archive(video_id)
 
         except Exception as e:
-            error_msg = str(e)
-            if "Sign in to confirm you're not a bot" in error_msg:
-                helpful_msg = (
-                    f"Failed to download: {url}\n"
-                    "YouTube requires authentication for this video.\n"
-                    "Try one of these solutions:\n"
-                    "1. Export cookies from your browser using yt-dlp's browser extension\n"
-                    "2. Use a different video URL\n"
-                    "3. Try downloading a non-age-restricted video"
-                )
-                display_status(helpful_msg, style="bold red")
-            else:
-                display_status(f"Failed to download: {url}\nError: {error_msg}", style="bold red")
-            logger.error(f"Download failed for {url}: {error_msg}")
-            raise
\ No newline at end of file
+            self.report_failure(url, e)
+            raise
+
+    @staticmethod
+    def _videos(info):
+        """Return the videos of an extracted result, e.g. the several videos of one post"""
+        if info.get('_type', 'video') == 'video':
+            return [info]
+        return [entry for entry in info.get('entries') or [] if entry]
+
+    def _download_offloaded(self, url):
+        """Download the streams, then merge and remux them in the post-processing pool
+
+        The download slot is released before ffmpeg runs, so the next
+        download can start while this one is processed.
+        """
+        video_id = self._get_video_id(url)
+        for info in self._videos(self.extract_info(url)):
+            self.reserve_space(video_id, info)
+            target, parts = self.fetch(info)
+            self.store_file(self.postprocess_video(info, target, parts), info)
+
+    def postprocess_video(self, info, target, parts):
+        """Merge, remux and embed a fetched video in the post-processing pool
+
+        target and parts are as returned by fetch(). The streams are muxed
+        into --format, with the thumbnail and metadata if configured.
+        Returns the path of the finished file.
+        """
+        output = f"{os.path.splitext(target)[0]}.{self.options.get('format', 'mp4')}"
+        thumbnail = self._fetch_thumbnail(info, target) if self.postprocess['embed_thumbnail'] else None
+        metadata = self._metadata(info) if self.postprocess['embed_metadata'] else None
+
+        if parts or output != target or thumbnail or metadata:
+            started = time.monotonic()
+            self.postprocessor.run(
+                parts or [target], output,
+                codecs=[(f.get('vcodec'), f.get('acodec')) for f in info.get('requested_formats') or [info]],
+                thumbnail=thumbnail,
+                metadata=metadata
+            )
+            self.metrics.stage_seconds.observe(time.monotonic() - started, stage='postprocess')
+        return output
+
+    def _fetch_thumbnail(self, info, target):
+        url = info.get('thumbnail')
+        if not url:
+            return None
+        ext = os.path.splitext(url.split('?')[0])[1].lower() or '.jpg'
+        path = os.path.splitext(target)[0] + ext
+        try:
+            with self._session(info.get('webpage_url')) as ydl:
+                data = ydl.urlopen(url).read()
+            with open(path, 'wb') as f:
+                f.write(data)
+        except Exception as e:
+            logger.warning(f"Could not download thumbnail {url}: {str(e)}")
+            return None
+        return path
+
+    @staticmethod
+    def _metadata(info):
+        return {
+            'title': info.get('title'),
+            'artist': info.get('uploader') or info.get('channel'),
+            'date': info.get('upload_date'),
+            'description': info.get('description'),
+            'comment': info.get('webpage_url'),
+        }
+
+    def extract_info(self, url, cached=True):
+        """Pipeline stage 1: extract metadata and select formats, without downloading"""
+        with self._session(url) as ydl:
+            logger.info(f"Extracting info: {url}")
+            return self.job_retry_policy.run(
+                lambda: self._extract(ydl, url, download=False, cached=cached),
+                retry_on=(DownloadError,),
+                description=f"Extraction of {url}"
+            )
+
+    def _extract(self, ydl, url, download, cached=True):
+        """Extract url, reusing cached extractor output, then select formats
+
+        Only the extractor output is cached; format selection runs on every
+        call, so a cached entry serves any quality and format setting.
+        With download=True the selected formats are downloaded as well, and
+        with cached=False the cache is bypassed and refreshed.
+        """
+        key = self._get_video_id(url)
+        info = self.info_cache.get(key) if self.info_cache and cached else None
+        if info is None:
+            started = time.monotonic()
+            info = ydl.extract_info(url, download=False, process=False)
+            self.metrics.stage_seconds.observe(time.monotonic() - started, stage='extract')
+            # Playlists and redirects resolve to other URLs, only videos are cached
+            if self.info_cache and info.get('_type', 'video') == 'video':
+                self.info_cache.put(key, info)
+        else:
+            logger.debug("Using cached info for %s", url)
+
+        return ydl.process_ie_result(info, download=download)
+
+    def _expired(self, url, error):
+        """Drop the cached info of url if error says its stream URLs expired
+
+        The signed stream URLs in an info dict stop working after a while,
+        and the server then answers 403 or 410. Returns True when the entry
+        was dropped, so the caller should extract again and retry once.
+        """
+        if not self.info_cache or not isinstance(error, DownloadError):
+            return False
+        if not any(code in str(error) for code in EXPIRED_URL_ERRORS):
+            return False
+        logger.info(f"Stream URLs of {url} expired, extracting again")
+        self.info_cache.invalidate(self._get_video_id(url))
+        return True
+
+    def fetch(self, info):
+        """Pipeline stage 2: download the bytes of the selected formats
+
+        Separate video and audio formats are downloaded side by side and
+        left for postprocess_video(). Returns (target_path, part_paths), where
+        part_paths is empty when the download needs no merging. With a
+        content store, the digest is recorded in info for store_file().
+
+        If the stream URLs of cached info have expired, the video is
+        extracted again, info updated in place and the download retried.
+        """
+        url = info.get('webpage_url') or info.get('url')
+        try:
+            return self._fetch(url, info)
+        except DownloadError as e:
+            if not self._expired(url, e):
+                raise
+            fresh = self.extract_info(url, cached=False)
+            if fresh.get('_type', 'video') != 'video':
+                raise
+            info.clear()
+            info.update(fresh)
+            return self._fetch(url, info)
+
+    def _fetch(self, url, info):
+        hasher = self._hasher()
+        with self._transfer(url, hash_hook=hasher and hasher.hook) as hook:
+            with self._session(url, hook) as ydl:
+                target = ydl.prepare_filename(info)
+                requested = info.get('requested_formats')
+                if not requested:
+                    self.job_retry_policy.run(lambda: self._dl(ydl, target, info),
+                                              retry_on=(DownloadError,),
+                                              description=f"Download of {url}")
+                    self._record_digest(info, hasher, target)
+                    return target, []
+
+                parts = []
+                base = os.path.splitext(target)[0]
+                for fmt in requested:
+                    part_info = dict(info)
+                    del part_info['requested_formats']
+                    part_info.update(fmt)
+                    part = f"{base}.f{fmt['format_id']}.{fmt['ext']}"
+                    self.job_retry_policy.run(lambda: self._dl(ydl, part, part_info),
+                                              retry_on=(DownloadError,),
+                                              description=f"Download of {url}")
+                    parts.append(part)
+                self._record_digest(info, hasher, target)
+                return target, parts
+
+    @staticmethod
+    def _dl(ydl, filename, info):
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        success, _ = ydl.dl(filename, info)
+        if not success:
+            raise DownloadError(f"Could not download {filename}")
+
+    def report_failure(self, url, e):
+        """Show a helpful message for a failed download"""
+        error_msg = str(e)
+        self.metrics.failures.inc(error=error_class(e))
+        if "Sign in to confirm you're not a bot" in error_msg:
+            helpful_msg = (
+                f"Failed to download: {url}\n"
+                "YouTube requires authentication for this video.\n"
+                "Try one of these solutions:\n"
+                "1. Export cookies from your browser using yt-dlp's browser extension\n"
+                "2. Use a different video URL\n"
+                "3. Try downloading a non-age-restricted video"
+            )
+            display_status(helpful_msg, style="bold red")
+        else:
+            display_status(f"Failed to download: {url}\nError: {error_msg}", style="bold red")
+        logger.error(f"Download failed for {url}: {error_msg}")
@@ -0,0 +1,78 @@
+import queue
+import threading
+from .logger import setup_logger
+
+logger = setup_logger()
+
+
+class CollectionExpander:
+    """Expands playlists and channels into download jobs in the background
+
+    Each collection is enumerated by one of workers threads with
+    downloader.iter_entries(), and every entry is passed to submit as soon
+    as it is listed, so downloads start while later pages are still being
+    fetched. submit may block when the download queue is full, which slows
+    enumeration down to the pace of the downloads.
+    """
+
+    def __init__(self, downloader, submit=None, workers=2):
+        self.downloader = downloader
+        self.submit = submit
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'expander-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def add(self, url, submit=None, on_finish=None):
+        """Queue a collection URL for expansion
+
+        submit, if given, replaces the expander's submit for the entries of
+        this collection. on_finish, if given, is called as
+        on_finish(count, error) once the listing is done or failed, but not
+        when it is cut short by close().
+        """
+        if self._stop.is_set():
+            raise RuntimeError("Collection expander is closed")
+        self._queue.put((url, submit or self.submit, on_finish))
+
+    def join(self):
+        """Wait until every added collection has been expanded"""
+        self._queue.join()
+
+    def close(self):
+        """Stop expanding; collections in progress stop at their next entry"""
+        self._stop.set()
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if not self._stop.is_set():
+                    self._expand(*item)
+            finally:
+                self._queue.task_done()
+
+    def _expand(self, url, submit, on_finish=None):
+        count = 0
+        error = None
+        try:
+            for entry in self.downloader.iter_entries(url):
+                if self._stop.is_set():
+                    logger.info(f"Stopped expanding playlist after {count} videos: {url}")
+                    return
+                if submit(entry):
+                    count += 1
+        except Exception as e:
+            error = e
+            logger.error(f"Failed to expand playlist {url}: {str(e)}")
+        logger.info(f"Queued {count} videos from playlist: {url}")
+        if on_finish:
+            on_finish(count, error)
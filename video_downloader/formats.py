@@ -0,0 +1,85 @@
+from .config import parse_size
+from .postprocess import CODEC_NAMES, CONTAINER_CODECS
+
+# Resolution and frame rate caps of the --quality settings
+QUALITY_LIMITS = {
+    'best': {},
+    'medium': {'max_height': 720, 'max_fps': 30},
+    '720p': {'max_height': 720},
+    '480p': {'max_height': 480},
+}
+
+PROFILE_DEFAULTS = {
+    'prefer_single_file': True,
+    'single_file_min_height': None,
+    'match_container': True,
+    'max_height': None,
+    'max_fps': None,
+    'max_bitrate': None,
+    'max_filesize': None,
+}
+
+
+def _codec_filter(field, container, kind):
+    """Return a yt-dlp filter matching the codecs container holds without re-encoding"""
+    allowed = CONTAINER_CODECS.get(container)
+    if allowed is None:
+        return ''
+    prefixes = sorted(prefix for prefix, name in CODEC_NAMES.items() if name in allowed[kind])
+    return f"[{field}~='(?i)^({'|'.join(prefixes)})']"
+
+
+def _lowest(*values):
+    values = [value for value in values if value is not None]
+    return min(values) if values else None
+
+
+def format_selector(quality='best', container='mp4', profile=None):
+    """Build the yt-dlp format selector for a quality setting and format profile
+
+    Alternatives are tried in order:
+
+    1. a single file with video and audio, so nothing has to be merged,
+       when prefer_single_file is set and one is at least
+       single_file_min_height (default: the quality's height cap) tall;
+    2. separate video and audio in codecs the container holds without
+       re-encoding, when match_container is set;
+    3. separate video and audio in any codec;
+    4. the best single file.
+
+    Every alternative is capped by the quality's and the profile's
+    max_height and max_fps, max_bitrate (kbit/s) and max_filesize (e.g.
+    '500M'; for separate streams it caps the video stream). Formats whose
+    bitrate or size is unknown are not excluded by those caps.
+    """
+    profile = {**PROFILE_DEFAULTS, **(profile or {})}
+    limits = QUALITY_LIMITS.get(quality, {})
+    height = _lowest(limits.get('max_height'), profile['max_height'])
+    fps = _lowest(limits.get('max_fps'), profile['max_fps'])
+    filesize = parse_size(profile['max_filesize'])
+
+    caps = ''
+    if height:
+        caps += f"[height<={height}]"
+    if fps:
+        caps += f"[fps<=?{fps}]"
+    if profile['max_bitrate']:
+        caps += f"[tbr<=?{profile['max_bitrate']}]"
+    if filesize:
+        caps += f"[filesize<=?{filesize}][filesize_approx<=?{filesize}]"
+
+    video = audio = ''
+    if profile['match_container']:
+        video = _codec_filter('vcodec', container, 'video')
+        audio = _codec_filter('acodec', container, 'audio')
+
+    selectors = []
+    single_height = profile['single_file_min_height'] or height
+    if profile['prefer_single_file'] and single_height:
+        if video:
+            selectors.append(f"b{caps}[height>={single_height}]{video}{audio}")
+        selectors.append(f"b{caps}[height>={single_height}]")
+    if video:
+        selectors.append(f"bv{caps}{video}+ba{audio}")
+    selectors += [f"bv{caps}+ba", f"b{caps}"]
+    return '/'.join(dict.fromkeys(selectors))
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from .logger import setup_logger
+
+logger = setup_logger()
+
+
+def default_cache_dir():
+    """Return the per-user cache directory for extracted video info"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'video_downloader', 'info')
+
+
+def _not_serializable(obj):
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+class InfoCache:
+    """Two-level cache of yt-dlp info dicts keyed by canonical video ID
+
+    Entries live in a size-bounded in-memory LRU backed by JSON files on
+    disk, so retries and later runs skip the extraction. Every entry
+    expires ttl seconds after it was stored, since the signed stream URLs
+    inside an info dict stop working after a while. Entries are kept as
+    JSON text, so every get() returns a fresh dict that callers may modify.
+    """
+
+    def __init__(self, directory=None, ttl=3600, memory_entries=256, disk_entries=10000):
+        self.directory = directory
+        self.ttl = ttl
+        self.memory_entries = max(1, int(memory_entries))
+        self.disk_entries = max(0, int(disk_entries))
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+    def get(self, key):
+        """Return a copy of the cached info for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, text = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(text)
+                del self._memory[key]
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, *entry)
+        return json.loads(entry[1])
+
+    def put(self, key, info):
+        """Cache info under key; returns False if info cannot be serialized"""
+        try:
+            text = json.dumps(info, default=_not_serializable)
+        except (TypeError, ValueError) as e:
+            logger.debug("Not caching info for %s: %s", key, e)
+            return False
+
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, text)
+        self._write_disk(key, expires_at, text)
+        return True
+
+    def invalidate(self, key):
+        """Drop the entry for key from both cache levels"""
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """Return hit/miss counters and the in-memory size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+            }
+
+    def _remember(self, key, expires_at, text):
+        # Caller must hold self._lock
+        self._memory[key] = (expires_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.directory, name[:2], f"{name}.json")
+
+    def _read_disk(self, key, now):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('key') != key or entry.get('expires_at', 0) <= now:
+            return None
+        # Touch the file so disk eviction is least-recently-used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry['expires_at'], json.dumps(entry['info'])
+
+    def _write_disk(self, key, expires_at, text):
+        if not self.directory or not self.disk_entries:
+            return
+        path = self._path(key)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp, 'w', encoding='utf-8') as f:
+                f.write(f'{{"key": {json.dumps(key)}, "expires_at": {expires_at}, "info": {text}}}')
+            os.replace(temp, path)
+        except OSError as e:
+            logger.debug("Could not write info cache entry %s: %s", path, e)
+            return
+
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= max(1, self.disk_entries // 10):
+            self._writes_since_prune = 0
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove expired files and the least recently used ones over the limit"""
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    continue
+                if now - mtime > self.ttl or (name.endswith('.tmp') and now - mtime > 60):
+                    self._remove(path)
+                elif name.endswith('.json'):
+                    files.append((mtime, path))
+
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.disk_entries)]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
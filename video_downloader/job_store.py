@@ -0,0 +1,238 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from .logger import setup_logger
+from .url_validator import URLValidator
+from .worker_pool import DownloadJob
+
+logger = setup_logger()
+
+COLUMNS = ('id', 'url', 'video_id', 'parent', 'state', 'attempts', 'error',
+           'created_at', 'started_at', 'finished_at')
+
+
+class JobStore:
+    """Durable record of download jobs in an SQLite database
+
+    Every job is stored with its state, number of attempts and last
+    error, so a restarted process knows what was queued, in flight or
+    failed. Jobs are read back in insertion order with keyset pagination,
+    so even huge queues are iterated in bounded memory. Like the download
+    archive, the database runs in WAL mode and may be shared by processes:
+    every store holds a lease on the jobs it added, renewed by a heartbeat
+    thread, and recover() only takes over the jobs of stores whose lease
+    expired (a crashed process) or that were closed. A job interrupted
+    max_attempts times is not recovered again, so a video that crashes the
+    process cannot do so on every restart.
+    """
+
+    def __init__(self, path, timeout=30, url_validator=None, max_attempts=3, lease_timeout=60):
+        self.path = path
+        self.url_validator = url_validator or URLValidator()
+        self.max_attempts = max(1, int(max_attempts))
+        self.lease_timeout = lease_timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, url TEXT NOT NULL, '
+            'video_id TEXT, parent TEXT, state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+            'error TEXT, created_at REAL, started_at REAL, finished_at REAL)'
+        )
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+        # Stores written before playlist jobs and leases were tracked
+        for column in ('parent', 'owner'):
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} TEXT')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, seq)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_video_id ON jobs (video_id)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_parent ON jobs (parent, seq)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS owners (id TEXT PRIMARY KEY, pid INTEGER, heartbeat REAL NOT NULL)'
+        )
+        self._conn.execute('INSERT INTO owners (id, pid, heartbeat) VALUES (?, ?, ?)',
+                           (self.owner, os.getpid(), time.time()))
+        # Jobs added later are this store's own, so recover() never takes them
+        self._opened_seq = self._conn.execute('SELECT COALESCE(MAX(seq), 0) FROM jobs').fetchone()[0]
+        threading.Thread(target=self._heartbeat, name='job-store-heartbeat', daemon=True).start()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.lease_timeout / 3):
+            self._write('UPDATE owners SET heartbeat = ? WHERE id = ?', (time.time(), self.owner))
+
+    def _write(self, sql, params):
+        # Workers still finishing when the store is closed leave their job
+        # 'running', so it is recovered by the next process
+        with self._lock:
+            if self._closed:
+                logger.debug("Job store closed, not recording: %s", params)
+                return None
+            return self._conn.execute(sql, params)
+
+    def add(self, job):
+        """Record a new job"""
+        self._write(
+            'INSERT INTO jobs (id, url, video_id, parent, owner, state, attempts, error, created_at, started_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (job.id, job.url, self.url_validator.canonical_id(job.url), job.parent, self.owner, job.state,
+             job.attempts, job.error, job.created_at, job.started_at)
+        )
+
+    def remove(self, job_id):
+        self._write('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def mark_running(self, job):
+        """Record that a job started, counting the attempt"""
+        self._write(
+            'UPDATE jobs SET state = ?, attempts = attempts + 1, started_at = ? WHERE id = ?',
+            (DownloadJob.RUNNING, job.started_at, job.id)
+        )
+
+    def mark_finished(self, job):
+        """Record the final state and error of a job"""
+        self._write(
+            'UPDATE jobs SET state = ?, error = ?, finished_at = ? WHERE id = ?',
+            (job.state, job.error, job.finished_at, job.id)
+        )
+
+    def recover(self):
+        """Take over the jobs of stores whose lease expired
+
+        Their queued jobs are adopted as they are, and jobs that were
+        running when their process died are requeued; iter_recovered()
+        then yields both. Returns the number of requeued jobs. Their
+        attempts are kept, so the next run continues counting; jobs that
+        already had max_attempts attempts are marked failed instead. Jobs
+        of live processes sharing the store are left alone.
+        """
+        now = time.time()
+        # Jobs of stores that are gone, and of stores older than leases
+        orphaned = ('seq <= ? AND (owner IS NULL OR (owner != ? AND owner NOT IN '
+                    '(SELECT id FROM owners WHERE heartbeat >= ?)))')
+        params = (self._opened_seq, self.owner, now - self.lease_timeout)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                failed = self._conn.execute(
+                    f'UPDATE jobs SET state = ?, error = ?, finished_at = ? '
+                    f'WHERE state = ? AND attempts >= ? AND {orphaned}',
+                    (DownloadJob.FAILED, f"Interrupted {self.max_attempts} times, giving up", now,
+                     DownloadJob.RUNNING, self.max_attempts, *params)
+                ).rowcount
+                count = self._conn.execute(
+                    f'UPDATE jobs SET state = ?, started_at = NULL, owner = ? WHERE state = ? AND {orphaned}',
+                    (DownloadJob.QUEUED, self.owner, DownloadJob.RUNNING, *params)
+                ).rowcount
+                adopted = self._conn.execute(
+                    f'UPDATE jobs SET owner = ? WHERE state = ? AND {orphaned}',
+                    (self.owner, DownloadJob.QUEUED, *params)
+                ).rowcount
+                self._conn.execute('DELETE FROM owners WHERE heartbeat < ? AND id != ?',
+                                   (now - self.lease_timeout, self.owner))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        if failed:
+            logger.warning(f"Gave up on {failed} download jobs interrupted {self.max_attempts} times")
+        if count:
+            logger.info(f"Recovered {count} interrupted download jobs")
+        if adopted:
+            logger.info(f"Took over {adopted} queued download jobs of earlier runs")
+        return count
+
+    def iter_recovered(self, batch_size=500):
+        """Yield the queued jobs taken over by recover(), oldest first"""
+        return self._iter_jobs('state = ? AND owner = ?', (DownloadJob.QUEUED, self.owner),
+                               batch_size, last_seq=self._opened_seq)
+
+    def get(self, job_id):
+        """Return the job with the given ID, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {", ".join(COLUMNS)} FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        return self._job(row) if row else None
+
+    def has_video(self, video_id, states=(DownloadJob.QUEUED, DownloadJob.RUNNING, DownloadJob.COMPLETED)):
+        """Check whether a job for the video exists in one of states"""
+        placeholders = ', '.join('?' * len(states))
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT 1 FROM jobs WHERE video_id = ? AND state IN ({placeholders}) LIMIT 1',
+                (video_id, *states)
+            ).fetchone()
+        return row is not None
+
+    def iter_jobs(self, state=None, batch_size=500, limit=None, parent=None):
+        """Yield jobs oldest first, optionally only those in state or listed by parent
+
+        Rows are fetched batch_size at a time. Only jobs that existed when
+        iteration started are returned, so jobs added meanwhile are not
+        picked up twice by a caller resubmitting queued jobs.
+        """
+        conditions, filters = [], ()
+        if state:
+            conditions.append('state = ?')
+            filters += (state,)
+        if parent:
+            conditions.append('parent = ?')
+            filters += (parent,)
+        return self._iter_jobs(' AND '.join(conditions), filters, batch_size, limit)
+
+    def _iter_jobs(self, condition, filters, batch_size=500, limit=None, last_seq=None):
+        if last_seq is None:
+            with self._lock:
+                last_seq = self._conn.execute('SELECT COALESCE(MAX(seq), 0) FROM jobs').fetchone()[0]
+        seq = 0
+        returned = 0
+        where = 'seq > ? AND seq <= ?' + (f' AND {condition}' if condition else '')
+        while limit is None or returned < limit:
+            size = batch_size if limit is None else min(batch_size, limit - returned)
+            params = (seq, last_seq, *filters)
+            with self._lock:
+                if self._closed:
+                    return
+                rows = self._conn.execute(
+                    f'SELECT seq, {", ".join(COLUMNS)} FROM jobs WHERE {where} ORDER BY seq LIMIT ?',
+                    (*params, size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._job(row[1:])
+            returned += len(rows)
+            seq = rows[-1][0]
+
+    def counts(self):
+        """Return the number of jobs per state"""
+        with self._lock:
+            rows = self._conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall()
+        return dict(rows)
+
+    def close(self):
+        """Close the store, releasing its lease so others may take over its jobs"""
+        self._stop.set()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._conn.execute('DELETE FROM owners WHERE id = ?', (self.owner,))
+            self._conn.close()
+
+    @staticmethod
+    def _job(row):
+        values = dict(zip(COLUMNS, row))
+        job = DownloadJob(values['url'], job_id=values['id'], parent=values['parent'])
+        for name in ('state', 'attempts', 'error', 'created_at', 'started_at', 'finished_at'):
+            setattr(job, name, values[name])
+        return job
@@ -0,0 +1,140 @@
+import contextlib
+import threading
+import time
+from urllib.parse import urlparse
+from .config import parse_size
+from .logger import setup_logger
+from .url_validator import PLATFORM_ALIASES, DomainTrie
+
+logger = setup_logger()
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting a byte rate
+
+    Tokens refill at rate per second up to burst. Taking more tokens than
+    are available puts the bucket into debt, and the caller is told how
+    long to wait until the debt is paid off, so concurrent callers are
+    spaced out and together never exceed the rate.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take amount tokens and return the seconds to wait before using them"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class TransferLimiter:
+    """Bandwidth and concurrency limits shared by all downloads
+
+    URLs are grouped by platform (the entry of platforms their host belongs
+    to, or the host itself; short-link domains such as youtu.be count as
+    the platform they belong to), and each platform can have its own byte rate
+    and cap on simultaneous downloads on top of the global rate. Rates are
+    enforced from yt-dlp progress hooks, which run in the downloading
+    thread, so sleeping there slows the transfer down.
+    """
+
+    def __init__(self, rate=None, host_rate=None, host_concurrency=None, hosts=None, platforms=()):
+        self.platforms = tuple(platforms)
+        self._domains = DomainTrie(self.platforms)
+        self.host_rate = parse_size(host_rate)
+        self.host_concurrency = host_concurrency
+        self.hosts = {PLATFORM_ALIASES.get(host, host): dict(settings or {})
+                      for host, settings in (hosts or {}).items()}
+        rate = parse_size(rate)
+        self._bucket = TokenBucket(rate) if rate else None
+        self._host_buckets = {}
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def host(self, url):
+        """Return the platform a URL is limited under"""
+        host = (urlparse(url).hostname or '').lower()
+        platform = self._domains.match(host)
+        if platform is None:
+            return host
+        return PLATFORM_ALIASES.get(platform, platform)
+
+    def _setting(self, host, name, default):
+        value = self.hosts.get(host, {}).get(name)
+        return default if value is None else value
+
+    def _host_bucket(self, host):
+        with self._lock:
+            if host not in self._host_buckets:
+                rate = parse_size(self._setting(host, 'rate', self.host_rate))
+                self._host_buckets[host] = TokenBucket(rate) if rate else None
+            return self._host_buckets[host]
+
+    def _host_slot(self, host):
+        with self._lock:
+            if host not in self._host_slots:
+                limit = self._setting(host, 'concurrency', self.host_concurrency)
+                self._host_slots[host] = threading.BoundedSemaphore(int(limit)) if limit else None
+            return self._host_slots[host]
+
+    @contextlib.contextmanager
+    def slot(self, url):
+        """Hold one of the download slots of the URL's platform while the block runs"""
+        host = self.host(url)
+        semaphore = self._host_slot(host)
+        if semaphore is None:
+            yield
+            return
+        if not semaphore.acquire(blocking=False):
+            logger.debug("Waiting for a free %s download slot", host)
+            semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def throttle(self, host, amount):
+        """Account for amount bytes received from host, sleeping if over the limit"""
+        buckets = [b for b in (self._bucket, self._host_bucket(host)) if b]
+        delay = max((bucket.reserve(amount) for bucket in buckets), default=0.0)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def progress_hook(self, url):
+        """Return a yt-dlp progress hook throttling the download of url
+
+        Returns None when no rate applies to the URL.
+        """
+        host = self.host(url)
+        if self._bucket is None and self._host_bucket(host) is None:
+            return None
+
+        received = {}
+        lock = threading.Lock()
+
+        def hook(d):
+            # downloaded_bytes is cumulative per file and includes the part
+            # resumed from disk, so the first update only sets the baseline
+            name = d.get('tmpfilename') or d.get('filename')
+            with lock:
+                if d['status'] != 'downloading':
+                    received.pop(name, None)
+                    return
+                downloaded = d.get('downloaded_bytes') or 0
+                previous = received.get(name, downloaded)
+                amount = downloaded - previous
+                received[name] = max(downloaded, previous)
+            if amount > 0:
+                self.throttle(host, amount)
+
+        return hook
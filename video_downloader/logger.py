@@ -1,28 +1,164 @@
+import atexit
+import contextlib
+import contextvars
+import copy
+import datetime
+import json
 import logging
+import os
+import queue
 import sys
 
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+LOG_FORMATS = ('text', 'json')
+
+# Name of the handler writing the log file, replaced by configure_logging()
+FILE_HANDLER = 'video_downloader.file'
+
+# ID of the job the current thread or task is working on
+_job_id = contextvars.ContextVar('job_id', default=None)
+_listener = None
+
+
 def setup_logger():
     """Configure and return a logger instance"""
     logger = logging.getLogger('video_downloader')
-    
+
     if not logger.handlers:
         logger.setLevel(logging.INFO)
-        
+
         # Console handler
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
         console_handler.setFormatter(formatter)
-        
-        # File handler
-        file_handler = logging.FileHandler('video_downloader.log')
+
+        # File handler, opened on the first message rather than at import
+        file_handler = logging.FileHandler('video_downloader.log', delay=True)
+        file_handler.set_name(FILE_HANDLER)
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        
+
         logger.addHandler(console_handler)
         logger.addHandler(file_handler)
-    
+
+    return logger
+
+
+@contextlib.contextmanager
+def job_context(job_id):
+    """Tag the records logged by the enclosed block with job_id"""
+    token = _job_id.set(job_id)
+    try:
+        yield
+    finally:
+        _job_id.reset(token)
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as JSON lines, with the job ID when there is one"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        job_id = getattr(record, 'job_id', None)
+        if job_id:
+            entry['job_id'] = job_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class QueueLogHandler(logging.Handler):
+    """Hands records to a background thread instead of writing them
+
+    emit() only renders the message, so arguments can no longer change,
+    records the current job ID and puts the record on an unbounded queue.
+    Logging therefore never waits for the disk, and the listener thread
+    does the formatting and writing.
+    """
+
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+
+    def emit(self, record):
+        try:
+            # A copy, since the other handlers get the same record
+            record = copy.copy(record)
+            record.message = record.getMessage()
+            record.msg, record.args = record.message, None
+            record.job_id = _job_id.get()
+            if record.exc_info:
+                # Rendered now, and the frames it references released
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self.records.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+
+def configure_logging(file='video_downloader.log', format='text', max_size='10M', backups=5,
+                      rotate_when=None, level='DEBUG'):
+    """Write the log file from a background thread, rotating it
+
+    The file is rotated when it reaches max_size bytes, or at the interval
+    rotate_when (e.g. 'midnight', see TimedRotatingFileHandler) if given;
+    backups old files are kept. format 'json' writes JSON lines carrying
+    the job ID of every record. An empty file disables the log file.
+    Calling it again replaces the previous configuration.
+    """
+    global _listener
+    import logging.handlers
+    from .config import parse_size
+
+    if format not in LOG_FORMATS:
+        raise ValueError(f"Invalid log format: {format}")
+    logger = setup_logger()
+    _stop_listener()
+    for handler in list(logger.handlers):
+        if handler.get_name() == FILE_HANDLER:
+            logger.removeHandler(handler)
+            handler.close()
+    if not file:
+        return logger
+
+    path = os.path.expanduser(file)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    max_size = parse_size(max_size)
+    if rotate_when:
+        handler = logging.handlers.TimedRotatingFileHandler(path, when=rotate_when, backupCount=backups,
+                                                            encoding='utf-8', delay=True)
+    elif max_size:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_size, backupCount=backups,
+                                                       encoding='utf-8', delay=True)
+    else:
+        handler = logging.FileHandler(path, encoding='utf-8', delay=True)
+    handler.setFormatter(JSONFormatter() if format == 'json' else logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+
+    records = queue.SimpleQueue()
+    queue_handler = QueueLogHandler(records)
+    queue_handler.set_name(FILE_HANDLER)
+    queue_handler.setLevel(level)
+    logger.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
     return logger
+
+
+def _stop_listener():
+    """Write out the queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
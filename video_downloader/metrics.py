@@ -0,0 +1,324 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# Stage latencies, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Per-download throughput, in bytes per second
+THROUGHPUT_BUCKETS = tuple(2 ** n for n in range(16, 28, 2))
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Metric:
+    """A named metric with one value per combination of label values"""
+
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        """Return [(suffix, label values, extra labels, value)]"""
+        with self._lock:
+            return [('', key, (), value) for key, value in sorted(self._values.items())]
+
+    def snapshot(self):
+        """Return the values as JSON-friendly data"""
+        with self._lock:
+            values = dict(self._values)
+        if not self.labels:
+            return values.get((), 0)
+        return {','.join(key): value for key, value in sorted(values.items())}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._functions = {}
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function, **labels):
+        """Read the value from function whenever the metric is collected"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def _collect(self):
+        with self._lock:
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                value = function()
+            except Exception as e:
+                logger.debug("Could not collect %s: %s", self.name, e)
+                continue
+            with self._lock:
+                self._values[key] = value
+
+    def samples(self):
+        self._collect()
+        return super().samples()
+
+    def snapshot(self):
+        self._collect()
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self):
+        samples = []
+        for _, key, _, (counts, total, count) in super().samples():
+            for bound, bucket_count in zip(self.buckets, counts):
+                samples.append(('_bucket', key, (('le', bound),), bucket_count))
+            samples.append(('_bucket', key, (('le', '+Inf'),), count))
+            samples.append(('_sum', key, (), total))
+            samples.append(('_count', key, (), count))
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            values = dict(self._values)
+        result = {}
+        for key, (counts, total, count) in sorted(values.items()):
+            result[','.join(key)] = {
+                'count': count,
+                'sum': total,
+                'buckets': dict(zip(map(str, self.buckets), counts)),
+            }
+        return result.get('', {'count': 0, 'sum': 0.0, 'buckets': {}}) if not self.labels else result
+
+
+class MetricsRegistry:
+    """Collection of metrics, rendered in the Prometheus text format or as JSON"""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self._metrics = []
+        self.started_at = time.time()
+
+    def _register(self, metric):
+        metric.name = self.prefix + metric.name
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, key, extra, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_label_text(metric.labels, key, extra)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """Return all metrics as a JSON-serializable dict"""
+        return {
+            'started_at': self.started_at,
+            'uptime': time.time() - self.started_at,
+            'metrics': {metric.name: metric.snapshot() for metric in self._metrics},
+        }
+
+    def dump(self, path):
+        """Write snapshot() to a JSON file, replacing it atomically"""
+        temp = f"{path}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp, path)
+
+
+class DownloadMetrics(MetricsRegistry):
+    """The metrics recorded by the downloader, the monitor and batch runs"""
+
+    def __init__(self):
+        super().__init__(prefix='video_downloader_')
+        self.bytes_downloaded = self.counter(
+            'downloaded_bytes_total', 'Bytes received from video hosts', ['platform'])
+        self.downloads = self.counter(
+            'downloads_total', 'Videos downloaded successfully')
+        self.failures = self.counter(
+            'failures_total', 'Failed downloads by error class', ['error'])
+        self.dedupe_hits = self.counter(
+            'dedupe_hits_total', 'URLs skipped as already downloaded or queued', ['reason'])
+        self.queue_depth = self.gauge(
+            'queue_depth', 'Jobs waiting in a queue', ['queue'])
+        self.active_downloads = self.gauge(
+            'active_downloads', 'Videos currently being processed')
+        self.stage_seconds = self.histogram(
+            'stage_duration_seconds', 'Time spent per video in each stage', ['stage'])
+        self.throughput = self.histogram(
+            'download_throughput_bytes_per_second', 'Transfer rate of each download',
+            ['platform'], buckets=THROUGHPUT_BUCKETS)
+
+
+def error_class(error):
+    """Return the name of the underlying error class of a failure
+
+    yt-dlp wraps everything in DownloadError; the original exception is
+    kept in its exc_info.
+    """
+    exc_info = getattr(error, 'exc_info', None)
+    if exc_info and exc_info[1] is not None:
+        error = exc_info[1]
+    return type(error).__name__
+
+
+class TransferMeter:
+    """Records bytes, throughput and transfer time of one download
+
+    hook() is a yt-dlp progress hook. With merge=True the time between
+    the last downloaded file and finish() is recorded as merge latency,
+    since yt-dlp muxes the streams right after downloading them.
+    """
+
+    def __init__(self, metrics, platform, merge=False):
+        self.metrics = metrics
+        self.platform = platform
+        self.merge = merge
+        self.bytes = 0
+        self.first_update = None
+        self.last_finished = None
+        self.files_finished = 0
+        self._received = {}
+        self._lock = threading.Lock()
+
+    def hook(self, d):
+        name = d.get('tmpfilename') or d.get('filename')
+        now = time.monotonic()
+        downloaded = d.get('downloaded_bytes') or 0
+        with self._lock:
+            if self.first_update is None:
+                self.first_update = now
+            # The first update of a file may include a resumed partial download
+            previous = self._received.get(name, downloaded)
+            amount = max(0, downloaded - previous)
+            self._received[name] = max(downloaded, previous)
+            self.bytes += amount
+            if d['status'] == 'finished':
+                self._received.pop(name, None)
+                self.last_finished = now
+                self.files_finished += 1
+        if amount:
+            self.metrics.bytes_downloaded.inc(amount, platform=self.platform)
+
+    def finish(self):
+        """Record the latencies and throughput once the transfer is over"""
+        if self.first_update is None or self.last_finished is None:
+            return
+        elapsed = self.last_finished - self.first_update
+        self.metrics.stage_seconds.observe(elapsed, stage='transfer')
+        if elapsed > 0 and self.bytes:
+            self.metrics.throughput.observe(self.bytes / elapsed, platform=self.platform)
+        if self.merge and self.files_finished > 1:
+            self.metrics.stage_seconds.observe(time.monotonic() - self.last_finished, stage='merge')
+
+
+class MetricsServer:
+    """Serves a registry over HTTP from a background thread
+
+    GET /metrics returns the Prometheus text format and GET /metrics.json
+    the JSON snapshot. Binds to localhost by default.
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=9464):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = registry_ref.render().encode()
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path == '/metrics.json':
+                    body = json.dumps(registry_ref.snapshot()).encode()
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics request: " + format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='metrics-server', daemon=True)
+        self._thread.start()
+        host, port = self.address
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
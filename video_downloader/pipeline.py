@@ -0,0 +1,187 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .logger import job_context, setup_logger
+from .postprocess import PostProcessor
+from .ui import display_status
+from .worker_pool import DownloadJob
+
+logger = setup_logger()
+
+_DONE = object()
+
+
+def _run_as(job_id, function, *args):
+    with job_context(job_id):
+        return function(*args)
+
+
+class DownloadPipeline:
+    """Asyncio download pipeline with separate, bounded stages
+
+    1. extraction: metadata and format selection (cheap, highly concurrent)
+    2. download: transfer of the selected formats (bandwidth-bound)
+    3. merge: muxing video and audio streams, remuxing and embedding
+       (CPU-bound, the downloader's post-processing pool)
+
+    Stages are connected by bounded queues, so while one video is merged
+    the next ones are already downloading and being extracted, and the
+    pipeline never reads further ahead of the slowest stage than the queues
+    allow. A downloader without a post-processing pool is given one of
+    merge_workers processes.
+    """
+
+    def __init__(self, downloader, extract_concurrency=8, download_concurrency=3,
+                 merge_workers=2, queue_size=16, on_finish=None):
+        self.downloader = downloader
+        if downloader.postprocessor is None:
+            downloader.postprocessor = PostProcessor(merge_workers)
+        self.extract_concurrency = max(1, int(extract_concurrency))
+        self.download_concurrency = max(1, int(download_concurrency))
+        self.merge_workers = downloader.postprocessor.workers
+        self.queue_size = max(1, int(queue_size))
+        self.on_finish = on_finish
+
+    def run(self, urls):
+        """Process every URL of an iterable and return when all are finished"""
+        asyncio.run(self._run(urls))
+
+    async def _run(self, urls):
+        loop = asyncio.get_running_loop()
+        self._threads = ThreadPoolExecutor(
+            max_workers=self.extract_concurrency + self.download_concurrency + self.merge_workers + 1,
+            thread_name_prefix='pipeline'
+        )
+        extract_queue = asyncio.Queue(self.queue_size)
+        download_queue = asyncio.Queue(self.queue_size)
+        merge_queue = asyncio.Queue(self.queue_size)
+        for name, queue in (('extract', extract_queue), ('download', download_queue), ('merge', merge_queue)):
+            self.downloader.metrics.queue_depth.set_function(queue.qsize, queue=name)
+
+        stages = [
+            (extract_queue, [self._extract_worker(extract_queue, download_queue)
+                             for _ in range(self.extract_concurrency)]),
+            (download_queue, [self._download_worker(download_queue, merge_queue)
+                              for _ in range(self.download_concurrency)]),
+            (merge_queue, [self._merge_worker(merge_queue)
+                           for _ in range(self.merge_workers)]),
+        ]
+        tasks = [[asyncio.create_task(worker) for worker in workers] for _, workers in stages]
+
+        try:
+            # The URL source may block (e.g. stdin), so it is read off the event loop
+            iterator = iter(urls)
+            while True:
+                url = await loop.run_in_executor(self._threads, next, iterator, _DONE)
+                if url is _DONE:
+                    break
+                await extract_queue.put(DownloadJob(url))
+
+            # Shut the stages down in order so every queued item is drained
+            for (queue, _), workers in zip(stages, tasks):
+                for _ in workers:
+                    await queue.put(_DONE)
+                await asyncio.gather(*workers)
+        finally:
+            for workers in tasks:
+                for task in workers:
+                    task.cancel()
+            self._threads.shutdown(wait=False, cancel_futures=True)
+
+    async def _extract_worker(self, inbox, outbox):
+        while True:
+            job = await inbox.get()
+            if job is _DONE:
+                return
+
+            # Archive lookups are SQLite queries, kept off the event loop
+            video_id = await self._in_thread(job, self.downloader.claim, job.url)
+            if video_id is None:
+                self._finish(job, DownloadJob.SKIPPED)
+                continue
+            job.state = DownloadJob.RUNNING
+            job.started_at = time.time()
+
+            try:
+                info = await self._in_thread(job, self.downloader.extract_info, job.url)
+            except Exception as e:
+                self._fail(job, video_id, e)
+                continue
+
+            if info.get('_type', 'video') == 'video':
+                await outbox.put((job, video_id, info))
+                continue
+
+            # Playlists are fanned out into one job per entry
+            self.downloader.release(video_id)
+            self._finish(job, DownloadJob.EXPANDED)
+            for entry in info.get('entries') or []:
+                if not entry:
+                    continue
+                child = DownloadJob(entry.get('webpage_url') or entry.get('url'), parent=job.id)
+                child_id = await self._in_thread(child, self.downloader.claim, child.url)
+                if child_id is None:
+                    self._finish(child, DownloadJob.SKIPPED)
+                    continue
+                child.state = DownloadJob.RUNNING
+                child.started_at = time.time()
+                await outbox.put((child, child_id, entry))
+
+    async def _download_worker(self, inbox, outbox):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+
+            job, video_id, info = item
+            try:
+                # Held until the job is released, after merging and storing
+                await self._in_thread(job, self.downloader.reserve_space, video_id, info)
+                target, parts = await self._in_thread(job, self.downloader.fetch, info)
+            except Exception as e:
+                self._fail(job, video_id, e)
+                continue
+
+            await outbox.put((job, video_id, info, target, parts))
+
+    async def _merge_worker(self, inbox):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+
+            job, video_id, info, target, parts = item
+            try:
+                # Waits in a thread for the post-processing pool
+                output = await self._in_thread(job, self.downloader.postprocess_video, info, target, parts)
+                await self._in_thread(job, self.downloader.store_file, output, info)
+            except Exception as e:
+                self._fail(job, video_id, e)
+                continue
+            self._complete(job, video_id)
+
+    def _in_thread(self, job, function, *args):
+        """Run function in the thread pool, logging under the job's ID"""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._threads, functools.partial(_run_as, job.id, function, *args))
+
+    def _complete(self, job, video_id):
+        self.downloader.release(video_id, downloaded=True)
+        display_status(f"Successfully downloaded: {job.url}", style="bold green")
+        self._finish(job, DownloadJob.COMPLETED)
+
+    def _fail(self, job, video_id, e):
+        self.downloader.release(video_id)
+        self.downloader.report_failure(job.url, e)
+        job.error = str(e)
+        self._finish(job, DownloadJob.FAILED)
+
+    def _finish(self, job, state):
+        job.state = state
+        job.finished_at = time.time()
+        if self.on_finish:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                logger.error(f"Error in job callback for {job.id}: {str(e)}")
@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# Codecs each container can hold without re-encoding; None accepts anything
+CONTAINER_CODECS = {
+    'mp4': {'video': {'h264', 'hevc', 'av1', 'vp9'}, 'audio': {'aac', 'mp3', 'opus', 'ac3', 'eac3', 'flac'}},
+    'webm': {'video': {'vp8', 'vp9', 'av1'}, 'audio': {'opus', 'vorbis'}},
+    'mkv': None,
+}
+
+# Encoder arguments used when stream copying is not possible
+TRANSCODE_ARGS = {
+    'mp4': {'video': ['libx264', '-preset', 'veryfast', '-crf', '20'], 'audio': ['aac', '-b:a', '192k']},
+    'webm': {'video': ['libvpx-vp9', '-b:v', '0', '-crf', '32', '-row-mt', '1'], 'audio': ['libopus', '-b:a', '128k']},
+    'mkv': {'video': ['libx264', '-preset', 'veryfast', '-crf', '20'], 'audio': ['aac', '-b:a', '192k']},
+}
+
+# Prefixes of the codec strings reported by yt-dlp, mapped to ffmpeg names
+CODEC_NAMES = {
+    'avc': 'h264', 'h264': 'h264', 'hev': 'hevc', 'hvc': 'hevc', 'h265': 'hevc', 'av01': 'av1',
+    'vp09': 'vp9', 'vp9': 'vp9', 'vp8': 'vp8', 'mp4a': 'aac', 'aac': 'aac', 'opus': 'opus',
+    'vorbis': 'vorbis', 'mp3': 'mp3', 'ac-3': 'ac3', 'ac3': 'ac3', 'ec-3': 'eac3', 'eac3': 'eac3',
+    'flac': 'flac',
+}
+
+THUMBNAIL_MIMETYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png', '.webp': 'image/webp'}
+
+
+class PostProcessingError(Exception):
+    pass
+
+
+def codec_name(codec):
+    """Return the ffmpeg name of a yt-dlp codec string such as 'avc1.64001F'
+
+    Returns None for unknown codecs and for 'none' (no such stream).
+    """
+    if not codec or codec == 'none':
+        return None
+    codec = codec.lower()
+    for prefix, name in CODEC_NAMES.items():
+        if codec.startswith(prefix):
+            return name
+    return None
+
+
+def _can_copy(container, kind, codecs):
+    allowed = CONTAINER_CODECS.get(container)
+    if allowed is None:
+        return True
+    # Unknown codecs are tried with a stream copy too; ffmpeg refuses bad ones
+    return all(codec is None or codec in allowed[kind] for codec in codecs)
+
+
+def _command(ffmpeg, inputs, temp, container, copy, thumbnail, metadata):
+    # Inputs first: ffmpeg applies options to the file that follows them.
+    # The cover's output stream index is only known when all streams are.
+    cover = thumbnail if container == 'mp4' and all(s is not None for _, s in inputs) else None
+    command = [ffmpeg, '-y', '-loglevel', 'error']
+    for path, _ in inputs:
+        command += ['-i', path]
+    if cover:
+        command += ['-i', cover]
+
+    videos = 0
+    for index, (_, streams) in enumerate(inputs):
+        if streams is None:
+            # Unknown contents: keep every stream
+            command += ['-map', str(index)]
+            continue
+        for kind in ('video', 'audio'):
+            if kind in streams:
+                command += ['-map', f"{index}:{kind[0]}:0"]
+                videos += kind == 'video'
+    if cover:
+        command += ['-map', f"{len(inputs)}:v:0"]
+
+    for kind in ('video', 'audio'):
+        command += [f'-c:{kind[0]}'] + (['copy'] if copy[kind] else TRANSCODE_ARGS[container][kind])
+
+    if cover:
+        command += [f'-c:v:{videos}', 'mjpeg', f'-disposition:v:{videos}', 'attached_pic']
+    elif thumbnail and container == 'mkv':
+        mimetype = THUMBNAIL_MIMETYPES.get(os.path.splitext(thumbnail)[1].lower(), 'image/jpeg')
+        command += ['-attach', thumbnail, '-metadata:s:t', f'mimetype={mimetype}']
+
+    for key, value in (metadata or {}).items():
+        if value:
+            command += ['-metadata', f'{key}={value}']
+    return command + [temp]
+
+
+def process_media(parts, target, codecs=None, thumbnail=None, metadata=None, ffmpeg=None):
+    """Merge or remux parts into target, embedding a thumbnail and metadata
+
+    Runs in a worker process. codecs lists the (vcodec, acodec) yt-dlp
+    reported for each part. Streams are copied unchanged whenever the
+    target container can hold their codec, and only transcoded when it
+    cannot or when ffmpeg rejects the copy. The output is written to a
+    temporary file and moved into place atomically; the parts and the
+    thumbnail are removed on success.
+    """
+    ffmpeg = ffmpeg or shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise PostProcessingError("ffmpeg is required to merge video and audio streams")
+
+    base, ext = os.path.splitext(target)
+    container = ext.lstrip('.').lower()
+    if container not in CONTAINER_CODECS:
+        container = 'mkv'
+    if thumbnail and container == 'webm':
+        logger.debug("WebM cannot hold a thumbnail, not embedding it in %s", target)
+        thumbnail = None
+
+    inputs = []
+    found = {'video': [], 'audio': []}
+    for index, part in enumerate(parts):
+        vcodec, acodec = codecs[index] if codecs and index < len(codecs) else (None, None)
+        if not vcodec and not acodec:
+            inputs.append((part, None))
+            continue
+        streams = set()
+        for kind, codec in (('video', vcodec), ('audio', acodec)):
+            if codec and codec != 'none':
+                streams.add(kind)
+                found[kind].append(codec_name(codec))
+        inputs.append((part, streams))
+
+    copy = {kind: _can_copy(container, kind, found[kind]) for kind in found}
+    if not all(copy.values()):
+        logger.debug("Transcoding %s streams for %s", [k for k, v in copy.items() if not v], target)
+    attempts = [copy]
+    if any(copy.values()):
+        attempts.append({'video': False, 'audio': False})
+
+    temp = f"{base}.temp{ext}"
+    for attempt, plan in enumerate(attempts):
+        command = _command(ffmpeg, inputs, temp, container, plan, thumbnail, metadata)
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode == 0:
+            break
+        if os.path.exists(temp):
+            os.remove(temp)
+        if attempt + 1 == len(attempts):
+            raise PostProcessingError(f"ffmpeg failed to process {target}: {result.stderr.strip()}")
+        logger.debug("Stream copy into %s failed, transcoding: %s", target, result.stderr.strip())
+
+    os.replace(temp, target)
+    for path in list(parts) + ([thumbnail] if thumbnail else []):
+        if os.path.exists(path) and os.path.abspath(path) != os.path.abspath(target):
+            os.remove(path)
+    return target
+
+
+class PostProcessor:
+    """Bounded process pool running ffmpeg work off the download threads
+
+    At most workers files are processed at once; further calls wait for a
+    free worker. The pool is started with the first job.
+    """
+
+    def __init__(self, workers=2):
+        self.workers = max(1, int(workers))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def run(self, parts, target, **kwargs):
+        """Run process_media in the pool and return its result"""
+        with self._lock:
+            if self._executor is None:
+                # Spawn instead of fork: forking a process that runs threads is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            future = self._executor.submit(process_media, parts, target, **kwargs)
+        return future.result()
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,224 @@
+import contextlib
+import itertools
+import threading
+import time
+from .logger import setup_logger
+from . import ui
+
+logger = setup_logger()
+
+
+def format_bytes(count):
+    """Format a byte count as a short human readable string"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(count) < 1024:
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} TB"
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return '--:--'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class ProgressTask:
+    """Progress of one download, fed by yt-dlp progress hooks
+
+    hook() runs for every downloaded chunk, so it only records numbers;
+    drawing is left to the renderer's refresh thread.
+    """
+
+    def __init__(self, description):
+        self.description = description
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def hook(self, d):
+        # A task may download several files (e.g. separate video and audio).
+        # yt-dlp sets filename on every status, tmpfilename only while downloading
+        name = d.get('filename') or d.get('tmpfilename')
+        downloaded = d.get('downloaded_bytes') or 0
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        if d['status'] == 'finished':
+            total = total or downloaded
+        with self._lock:
+            self._files[name] = (downloaded, total)
+
+    def snapshot(self):
+        """Return (downloaded, total) bytes; total is None while unknown"""
+        with self._lock:
+            files = list(self._files.values())
+        downloaded = sum(done for done, _ in files)
+        if not files or any(total is None for _, total in files):
+            return downloaded, None
+        return downloaded, sum(total for _, total in files)
+
+
+class ProgressRenderer:
+    """Single progress display shared by all concurrent downloads
+
+    Download hooks only record byte counts. A background thread started
+    with the first active task redraws at most refresh_per_second times a
+    second, showing one bar per download plus a total row with aggregate
+    throughput and ETA. Without a terminal no bars are drawn; instead a
+    one-line summary is printed every summary_interval seconds.
+    """
+
+    # Smoothing factor of the aggregate speed estimate
+    SPEED_SMOOTHING = 0.3
+
+    def __init__(self, enabled=True, refresh_per_second=4, summary_interval=10.0, tty=None):
+        self.enabled = enabled
+        self.refresh_per_second = refresh_per_second
+        self.summary_interval = summary_interval
+        self.tty = ui.console.is_terminal if tty is None else tty
+        self._tasks = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._progress = None
+        self._reset_totals()
+
+    def _reset_totals(self):
+        self._finished = 0
+        self._finished_bytes = 0
+        self._speed = 0.0
+        self._last_bytes = 0
+        self._last_time = time.monotonic()
+        self._last_summary = self._last_time
+
+    @contextlib.contextmanager
+    def task(self, description):
+        """Track one download while the block runs
+
+        Yields the yt-dlp progress hook of the task, or None when progress
+        display is disabled.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        task = ProgressTask(description)
+        self._add(task)
+        try:
+            yield task.hook
+        finally:
+            self._remove(task)
+
+    def _add(self, task):
+        with self._lock:
+            if not self._tasks:
+                self._start()
+            key = next(self._ids)
+            self._tasks[key] = task
+            task.key = key
+            if self._progress is not None:
+                task.row = self._progress.add_task(f"[cyan]Downloading: {task.description}", total=None)
+
+    def _remove(self, task):
+        with self._lock:
+            del self._tasks[task.key]
+            downloaded, _ = task.snapshot()
+            self._finished += 1
+            self._finished_bytes += downloaded
+            if self._progress is not None:
+                self._progress.remove_task(task.row)
+            if not self._tasks:
+                self._shutdown()
+
+    def _start(self):
+        # Caller must hold self._lock
+        self._reset_totals()
+        if self.tty:
+            self._progress = ui.create_progress_bar(auto_refresh=False)
+            self._total_row = self._progress.add_task("[bold]Total", total=None)
+            self._progress.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='progress', daemon=True)
+        self._thread.start()
+
+    def _shutdown(self):
+        # Caller must hold self._lock; the render thread never takes it while stopping
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._render(final=True)
+        if self._progress is not None:
+            self._progress.stop()
+            self._progress = None
+
+    def _run(self):
+        interval = 1.0 / self.refresh_per_second
+        while not self._stop.wait(interval):
+            if self._lock.acquire(timeout=interval):
+                try:
+                    self._render()
+                except Exception as e:
+                    logger.debug("Progress rendering failed: %s", e)
+                finally:
+                    self._lock.release()
+
+    def stats(self):
+        """Return the aggregate progress of the current batch of downloads"""
+        with self._lock:
+            return self._aggregate(time.monotonic())
+
+    def _aggregate(self, now):
+        # Caller must hold self._lock
+        downloaded = self._finished_bytes
+        total = self._finished_bytes
+        known = True
+        rows = []
+        for task in self._tasks.values():
+            done, size = task.snapshot()
+            rows.append((task, done, size))
+            downloaded += done
+            if size is None:
+                known = False
+            else:
+                total += size
+
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            rate = max(0, downloaded - self._last_bytes) / elapsed
+            self._speed += self.SPEED_SMOOTHING * (rate - self._speed)
+            self._last_bytes = downloaded
+            self._last_time = now
+
+        eta = None
+        if known and self._speed > 0:
+            eta = max(0, total - downloaded) / self._speed
+        return {
+            'active': len(rows),
+            'finished': self._finished,
+            'downloaded_bytes': downloaded,
+            'total_bytes': total if known else None,
+            'speed': self._speed,
+            'eta': eta,
+            'rows': rows,
+        }
+
+    def _render(self, final=False):
+        # Caller must hold self._lock
+        now = time.monotonic()
+        stats = self._aggregate(now)
+        summary = (f"{stats['active']} active, {stats['finished']} done, "
+                   f"{format_bytes(stats['downloaded_bytes'])}")
+        if stats['total_bytes']:
+            summary += f" of {format_bytes(stats['total_bytes'])}"
+        summary += f", {format_bytes(stats['speed'])}/s, ETA {format_duration(stats['eta'])}"
+
+        if self._progress is not None:
+            for task, done, size in stats['rows']:
+                self._progress.update(task.row, completed=done, total=size)
+            self._progress.update(self._total_row, description=f"[bold]Total: {summary}",
+                                  completed=stats['downloaded_bytes'], total=stats['total_bytes'])
+            self._progress.refresh()
+        elif final or now - self._last_summary >= self.summary_interval:
+            self._last_summary = now
+            ui.console.print(f"Progress: {summary}", highlight=False, soft_wrap=True)
@@ -0,0 +1,64 @@
+import random
+import time
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# Errors that will not go away by trying again
+PERMANENT_ERRORS = (
+    "Sign in to confirm you're not a bot",
+    'Unsupported URL',
+    'Private video',
+    'Video unavailable',
+    'This video is not available',
+    'HTTP Error 403',
+    'HTTP Error 404',
+    'HTTP Error 410',
+)
+
+
+class RetryPolicy:
+    """Exponential backoff shared by yt-dlp's internal and our job-level retries
+
+    The n-th retry waits backoff * 2**n seconds, capped at max_delay and
+    randomized by +/- jitter (a fraction) to avoid retry storms.
+    """
+
+    def __init__(self, retries=10, backoff=1.0, max_delay=60.0, jitter=0.1):
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, n):
+        """Return the number of seconds to wait before retry n (0-based)"""
+        delay = min(self.backoff * (2 ** n), self.max_delay)
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return delay
+
+    def sleep_functions(self):
+        """Return a yt-dlp retry_sleep_functions mapping using this policy"""
+        def sleep(n):
+            return self.delay(n)
+        return {'http': sleep, 'fragment': sleep, 'file_access': sleep, 'extractor': sleep}
+
+    def is_retryable(self, error):
+        """Check whether an error message looks transient"""
+        message = str(error)
+        return not any(marker in message for marker in PERMANENT_ERRORS)
+
+    def run(self, func, retry_on=(Exception,), description='operation'):
+        """Call func, retrying transient errors of the given types with backoff"""
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except retry_on as e:
+                if attempt >= self.retries or not self.is_retryable(e):
+                    raise
+                delay = self.delay(attempt)
+                attempt += 1
+                logger.warning(f"{description} failed ({str(e)}), "
+                               f"retry {attempt}/{self.retries} in {delay:.1f}s")
+                time.sleep(delay)
@@ -0,0 +1,374 @@
+import functools
+import json
+import os
+import queue
+import socketserver
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+from .expansion import CollectionExpander
+from .logger import setup_logger
+from .url_validator import URLValidator
+from .worker_pool import DownloadJob, DownloadWorkerPool
+
+logger = setup_logger()
+
+
+class JobRejected(Exception):
+    """A job could not be accepted; status is the HTTP status to report"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class DownloadService:
+    """A long-running download engine fed by API clients
+
+    All clients share one VideoDownloader, so its yt-dlp sessions, caches,
+    archive and limits stay warm between jobs.
+    """
+
+    def __init__(self, downloader, workers=3, queue_size=100, history_size=1000, url_validator=None,
+                 store=None, expand_workers=2):
+        self.downloader = downloader
+        self.url_validator = url_validator or URLValidator()
+        self.store = store
+        self.history_size = history_size
+        self.expand_workers = expand_workers
+        # Started with the first playlist or channel URL
+        self.expander = None
+        self._collections = OrderedDict()
+        self._lock = threading.Lock()
+        self.pool = DownloadWorkerPool(
+            downloader.download,
+            workers=workers,
+            queue_size=queue_size,
+            history_size=history_size,
+            store=store
+        )
+        self.downloader.metrics.queue_depth.set_function(
+            lambda: self.pool.stats()['queued'], queue='service')
+
+    def submit(self, url):
+        """Queue a URL and return its job; raises JobRejected
+
+        A playlist or channel URL gets a playlist job right away, which is
+        running while the collection is listed in the background and then
+        finishes as expanded. Every video not downloaded yet becomes a job
+        of its own with the playlist job as its parent.
+        """
+        if not isinstance(url, str) or not self.url_validator.is_supported_video_url(url):
+            raise JobRejected(f"Unsupported URL: {url}")
+        url = url.strip()
+        if self.is_collection(url):
+            return self._submit_collection(url)
+        return self._submit(url)
+
+    def is_collection(self, url):
+        return isinstance(url, str) and self.url_validator.is_collection_url(url)
+
+    def _submit(self, url):
+        try:
+            job = self.pool.submit(url, block=False)
+        except queue.Full:
+            raise JobRejected("Download queue is full", status=503)
+        except RuntimeError as e:
+            raise JobRejected(str(e), status=503)
+        logger.info(f"Queued download job {job.id} for: {url}")
+        return job
+
+    def _submit_collection(self, url):
+        job = DownloadJob(url)
+        job.state = DownloadJob.RUNNING
+        job.started_at = time.time()
+        with self._lock:
+            if self.expander is None:
+                self.expander = CollectionExpander(self.downloader, workers=self.expand_workers)
+            self._track(job)
+        if self.store:
+            self.store.add(job)
+        try:
+            self.expander.add(url, submit=functools.partial(self._submit_entry, job, set()),
+                              on_finish=functools.partial(self._expanded, job))
+        except RuntimeError as e:
+            with self._lock:
+                del self._collections[job.id]
+            if self.store:
+                self.store.remove(job.id)
+            raise JobRejected(str(e), status=503)
+        logger.info(f"Expanding playlist job {job.id}: {url}")
+        return job
+
+    def _track(self, job):
+        # Caller must hold self._lock
+        self._collections[job.id] = job
+        while len(self._collections) > self.history_size:
+            oldest = next(iter(self._collections.values()))
+            if not oldest.finished:
+                break
+            del self._collections[oldest.id]
+
+    def _submit_entry(self, collection, seen, url):
+        # Runs on an expander thread, so it may wait for room in the queue
+        video_id = self.url_validator.canonical_id(url)
+        if video_id in seen:
+            return False
+        seen.add(video_id)
+        job = self.pool.submit(url, parent=collection.id)
+        logger.debug("Queued download job %s for playlist entry: %s", job.id, url)
+        return True
+
+    def _expanded(self, collection, count, error):
+        collection.finished_at = time.time()
+        if error is not None:
+            collection.error = f"Failed to expand playlist: {str(error)}"
+        collection.state = DownloadJob.FAILED if error is not None and not count else DownloadJob.EXPANDED
+        if self.store:
+            self.store.mark_finished(collection)
+
+    def recover(self):
+        """Resubmit jobs left over by a previous run, from a background thread"""
+        if self.store:
+            threading.Thread(target=self.pool.recover, name='job-recovery', daemon=True).start()
+
+    def get(self, job_id):
+        job = self.pool.get(job_id)
+        if job is None:
+            with self._lock:
+                job = self._collections.get(job_id)
+        if job is None and self.store:
+            job = self.store.get(job_id)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued job; returns False for running or finished jobs"""
+        if self.pool.cancel(job_id):
+            return True
+        if self.store and self.pool.get(job_id) is None:
+            # Queued by an earlier run and not yet resubmitted
+            job = self.store.get(job_id)
+            if job and job.state == DownloadJob.QUEUED:
+                job.state = DownloadJob.CANCELLED
+                job.finished_at = time.time()
+                self.store.mark_finished(job)
+                return True
+        return False
+
+    def jobs(self, state=None, limit=1000, parent=None):
+        """Return up to limit jobs, oldest first, including older runs' jobs when stored
+
+        parent, if given, selects the videos of that playlist job.
+        """
+        if self.store:
+            return list(self.store.iter_jobs(state, limit=limit, parent=parent))
+        with self._lock:
+            jobs = self.pool.jobs() + list(self._collections.values())
+        jobs.sort(key=lambda job: job.created_at)
+        if state:
+            jobs = [job for job in jobs if job.state == state]
+        if parent:
+            jobs = [job for job in jobs if job.parent == parent]
+        return jobs[:limit]
+
+    def stats(self):
+        stats = self.pool.stats()
+        if self.store:
+            stats['stored'] = self.store.counts()
+        return stats
+
+    def close(self):
+        """Stop the workers and close the downloader
+
+        Queued jobs are cancelled, or left queued in the job store for the
+        next run, like playlists still being listed.
+        """
+        if self.expander:
+            self.expander.close()
+        self.pool.shutdown(wait=True, cancel_pending=True)
+        self.downloader.close()
+        if self.store:
+            self.store.close()
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over the jobs of server.service
+
+    POST /jobs               {"url": ...} or {"urls": [...]}; playlists
+                             and channels get a playlist job (202) whose
+                             videos are queued as jobs of their own
+    GET /jobs[?state=&parent=&limit=] list jobs
+    GET /jobs/<id>           job status
+    DELETE /jobs/<id>        cancel a queued job
+    GET /stats, GET /metrics
+    """
+
+    server_version = 'video-downloader'
+    MAX_BODY = 1024 ** 2
+
+    def do_GET(self):
+        service = self.server.service
+        parsed = urlparse(self.path)
+        parts = [p for p in parsed.path.split('/') if p]
+
+        if parts == ['jobs']:
+            query = parse_qs(parsed.query)
+            state = query.get('state', [None])[0]
+            parent = query.get('parent', [None])[0]
+            try:
+                limit = int(query.get('limit', [1000])[0])
+            except ValueError:
+                self._send(400, {'error': 'limit must be a number'})
+                return
+            self._send(200, {'jobs': [job.to_dict() for job in service.jobs(state, limit, parent)]})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = service.get(parts[1])
+            if job is None:
+                self._send(404, {'error': f"Unknown job: {parts[1]}"})
+            else:
+                self._send(200, job.to_dict())
+        elif parts == ['stats']:
+            self._send(200, service.stats())
+        elif parts == ['metrics']:
+            body = service.downloader.metrics.render().encode()
+            self._send_raw(200, body, 'text/plain; version=0.0.4; charset=utf-8')
+        else:
+            self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/jobs':
+            self._send(404, {'error': 'Not found'})
+            return
+        try:
+            payload = self._read_json()
+            urls = payload.get('urls') if 'urls' in payload else [payload.get('url')]
+            if not isinstance(urls, list) or not urls:
+                raise JobRejected("Expected 'url' or a list of 'urls'")
+        except JobRejected as e:
+            self._send(e.status, {'error': str(e)})
+            return
+
+        service = self.server.service
+        jobs, errors = [], []
+        for url in urls:
+            try:
+                jobs.append(service.submit(url).to_dict())
+            except JobRejected as e:
+                errors.append({'url': url, 'error': str(e), 'status': e.status})
+
+        if 'urls' not in payload:
+            if errors:
+                self._send(errors[0]['status'], {'error': errors[0]['error']})
+            else:
+                # A playlist is only accepted here, its videos are listed later
+                self._send(202 if service.is_collection(urls[0]) else 201, jobs[0])
+            return
+        self._send(201 if jobs else 400, {'jobs': jobs, 'errors': errors})
+
+    def do_DELETE(self):
+        parts = [p for p in urlparse(self.path).path.split('/') if p]
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self._send(404, {'error': 'Not found'})
+            return
+
+        service = self.server.service
+        job = service.get(parts[1])
+        if job is None:
+            self._send(404, {'error': f"Unknown job: {parts[1]}"})
+        elif service.cancel(job.id):
+            self._send(200, service.get(job.id).to_dict())
+        else:
+            self._send(409, {'error': f"Job is {job.state} and cannot be cancelled", 'job': job.to_dict()})
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > self.MAX_BODY:
+            raise JobRejected("Request body too large", status=413)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            raise JobRejected("Request body must be JSON")
+        if not isinstance(payload, dict):
+            raise JobRejected("Request body must be a JSON object")
+        return payload
+
+    def _send(self, status, data):
+        self._send_raw(status, json.dumps(data).encode(), 'application/json')
+
+    def _send_raw(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug("API %s: " + format, self.address_string(), *args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('unix', 0)
+
+
+class JobAPIServer:
+    """Serves a DownloadService over HTTP on a TCP port or a Unix socket
+
+    TCP binds to localhost by default; the Unix socket is created with
+    owner-only permissions, so only the local user can submit jobs.
+    """
+
+    def __init__(self, service, host='127.0.0.1', port=8765, socket_path=None):
+        self.socket_path = socket_path
+        if socket_path:
+            if os.path.exists(socket_path):
+                # A socket left by a previous run is replaced, anything else kept
+                if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                    raise FileExistsError(f"Not a socket, refusing to replace it: {socket_path}")
+                os.remove(socket_path)
+            old_umask = os.umask(0o077)
+            try:
+                self._server = _UnixHTTPServer(socket_path, _JobRequestHandler)
+            finally:
+                os.umask(old_umask)
+        else:
+            self._server = ThreadingHTTPServer((host, port), _JobRequestHandler)
+            self._server.daemon_threads = True
+        self._server.service = service
+        self._serving = False
+
+    @property
+    def address(self):
+        if self.socket_path:
+            return self.socket_path
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        """Handle requests until close() or KeyboardInterrupt"""
+        self._serving = True
+        logger.info(f"Accepting download jobs on {self.address}")
+        self._server.serve_forever()
+
+    def start(self):
+        """Serve from a background thread"""
+        self._serving = True
+        threading.Thread(target=self._server.serve_forever, name='job-api', daemon=True).start()
+        return self
+
+    def close(self):
+        if self._serving:
+            self._server.shutdown()
+        self._server.server_close()
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from .diskspace import move_file
+from .logger import setup_logger
+
+logger = setup_logger()
+
+LINK_TYPES = ('hardlink', 'symlink')
+
+
+class StreamingHasher:
+    """Hashes a file while another writer is still appending to it
+
+    update() hashes whatever was added to the file since the last call.
+    The bytes were just written, so they are read back from the page cache
+    rather than from disk, and the finished file never has to be read again.
+    """
+
+    CHUNK_SIZE = 1024 ** 2
+
+    def __init__(self, algorithm='sha256'):
+        self.algorithm = algorithm
+        self._reset()
+
+    def _reset(self):
+        self._hash = hashlib.new(self.algorithm)
+        self.offset = 0
+
+    def update(self, path):
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.offset:
+                # The download was restarted from scratch
+                logger.debug("%s shrank, hashing it again", path)
+                self._reset()
+            f.seek(self.offset)
+            while self.offset < size:
+                chunk = f.read(min(self.CHUNK_SIZE, size - self.offset))
+                if not chunk:
+                    break
+                self._hash.update(chunk)
+                self.offset += len(chunk)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class TransferHasher:
+    """yt-dlp progress hook computing the digest of every downloaded file
+
+    With streaming=False files are only hashed once finished, for
+    downloaders that do not write files front to back (e.g. aria2c with
+    several connections).
+    """
+
+    def __init__(self, algorithm='sha256', streaming=True):
+        self.algorithm = algorithm
+        self.streaming = streaming
+        self.digests = {}
+        self._hashers = {}
+        self._lock = threading.Lock()
+
+    def hook(self, d):
+        name = d.get('filename')
+        if not name:
+            return
+        with self._lock:
+            if d['status'] == 'error':
+                self._hashers.pop(name, None)
+                return
+            hasher = self._hashers.setdefault(name, StreamingHasher(self.algorithm))
+            if d['status'] == 'downloading':
+                downloaded = d.get('downloaded_bytes') or 0
+                # Reading back every small block would cost a syscall each
+                if self.streaming and downloaded - hasher.offset >= StreamingHasher.CHUNK_SIZE:
+                    hasher.update(d.get('tmpfilename') or name)
+            elif d['status'] == 'finished':
+                hasher.update(name)
+                self.digests[name] = hasher.hexdigest()
+                del self._hashers[name]
+
+    def digest(self, path):
+        """Return (digest, sources) of path
+
+        A file assembled from several downloads (e.g. video and audio
+        merged by ffmpeg) gets a digest of the digests of its sources, which
+        are returned as well.
+        """
+        with self._lock:
+            if path in self.digests:
+                return self.digests[path], []
+            sources = sorted(self.digests.values())
+        if not sources:
+            return None, []
+        return hashlib.new(self.algorithm, '\n'.join(sources).encode()).hexdigest(), sources
+
+
+class ContentStore:
+    """Content-addressed storage for downloaded videos
+
+    Every file is stored once under objects/ named by its digest. The
+    human readable name in the download directory is a hardlink (or a
+    symlink) to the object, so re-posts of the same video only cost a
+    link, and videos with the same title get distinct names instead of
+    overwriting each other. Every stored file is appended to the JSON
+    lines manifest.jsonl, mapping digests to names and sources.
+    """
+
+    def __init__(self, directory, link='hardlink', algorithm='sha256'):
+        if link not in LINK_TYPES:
+            raise ValueError(f"Invalid storage link type: {link}")
+        hashlib.new(algorithm)
+        self.directory = directory
+        self.link = link
+        self.algorithm = algorithm
+        self.incoming = os.path.join(directory, 'incoming')
+        self.manifest = os.path.join(directory, 'manifest.jsonl')
+        self._lock = threading.Lock()
+        os.makedirs(self.incoming, exist_ok=True)
+
+    def object_path(self, digest, ext=''):
+        return os.path.join(self.directory, 'objects', digest[:2], digest + ext)
+
+    def add(self, path, digest, name, sources=(), info=None):
+        """Move the downloaded file path into the store and link it as name
+
+        Returns (linked_path, duplicate); duplicate is True when the
+        content was already stored and the download was discarded.
+        """
+        ext = os.path.splitext(path)[1]
+        obj = self.object_path(digest, ext)
+        info = info or {}
+        with self._lock:
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            duplicate = os.path.exists(obj)
+            if duplicate:
+                os.remove(path)
+            else:
+                move_file(path, obj)
+            linked = self._link(obj, name, digest)
+            entry = {
+                'digest': digest,
+                'algorithm': self.algorithm,
+                'size': os.path.getsize(obj),
+                'object': os.path.relpath(obj, self.directory),
+                'path': linked,
+                'id': info.get('id'),
+                'url': info.get('webpage_url'),
+                'title': info.get('title'),
+                'duplicate': duplicate,
+                'added_at': time.time(),
+            }
+            if sources:
+                entry['sources'] = list(sources)
+            with open(self.manifest, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        if duplicate:
+            logger.info(f"Already stored as {digest[:12]}, linked {linked}")
+        return linked, duplicate
+
+    def _link(self, obj, name, digest):
+        base, ext = os.path.splitext(name)
+        for candidate in (name, f"{base} [{digest[:8]}]{ext}"):
+            if os.path.lexists(candidate):
+                if os.path.exists(candidate) and os.path.samefile(candidate, obj):
+                    return candidate
+                # Another video with the same title
+                continue
+            self._make_link(obj, candidate)
+            return candidate
+        raise FileExistsError(f"Cannot link {obj}: {name} is taken")
+
+    def _make_link(self, obj, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if self.link == 'hardlink':
+            try:
+                os.link(obj, path)
+                return
+            except OSError as e:
+                # Different filesystem, or links not supported
+                logger.debug("Hardlink to %s failed, using a symlink: %s", obj, e)
+        os.symlink(os.path.abspath(obj), path)
@@ -0,0 +1,132 @@
+import threading
+import time
+from .worker_pool import DownloadJob, DownloadWorkerPool
+from .logger import setup_logger
+
+logger = setup_logger()
+
+
+class SourceResult:
+    """Outcome of syncing one playlist or channel"""
+
+    def __init__(self, source):
+        self.source = source
+        self.listed = 0
+        self.submitted = 0
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.stopped_early = False
+        self.error = None
+        self.watermark = []
+
+    @property
+    def ok(self):
+        return self.error is None and not self.failed
+
+
+class ChannelSync:
+    """Mirrors playlists and channels, fetching only what is new
+
+    For every source the newest video IDs listed are stored as its
+    watermark in the download archive. The next sync stops listing a
+    source as soon as it reaches one of those IDs, or a run of
+    stop_after_known videos that are already archived, so an unchanged
+    channel costs a single page request. Listings are assumed to be
+    newest first, as channel uploads are; full=True lists everything.
+
+    A watermark only advances when every new video of the source was
+    downloaded, so failed videos are retried by the next sync.
+    """
+
+    def __init__(self, downloader, workers=3, queue_size=100, full=False,
+                 stop_after_known=10, watermark_size=5):
+        self.downloader = downloader
+        self.workers = workers
+        self.queue_size = queue_size
+        self.full = full
+        self.stop_after_known = stop_after_known
+        self.watermark_size = watermark_size
+        self.elapsed = 0.0
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def run(self, sources):
+        """Sync every source and return a SourceResult per source"""
+        started = time.monotonic()
+        results = [SourceResult(source) for source in dict.fromkeys(sources)]
+        pool = DownloadWorkerPool(
+            self.downloader.download,
+            workers=self.workers,
+            queue_size=self.queue_size,
+            history_size=self.queue_size + self.workers,
+            on_finish=self._record
+        )
+        self.downloader.metrics.queue_depth.set_function(lambda: pool.stats()['queued'], queue='sync')
+        try:
+            seen = set()
+            # Sources are listed one after another while the pool downloads
+            for result in results:
+                self._sync_source(pool, result, seen)
+            pool.join()
+        finally:
+            pool.shutdown(wait=False, cancel_pending=True)
+            self.elapsed = time.monotonic() - started
+
+        for result in results:
+            if result.ok and result.watermark:
+                self.downloader.archive.set_watermark(result.source, result.watermark)
+            elif not result.ok:
+                logger.warning(f"Not advancing sync watermark of {result.source}")
+        return results
+
+    def _sync_source(self, pool, result, seen):
+        logger.info(f"Syncing {result.source}")
+        try:
+            for url in self.downloader.iter_entries(result.source, stop=self._stopper(result)):
+                video_id = self.downloader.url_validator.canonical_id(url)
+                if video_id in seen:
+                    continue
+                seen.add(video_id)
+                with self._lock:
+                    self._jobs[url] = result
+                result.submitted += 1
+                # Blocks while the queue is full, keeping listing in step with downloading
+                pool.submit(url)
+        except Exception as e:
+            logger.error(f"Failed to list {result.source}: {str(e)}")
+            result.error = str(e)
+
+    def _stopper(self, result):
+        """Return the iter_entries stop callback of one source"""
+        known = set() if self.full else set(self.downloader.archive.get_watermark(result.source))
+        streaks = {}
+        heads = {}
+
+        def stop(listing, video_id, archived):
+            result.listed += 1
+            head = heads.setdefault(listing, [])
+            if len(head) < self.watermark_size:
+                head.append(video_id)
+                result.watermark.append(video_id)
+            if self.full:
+                return False
+            streaks[listing] = streaks.get(listing, 0) + 1 if archived else 0
+            if video_id in known or (self.stop_after_known and streaks[listing] >= self.stop_after_known):
+                result.stopped_early = True
+                return True
+            return False
+
+        return stop
+
+    def _record(self, job):
+        with self._lock:
+            result = self._jobs.pop(job.url, None)
+            if result is None:
+                return
+            if job.state == DownloadJob.COMPLETED:
+                result.completed += 1
+            elif job.state == DownloadJob.SKIPPED:
+                result.skipped += 1
+            elif job.state == DownloadJob.FAILED:
+                result.failed += 1
@@ -1,12 +1,33 @@
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn
-from rich.panel import Panel
-from rich.text import Text
-from rich.style import Style
 import shutil
 
+# rich is imported on first use, so commands that print nothing start fast
+
+_console = None
+
+def get_console():
+    """Return the console shared by all output
+
+    Sharing one console makes status messages print above live progress bars.
+    """
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+class _LazyConsole:
+    """Stand-in for the shared console that creates it on first use"""
+
+    def __getattr__(self, name):
+        return getattr(get_console(), name)
+
+console = _LazyConsole()
+
 def get_logo():
     """Return ASCII art logo with dynamic width scaling and enhanced styling"""
+    from rich.panel import Panel
+    from rich.text import Text
+
     terminal_width = shutil.get_terminal_size().columns
     # Enhanced ASCII art logo with more detail
     logo = """
@@ -38,9 +59,11 @@ def get_logo():
         subtitle="[bold green]v1.0.0[/]"
     )
 
-def create_progress_bar():
+def create_progress_bar(auto_refresh=True):
     """Create a rich progress bar with enhanced visuals"""
-    console = Console()
+    from rich.progress import (Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn,
+                               TransferSpeedColumn)
+
     progress = Progress(
         SpinnerColumn(style="green"),
         TextColumn("[bold blue]{task.description}"),
@@ -50,16 +73,23 @@ def create_progress_bar():
             pulse_style="yellow"
         ),
         TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        TransferSpeedColumn(),
         TimeRemainingColumn(),
         console=console,
+        auto_refresh=auto_refresh,
         transient=False,  # Keep the progress bar visible
         expand=True,      # Use full width
     )
     return progress
 
 def display_status(message, style="bold cyan"):
-    """Display a status message in a styled panel"""
-    console = Console()
+    """Display a status message in a styled panel, or a plain line when not on a terminal"""
+    if not console.is_terminal:
+        console.print(message, style=style, highlight=False, soft_wrap=True)
+        return
+    from rich.panel import Panel
+    from rich.text import Text
+
     panel = Panel(
         Text(message, style=style),
         border_style="blue",
@@ -1,43 +1,242 @@
 import re
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs, urlencode
 from .logger import setup_logger
 
 logger = setup_logger()
 
+# Query parameters that never change which video a URL points to
+TRACKING_PARAMS = {'feature', 'si', 'igshid', 'igsh', 'fbclid', 'ref', 'ref_src', 's', 't',
+                   'start', 'time_continue', 'pp', 'ab_channel'}
+
+DEFAULT_DOMAINS = (
+    'youtube.com',
+    'youtu.be',
+    'facebook.com',
+    'fb.watch',
+    'twitter.com',
+    'instagram.com',
+)
+
+# Short-link domains and the platform they belong to
+PLATFORM_ALIASES = {
+    'youtu.be': 'youtube.com',
+    'fb.watch': 'facebook.com',
+}
+
+# One pass over the text finds every http(s) URL and captures its host
+URL_PATTERN = re.compile(
+    r'https?://(?P<host>[^\s/?#<>"\'`\\]+)[^\s<>"\'`\\]*',
+    re.IGNORECASE
+)
+
+# Punctuation that ends a sentence rather than a URL
+TRAILING_PUNCTUATION = '.,;:!?'
+
+
+class DomainTrie:
+    """Set of domains matched against hosts on label boundaries
+
+    Domains are stored by their labels in reverse order, so looking up a
+    host walks at most as many nodes as it has labels, however many
+    domains there are. 'm.youtube.com' matches 'youtube.com', while
+    'notyoutube.com' does not.
+    """
+
+    _END = ''
+
+    def __init__(self, domains=()):
+        self._root = {}
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain):
+        node = self._root
+        domain = domain.lower().strip('.')
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        node[self._END] = domain
+
+    def match(self, host):
+        """Return the domain host equals or is a subdomain of, or None"""
+        node = self._root
+        found = None
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(self._END, found)
+        return found
+
+
 class URLValidator:
-    def __init__(self):
+    def __init__(self, domains=None):
         # Regex for URL extraction
-        self.url_pattern = re.compile(
-            r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        )
+        self.url_pattern = URL_PATTERN
         
         # Supported video platforms
-        self.supported_domains = {
-            'youtube.com',
-            'youtu.be',
-            'facebook.com',
-            'fb.watch',
-            'twitter.com',
-            'instagram.com',
+        self.supported_domains = {domain.lower() for domain in (domains or DEFAULT_DOMAINS)}
+        self._domains = DomainTrie(self.supported_domains)
+
+        # Per-platform extraction of the platform's own video ID
+        self.id_extractors = {
+            'youtube.com': self._youtube_id,
+            'youtu.be': self._youtu_be_id,
+            'facebook.com': self._facebook_id,
+            'fb.watch': self._fb_watch_id,
+            'twitter.com': self._twitter_id,
+            'instagram.com': self._instagram_id,
         }
-    
+
+        # Per-platform detection of playlist and channel URLs
+        self.collection_matchers = {
+            'youtube.com': self._youtube_collection,
+        }
+
+    def iter_urls(self, text):
+        """Yield (url, domain) for every URL in text in a single pass
+
+        domain is the supported domain the URL belongs to, or None.
+        """
+        for match in self.url_pattern.finditer(text):
+            url = self._trim(match.group())
+            yield url, self._domains.match(self._host(match.group('host')))
+
     def extract_urls(self, text):
         """Extract all URLs from text"""
-        return self.url_pattern.findall(text)
+        return [url for url, _ in self.iter_urls(text)]
+
+    def extract_supported_urls(self, text):
+        """Extract the URLs of supported platforms from text"""
+        return [url for url, domain in self.iter_urls(text) if domain]
     
     def is_supported_video_url(self, url):
         """Check if URL is from a supported video platform"""
+        match = self.url_pattern.match(url.strip())
+        return bool(match) and self._domains.match(self._host(match.group('host'))) is not None
+
+    def is_collection_url(self, url):
+        """Check if URL points to a playlist or channel rather than one video"""
         try:
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            
-            # Remove 'www.' if present
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            
-            # Check if domain or any subdomain is supported
-            return any(domain.endswith(supported) for supported in self.supported_domains)
-            
-        except Exception as e:
-            logger.error(f"Error validating URL {url}: {str(e)}")
+            parsed = urlparse(url.strip())
+        except ValueError:
             return False
+        matcher = self.collection_matchers.get(self._match_domain((parsed.hostname or '').lower()))
+        return bool(matcher and matcher(parsed))
+
+    def platform(self, url):
+        """Return the supported domain a URL belongs to, or None"""
+        try:
+            parsed = urlparse(url.strip())
+        except ValueError:
+            return None
+        return self._match_domain((parsed.hostname or '').lower())
+
+    @staticmethod
+    def _host(netloc):
+        """Return the lowercase host of a URL's network location"""
+        host = netloc.rpartition('@')[2]
+        if not host.startswith('['):
+            host = host.partition(':')[0]
+        return host.rstrip('.').lower()
+
+    @staticmethod
+    def _trim(url):
+        """Strip punctuation that follows a URL in prose"""
+        while url and (url[-1] in TRAILING_PUNCTUATION or
+                       url[-1] == ')' and url.count('(') < url.count(')')):
+            url = url[:-1]
+        return url
+
+    def canonical_id(self, url):
+        """Return a stable deduplication key for the video a URL points to
+
+        For supported platforms the key is '<platform>:<video id>' derived
+        from the URL alone, so e.g. youtu.be/X, m.youtube.com/watch?v=X and
+        youtube.com/watch?v=X&t=30 all map to 'youtube:X'. Other URLs fall
+        back to a normalized form of the URL without tracking parameters.
+        """
+        try:
+            parsed = urlparse(url.strip())
+        except ValueError:
+            return f"url:{url.strip()}"
+
+        host = (parsed.hostname or '').lower()
+        domain = self._match_domain(host)
+        if domain in self.id_extractors:
+            video_id = self.id_extractors[domain](parsed)
+            if video_id:
+                return video_id
+
+        return f"url:{self._normalize(parsed, host)}"
+
+    def _match_domain(self, host):
+        """Return the supported domain host belongs to, if any"""
+        return self._domains.match(host)
+
+    def _normalize(self, parsed, host):
+        """Normalize a parsed URL for use as a fallback key"""
+        for prefix in ('www.', 'm.', 'mobile.'):
+            if host.startswith(prefix):
+                host = host[len(prefix):]
+                break
+        query = sorted((key, value) for key, values in parse_qs(parsed.query).items()
+                       for value in values
+                       if key not in TRACKING_PARAMS and not key.startswith('utm_'))
+        path = parsed.path.rstrip('/')
+        return f"{host}{path}" + (f"?{urlencode(query)}" if query else '')
+
+    @staticmethod
+    def _path_parts(parsed):
+        return [part for part in parsed.path.split('/') if part]
+
+    def _youtube_id(self, parsed):
+        video_id = parse_qs(parsed.query).get('v', [None])[0]
+        if not video_id:
+            parts = self._path_parts(parsed)
+            if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live', 'v', 'e'):
+                video_id = parts[1]
+        return f"youtube:{video_id}" if video_id else None
+
+    def _youtube_collection(self, parsed):
+        query = parse_qs(parsed.query)
+        if 'list' in query and 'v' not in query:
+            return True
+        parts = self._path_parts(parsed)
+        if not parts:
+            return False
+        return (parts[0] == 'playlist' or parts[0].startswith('@') or
+                parts[0] in ('channel', 'c', 'user') and len(parts) >= 2)
+
+    def _youtu_be_id(self, parsed):
+        parts = self._path_parts(parsed)
+        return f"youtube:{parts[0]}" if parts else None
+
+    def _facebook_id(self, parsed):
+        video_id = parse_qs(parsed.query).get('v', [None])[0]
+        if not video_id:
+            parts = self._path_parts(parsed)
+            for marker in ('videos', 'reel', 'reels'):
+                if marker in parts[:-1]:
+                    video_id = parts[parts.index(marker) + 1]
+                    break
+        return f"facebook:{video_id}" if video_id and video_id.isdigit() else None
+
+    def _fb_watch_id(self, parsed):
+        # fb.watch short codes only resolve to a numeric ID over the network
+        parts = self._path_parts(parsed)
+        return f"fb.watch:{parts[0]}" if parts else None
+
+    def _twitter_id(self, parsed):
+        parts = self._path_parts(parsed)
+        if 'status' in parts[:-1]:
+            video_id = parts[parts.index('status') + 1]
+            if video_id.isdigit():
+                return f"twitter:{video_id}"
+        return None
+
+    def _instagram_id(self, parsed):
+        parts = self._path_parts(parsed)
+        for marker in ('p', 'reel', 'reels', 'tv'):
+            if marker in parts[:-1]:
+                return f"instagram:{parts[parts.index(marker) + 1]}"
+        return None
@@ -0,0 +1,257 @@
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from .logger import job_context, setup_logger
+
+logger = setup_logger()
+
+_STOP = object()
+
+
+class DownloadJob:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    # A playlist or multi-video post whose videos became jobs of their own
+    EXPANDED = 'expanded'
+
+    FINISHED_STATES = (COMPLETED, SKIPPED, FAILED, CANCELLED, EXPANDED)
+
+    def __init__(self, url, job_id=None, parent=None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.url = url
+        # ID of the playlist job this video was listed by
+        self.parent = parent
+        self.state = self.QUEUED
+        self.attempts = 0
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.state in self.FINISHED_STATES
+
+    def to_dict(self):
+        """Return a JSON-serializable snapshot of the job"""
+        return {
+            'id': self.id,
+            'url': self.url,
+            'parent': self.parent,
+            'state': self.state,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class DownloadWorkerPool:
+    """Runs download jobs on a fixed number of worker threads
+
+    With a JobStore every state change is persisted. Jobs still queued
+    when the pool shuts down stay queued in the store, and recover()
+    resubmits them, together with jobs interrupted by a crash, in the
+    next process.
+    """
+
+    def __init__(self, handler, workers=3, queue_size=100, history_size=1000, on_finish=None,
+                 store=None):
+        self.handler = handler
+        self.on_finish = on_finish
+        self.store = store
+        self.workers = max(1, int(workers))
+        self._queue = queue.Queue(maxsize=max(0, int(queue_size)))
+        self._jobs = {}
+        self._finished = deque()
+        self._history_size = history_size
+        self._lock = threading.Lock()
+        self._threads = []
+        self._closed = False
+        self._stats = dict.fromkeys(('submitted',) + DownloadJob.FINISHED_STATES, 0)
+
+    def start(self):
+        """Start the worker threads if they are not running yet"""
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker,
+                                          name=f'download-worker-{index}',
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.debug("Started %s download workers", self.workers)
+
+    def submit(self, url, block=True, timeout=None, parent=None):
+        """Queue a URL for download and return its job
+
+        parent is the ID of the playlist job the URL was listed by, if any.
+        Raises queue.Full when the queue is full and block is False
+        or the timeout expires.
+        """
+        if self._closed:
+            raise RuntimeError("Download worker pool is shut down")
+        self.start()
+
+        job = DownloadJob(url, parent=parent)
+        if self.store:
+            self.store.add(job)
+        try:
+            self._enqueue(job, block, timeout)
+        except queue.Full:
+            if self.store:
+                self.store.remove(job.id)
+            raise
+        logger.debug("Queued job %s for %s", job.id, url)
+        return job
+
+    def recover(self):
+        """Resubmit the queued and interrupted jobs left in the job store by earlier runs
+
+        Jobs of other live processes sharing the store are not touched.
+        Blocks while the queue is full, so only queue_size recovered jobs
+        are held in memory at a time. Returns the number of jobs resubmitted.
+        """
+        if not self.store:
+            return 0
+        self.store.recover()
+        count = 0
+        self.start()
+        for job in self.store.iter_recovered():
+            while not self._closed:
+                try:
+                    self._enqueue(job, block=True, timeout=1)
+                    break
+                except queue.Full:
+                    continue
+            if self._closed:
+                break
+            count += 1
+        if count:
+            logger.info(f"Resubmitted {count} queued download jobs")
+        return count
+
+    def _enqueue(self, job, block=True, timeout=None):
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put(job, block, timeout)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise
+        with self._lock:
+            self._stats['submitted'] += 1
+
+    def get(self, job_id):
+        """Return the job with the given ID, or None if unknown"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Return a list of all tracked jobs, oldest first"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a queued job; running jobs cannot be cancelled"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state != DownloadJob.QUEUED:
+                return False
+            self._finish(job, DownloadJob.CANCELLED)
+            return True
+
+    def stats(self):
+        """Return counters for submitted and finished jobs plus current load"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = sum(1 for job in self._jobs.values()
+                                   if job.state == DownloadJob.RUNNING)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+    def join(self):
+        """Block until every queued job has been processed"""
+        self._queue.join()
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """Stop accepting jobs and stop the workers once the queue drains"""
+        self._closed = True
+        if cancel_pending:
+            self._drain()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _drain(self):
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not _STOP:
+                with self._lock:
+                    if job.state == DownloadJob.QUEUED:
+                        # Left queued in the store, to be recovered by the next process
+                        self._finish(job, DownloadJob.CANCELLED, persist=False)
+            self._queue.task_done()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        with self._lock:
+            if job.state != DownloadJob.QUEUED:
+                return
+            job.state = DownloadJob.RUNNING
+            job.started_at = time.time()
+            job.attempts += 1
+        if self.store:
+            self.store.mark_running(job)
+
+        with job_context(job.id):
+            try:
+                result = self.handler(job.url)
+            except Exception as e:
+                logger.error(f"Job {job.id} failed for {job.url}: {str(e)}")
+                with self._lock:
+                    job.error = str(e)
+                    self._finish(job, DownloadJob.FAILED)
+            else:
+                with self._lock:
+                    self._finish(job, DownloadJob.SKIPPED if result is False else DownloadJob.COMPLETED)
+
+        if self.on_finish:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                logger.error(f"Error in job callback for {job.id}: {str(e)}")
+
+    def _finish(self, job, state, persist=True):
+        # Caller must hold self._lock
+        job.state = state
+        job.finished_at = time.time()
+        if persist and self.store:
+            self.store.mark_finished(job)
+        self._stats[state] += 1
+        self._finished.append(job.id)
+        while len(self._finished) > self._history_size:
+            self._jobs.pop(self._finished.popleft(), None)
@@ -0,0 +1,107 @@
+import contextlib
+import threading
+import time
+import yt_dlp
+from .logger import setup_logger
+
+logger = setup_logger()
+
+
+class YoutubeDLSession:
+    """A long-lived YoutubeDL instance reused across downloads
+
+    Extractors, the HTTP connection pool and the cookie jar (including
+    cookies read from browser stores) are initialized once per session
+    instead of once per URL.
+    """
+
+    def __init__(self, ydl_opts):
+        self.created_at = time.monotonic()
+        self._progress_hook = None
+        opts = dict(ydl_opts)
+        opts['progress_hooks'] = [self._dispatch_progress] + list(opts.get('progress_hooks', []))
+        self._stack = contextlib.ExitStack()
+        self.ydl = self._stack.enter_context(yt_dlp.YoutubeDL(opts))
+
+    def _dispatch_progress(self, d):
+        hook = self._progress_hook
+        if hook:
+            hook(d)
+
+    def expired(self, ttl):
+        """Check whether the session is older than ttl seconds"""
+        return ttl is not None and time.monotonic() - self.created_at > ttl
+
+    def close(self):
+        """Close the underlying YoutubeDL instance"""
+        self._stack.close()
+
+
+class YoutubeDLSessionPool:
+    """Pool of YoutubeDL sessions keyed by option set
+
+    YoutubeDL instances are not safe to share between threads, so each
+    download checks out a session for exclusive use and returns it when
+    done. Sessions older than cookie_ttl seconds are discarded on checkout
+    so that browser cookies get re-read periodically.
+    """
+
+    def __init__(self, cookie_ttl=3600):
+        self.cookie_ttl = cookie_ttl
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextlib.contextmanager
+    def session(self, key, opts_factory, progress_hook=None):
+        """Check out a YoutubeDL instance for the given option set
+
+        opts_factory is only called when a new session has to be created.
+        progress_hook, if given, receives the yt-dlp progress updates of
+        this checkout only.
+        """
+        session = self._checkout(key, opts_factory)
+        session._progress_hook = progress_hook
+        try:
+            yield session.ydl
+        finally:
+            session._progress_hook = None
+            self._checkin(key, session)
+
+    def close(self):
+        """Close all idle sessions; sessions in use are closed on checkin"""
+        with self._lock:
+            self._closed = True
+            sessions = [s for idle in self._idle.values() for s in idle]
+            self._idle.clear()
+        for session in sessions:
+            session.close()
+
+    def _checkout(self, key, opts_factory):
+        expired = []
+        session = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate = idle.pop()
+                if candidate.expired(self.cookie_ttl):
+                    expired.append(candidate)
+                else:
+                    session = candidate
+                    break
+
+        for old in expired:
+            logger.debug("Refreshing expired YoutubeDL session for %s", key)
+            old.close()
+
+        if session is None:
+            logger.debug("Creating YoutubeDL session for %s", key)
+            session = YoutubeDLSession(opts_factory())
+        return session
+
+    def _checkin(self, key, session):
+        with self._lock:
+            if not self._closed and not session.expired(self.cookie_ttl):
+                self._idle.setdefault(key, []).append(session)
+                return
+        session.close()